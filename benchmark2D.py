@@ -0,0 +1,244 @@
+import os
+import time
+import tracemalloc
+
+import cupy as cp
+import numpy as np
+
+from biobots2D.components.cell.cellcycle.growthcontactinhibition import GrowthContactInhibition
+from biobots2D.components.cudaspacepartition import clamp_to_impact
+from biobots2D.components.simulation.cuda_memory import synchronize
+from biobots2D.components.simulation.datawriter.writespatialstate import WriteSpatialState
+from biobots2D.components.simulation.datawriter.trajectorycodec import TrajectoryCodec
+from biobots2D.components.simulation.datawriter.writetrajectory import Trajectory, WriteTrajectory
+from biobots2D.components.simulation.ensemblesimulation import EnsembleSimulation
+from biobots2D.components.simulation.freecellsimulation import FreeCellSimulation
+from biobots2D.components.simulation.integrators.forwardeuler import ForwardEuler
+from biobots2D.components.simulation.integrators.heun import Heun
+from biobots2D.components.simulation.integrators.rungekutta4 import RungeKutta4
+from biobots2D.components.simulation.simulationdata.spatialstate import SpatialState
+from biobots2D.models.biobots.gradient import Gradient
+from utils.plotting import AsyncRenderer
+from utils.rng import uniform
+from utils.tools import prng
+
+
+def run(integrator, dt, t_end, model=Gradient):
+    """
+    Runs a model without noise up to t_end and returns the final node positions and the wall
+    time it took. A whole number of steps is taken, so every run ends at the same time instead
+    of wherever the accumulated t first passes t_end
+    """
+    s = model()
+    s.stochastic_jiggle = False
+    s.set_integrator(integrator)
+    s.set_dt(dt)
+
+    synchronize()
+    t0 = time.perf_counter()
+    s.n_time_steps(round(t_end / dt), report=False)
+    synchronize()
+    return s.gpu.N_pos, time.perf_counter() - t0
+
+
+def benchmark_integrators(t_end=1., tolerance=1e-3, dts=(0.04, 0.02, 0.01, 0.005, 0.0025)):
+    """
+    Compares integrators on wall time per unit of simulated time. For each integrator the
+    largest dt whose final positions are within tolerance of a fine RK4 reference is used, so
+    all integrators are compared at equal accuracy
+    """
+    reference, _ = run(RungeKutta4(), min(dts) / 4, t_end)
+
+    print(f"{'integrator':<16}{'dt':>10}{'max error':>12}{'s / unit t':>14}")
+    for integrator in (ForwardEuler(), Heun(), RungeKutta4()):
+        for dt in sorted(dts, reverse=True):
+            N_pos, wall = run(integrator, dt, t_end)
+            error = float(cp.max(cp.linalg.norm(N_pos - reference, axis=1)))
+            if error < tolerance:
+                print(f"{type(integrator).__name__:<16}{dt:>10.4f}{error:>12.2e}"
+                      f"{wall / t_end:>14.3f}")
+                break
+        else:
+            print(f"{type(integrator).__name__:<16}{'-':>10}{'-':>12}{'-':>14}")
+
+
+def benchmark_ensemble(replica_counts=(1, 4, 16, 64, 256), n_steps=200, model=Gradient):
+    """
+    Throughput in replica-steps per second of separate simulations against one ensemble that
+    advances all replicas together. Every replica has its own seed and cilia propulsion
+    """
+    def replicas(R):
+        return [model(seed=seed, propagation_magnitude=10. + seed % 3) for seed in range(R)]
+
+    def throughput(simulations, R):
+        for s in simulations:
+            s.next_time_step()
+        synchronize()
+        t0 = time.perf_counter()
+        for s in simulations:
+            s.n_time_steps(n_steps, report=False)
+        synchronize()
+        return R * n_steps / (time.perf_counter() - t0)
+
+    print(f"{'replicas':>10}{'separate':>14}{'ensemble':>14}{'speed up':>10}")
+    for R in replica_counts:
+        separate = throughput(replicas(R), R)
+        ensemble = throughput([EnsembleSimulation(replicas(R))], R)
+        print(f"{R:>10}{separate:>14.1f}{ensemble:>14.1f}{ensemble / separate:>10.1f}")
+
+
+def benchmark_rng(n=2 ** 20, repeats=10):
+    """
+    Random numbers per second of the old generators against the counter based generator, and a
+    check that the counter based generator gives the same numbers on numpy and cupy
+    """
+    def rate(draw, count):
+        draw()
+        synchronize()
+        t0 = time.perf_counter()
+        for _ in range(repeats):
+            draw()
+        synchronize()
+        return repeats * count / (time.perf_counter() - t0)
+
+    ids_np = np.arange(n // 4)
+    ids_cp = cp.arange(n // 4)
+    rates = {'prng (python)': rate(lambda: [prng() for _ in range(10 ** 4)], 10 ** 4),
+             'cp.random (global state)': rate(lambda: cp.random.random(n, dtype=cp.float32), n),
+             'philox numpy': rate(lambda: uniform(49, 0, ids_np), n),
+             'philox cupy': rate(lambda: uniform(49, 0, ids_cp), n)}
+
+    for name, numbers_per_second in rates.items():
+        print(f"{name:<28}{numbers_per_second:>14.3e} numbers/s")
+
+    identical = np.array_equal(uniform(49, 7, ids_np), cp.asnumpy(uniform(49, 7, ids_cp)))
+    print(f"numpy and cupy identical: {identical}")
+
+
+def check_ccd(safety=0.9):
+    """
+    A node that stands still while an element sweeps over it within one step. Swept collision
+    detection must stop the element short of the node, not only the node on its own path
+    """
+    P0 = cp.array([[0., 0.], [-1., -1.], [1., -1.]], dtype=cp.float32)
+    P1 = cp.array([[0., 0.], [-1., 1.], [1., 1.]], dtype=cp.float32)
+    positions, hit = clamp_to_impact(P0, P1, cp.array([0]), cp.array([1]), cp.array([2]), safety)
+
+    stopped = bool(hit) and bool(cp.all(positions[1:, 1] < 0.)) \
+        and bool(cp.all(positions[0] == P0[0]))
+    print(f"moving element stops before a stationary node: {stopped}")
+
+
+def benchmark_object_model(n_cells=10000, n_nodes=12):
+    """
+    Construction time and memory of the object model for a scene of n_cells free cells in a
+    grid, per node. The numbers are only meaningful against another revision, so run it before
+    and after changing the node, element or cell classes
+    """
+    def build():
+        s = FreeCellSimulation()
+        side = int(np.ceil(n_cells ** .5))
+        for ii in range(n_cells):
+            ccm = GrowthContactInhibition(10, 10, 0.9, s.dt, key=ii)
+            c = s.make_cell_at_centre(n_nodes, ii % side, ii // side, ccm)
+            s.node_list += c.node_list
+            s.element_list += c.element_list
+            s.cell_list.append(c)
+        return s
+
+    t0 = time.perf_counter()
+    s = build()
+    elapsed = time.perf_counter() - t0
+    n = len(s.node_list)
+    del s
+
+    tracemalloc.start()
+    s = build()
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{n_cells} cells, {n} nodes, {len(s.element_list)} elements")
+    print(f"construction {elapsed:.2f} s, {elapsed / n * 1e6:.1f} us per node")
+    print(f"memory {allocated / 2 ** 20:.1f} MiB, {allocated / n:.0f} bytes per node")
+
+
+def benchmark_video(n_steps=1000, sm=10, model=Gradient):
+    """
+    Steps per second without video, with the frames drawn and encoded in series, and with the
+    frames drawn and encoded on the worker thread, blocking or dropping frames when it is behind
+    """
+    def throughput(video, **kwargs):
+        s = model()
+        s.next_time_step()
+        synchronize()
+        t0 = time.perf_counter()
+        if video:
+            s.animate(n_steps, sm, headless=True, **kwargs)
+        else:
+            s.n_time_steps(n_steps, report=False)
+        synchronize()
+        return n_steps / (time.perf_counter() - t0)
+
+    rates = {'no video': throughput(False),
+             'video, in series': throughput(True),
+             'video, worker (block)': throughput(True, asynchronous=True),
+             'video, worker (drop)': throughput(True, asynchronous=True,
+                                                policy=AsyncRenderer.DROP)}
+
+    for name, steps_per_second in rates.items():
+        print(f"{name:<28}{steps_per_second:>12.1f} steps/s")
+
+
+def benchmark_trajectory(n_steps=500, sm=10, model=Gradient, d_separation=0.1):
+    """
+    Time spent writing and size on disk of the spatial state as CSV, the binary trajectory and
+    the compressed trajectory, for the same run, and how fast the trajectories read back. The
+    frames are read in a random order, as when scrubbing
+    """
+    def measure(writer):
+        s = model()
+        s.write_to_file = False
+        s.add_simulation_data(SpatialState())
+        elapsed = 0.
+        for _ in range(n_steps):
+            s.next_time_step()
+            synchronize()
+            t0 = time.perf_counter()
+            writer.write_data(s)
+            elapsed += time.perf_counter() - t0
+        size = sum(os.path.getsize(os.path.join(root, f))
+                   for root, _, files in os.walk(writer.full_path) for f in files)
+        return elapsed, size
+
+    def read_rate(path):
+        trajectory = Trajectory(path)
+        order = np.random.default_rng(0).permutation(len(trajectory))
+        t0 = time.perf_counter()
+        for frame in order:
+            np.asarray(trajectory.positions(frame)).sum()
+        return len(order) / (time.perf_counter() - t0)
+
+    frames = n_steps // sm
+    print(f"{'writer':<20}{'ms / frame':>12}{'MiB':>10}{'ratio':>8}{'frames / s read':>18}")
+    baseline = None
+    for name, writer in (('csv', WriteSpatialState(sm, 'benchmark')),
+                         ('trajectory', WriteTrajectory(sm, 'benchmark')),
+                         ('trajectory, codec',
+                          WriteTrajectory(sm, 'benchmark', codec=TrajectoryCodec(d_separation)))):
+        elapsed, size = measure(writer)
+        reads = '-' if name == 'csv' else f"{read_rate(writer.full_path):.1f}"
+        if name == 'trajectory':
+            baseline = size
+        ratio = '-' if baseline is None else f"{baseline / size:.1f}"
+        print(f"{name:<20}{1e3 * elapsed / frames:>12.2f}{size / 2 ** 20:>10.2f}{ratio:>8}"
+              f"{reads:>18}")
+
+
+if __name__ == '__main__':
+    benchmark_integrators()
+    benchmark_ensemble()
+    benchmark_rng()
+    check_ccd()
+    benchmark_object_model()
+    benchmark_video()
+    benchmark_trajectory()
@@ -0,0 +1,62 @@
+import cupy as cp
+import torch
+
+
+class ArrayField:
+    def __init__(self, array, tensor=True, fallback=None, default=None, dtype=None):
+        """
+        An attribute of a node, element or cell that lives in a memory array once the object is
+        bound to the memory, see CudaMemory.bind. Until then the object keeps the value itself.
+
+        A bound object reads its row of the array every time, so it always sees the current
+        state and never holds a copy. Tensor fields are torch views of the row on the device,
+        writing into them writes into the array
+
+        :param array: the name of the array in CudaMemory, e.g. 'N_pos'
+        :param tensor: read as a torch tensor that shares storage with the array, otherwise as a
+        Python number
+        :param fallback: the array to read while array is still None, e.g. N_pos for
+        N_pos_previous before the first step
+        :param default: makes the value of an unbound object on first use, e.g. a zero force, so
+        objects that are never used unbound do not pay for it
+        :param dtype: the Python type a number is read as, e.g. int for the cell type, which is
+        kept in a float array
+        """
+        self.array = array
+        self.tensor = tensor
+        self.fallback = fallback
+        self.default = default
+        self.dtype = dtype
+        self.private = None
+
+    def __set_name__(self, owner, name):
+        self.private = f"_{name}"
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        if obj.memory is None:
+            value = getattr(obj, self.private, None)
+            if value is None and self.default is not None:
+                value = self.default(obj)
+                setattr(obj, self.private, value)
+            return value
+
+        array = getattr(obj.memory, self.array)
+        if array is None:
+            array = getattr(obj.memory, self.fallback)
+        row = array[obj.memory_idx]
+        if self.tensor:
+            return torch.as_tensor(row, device='cuda')
+        return row.item() if self.dtype is None else self.dtype(row.item())
+
+    def __set__(self, obj, value):
+        if obj.memory is None:
+            setattr(obj, self.private, value)
+            return
+
+        array = getattr(obj.memory, self.array)
+        if array is None:
+            raise ValueError(f"{self.array} is not in memory yet")
+        value = torch.as_tensor(value)
+        array[obj.memory_idx] = cp.asarray(value if value.is_cuda else value.numpy())
@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
 from typing import List
 
+from biobots2D.components.arrayfield import ArrayField
 from biobots2D.components.cell.cellcycle.abstractcellcyclemodel import AbstractCellCycleModel
 from biobots2D.components.cell.element import Element
 from biobots2D.components.node.node import Node
@@ -8,7 +9,23 @@ from utils import TodoException
 
 
 class AbstractCell(ABC):
+    # Subclasses declare their own __slots__, so cells have no __dict__
+    __slots__ = ('memory', 'memory_idx', 'id', '_age', 'node_list', 'element_list',
+                 'new_cell_target_area', 'grown_cell_target_area', 'cell_cycle_model',
+                 'deformation_energy_parameter', 'surface_energy_parameter', 'free_cell',
+                 'new_free_cell_separation', 'sister_cell', 'ancestor_id', 'cell_data',
+                 '_cell_type', 'inhibitory')
+
+    # Once the cell is bound to a memory, these are read from its row in the cell arrays
+    age = ArrayField('C_age', tensor=False)
+    cell_type = ArrayField('C_type', tensor=False, dtype=int)
+
     def __init__(self):
+        # The simulation memory and the row of this cell in it, see CudaMemory.bind. Once bound,
+        # the cell data is read from the arrays instead of calculated per cell
+        self.memory = None
+        self.memory_idx = None
+
         self.id = None
 
         self.age = 0
@@ -78,7 +95,37 @@ class AbstractCell(ABC):
         return self.cell_data['cell_perimeter'].get_data(self)
 
     def get_cell_centre(self):
-        raise TodoException
+        return self.cell_data['cell_centre'].get_data(self)
+
+    def get_cell_second_moments(self):
+        """
+        The second moments of area about the centroid, divided by the area, as xx, yy and xy
+        :return:
+        """
+        return self.cell_data['cell_second_moments'].get_data(self)
+
+    def get_cell_aspect_ratio(self):
+        return self.cell_data['cell_aspect_ratio'].get_data(self)
+
+    def get_cell_orientation(self):
+        """
+        The angle of the long axis with the x axis
+        :return:
+        """
+        return self.cell_data['cell_orientation'].get_data(self)
+
+    def get_memory_data(self, name):
+        """
+        The value of this cell in one of the memory arrays, from the host copy that is shared by
+        all cells for the rest of the step. A cell that is not bound calculates its data itself,
+        see AbstractCellData.get_data
+        :param name: e.g. 'C_area'
+        :return:
+        """
+        if self.memory is None:
+            raise ValueError(f"The cell is not bound to a memory, so it has no {name}")
+        value = self.memory.host(name)[self.memory_idx]
+        return float(value) if value.ndim == 0 else value
 
     def get_cell_target_perimeter(self):
         """
@@ -5,12 +5,14 @@ from utils import TodoException
 
 
 class AbstractCellCycleModel(ABC):
+    # One for all models, the colour tables never change
+    colour_set = ColourSet()
+
     def __init__(self):
         """
         An abstract class that gets the basics of a cell cycle model
         """
         self.age = None
-        self.colour_set = ColourSet()
         self.colour = 1
         self.containing_cell = []
 
@@ -0,0 +1,111 @@
+import cupy as cp
+
+from utils.rng import STREAM_CELL_CYCLE, uniform
+
+
+class CellCycleEngine:
+    # Phase of every cell in C_phase
+    PAUSE = 0
+    GROWTH = 1
+    INHIBITED = 2
+
+    def __init__(self, p, g, f, minimum_pause_phase_duration=0, minimum_growth_phase_duration=4,
+                 spread=2., seed=0):
+        """
+        The GrowthContactInhibition cell cycle for all cells at once. The phase durations,
+        phase and growth fraction of every cell are arrays in memory, next to C_age, so ageing
+        is one masked update without any per cell Python code.
+
+        A cell first pauses, then grows to its full target area, and is ready to divide when
+        both phases have passed. A cell at the end of its pause phase whose area is below f
+        times the new cell target area is contact inhibited: its pause phase is extended by
+        every step it stays compressed.
+
+        The durations are the means p and g plus a uniform number in [-spread, spread], and no
+        shorter than the minimum. They are drawn from the counter based generator, keyed by the
+        seed and the index of the cell
+
+        :param p: mean pause phase duration
+        :param g: mean growth phase duration
+        :param f: the growth trigger fraction
+        :param minimum_pause_phase_duration:
+        :param minimum_growth_phase_duration:
+        :param spread:
+        :param seed:
+        """
+        self.mean_pause_phase_duration = p
+        self.mean_growth_phase_duration = g
+        self.growth_trigger_fraction = f
+        self.minimum_pause_phase_duration = minimum_pause_phase_duration
+        self.minimum_growth_phase_duration = minimum_growth_phase_duration
+        self.spread = spread
+        self.seed = seed
+
+    def initialise(self, gpu):
+        """
+        Gives every cell in memory its phase durations and a starting age somewhere in its
+        pause phase
+        :param gpu:
+        :return:
+        """
+        n_cells = gpu.C_age.shape[0]
+        gpu.C_pause_duration = cp.zeros(n_cells, dtype=cp.float32)
+        gpu.C_growth_duration = cp.zeros(n_cells, dtype=cp.float32)
+        gpu.C_phase = cp.full(n_cells, self.PAUSE, dtype=cp.int8)
+        gpu.C_growth_fraction = cp.zeros(n_cells, dtype=cp.float32)
+
+        # Every batch of new cells draws with the next counter. Kept in memory, so it is part of
+        # a checkpoint
+        gpu.cell_cycle_draws = 0
+
+        cells = cp.arange(n_cells)
+        u = self.new_cells(gpu, cells)
+        gpu.C_age[cells] = cp.round(u * gpu.C_pause_duration[cells], 1)
+
+    def new_cells(self, gpu, cells: cp.ndarray):
+        """
+        Draws the phase durations of the given cells and puts them in the pause phase. Used for
+        the initial cells and for the daughters of a division
+        :param gpu:
+        :param cells: cell indices
+        :return: one more uniform number per cell, for the caller
+        """
+        u = uniform(self.seed, gpu.cell_cycle_draws, cells, STREAM_CELL_CYCLE)
+        gpu.cell_cycle_draws += 1
+
+        pause = self.mean_pause_phase_duration + (2 * u[:, 0] - 1) * self.spread
+        growth = self.mean_growth_phase_duration + (2 * u[:, 1] - 1) * self.spread
+        gpu.C_pause_duration[cells] = cp.maximum(pause, self.minimum_pause_phase_duration)
+        gpu.C_growth_duration[cells] = cp.maximum(growth, self.minimum_growth_phase_duration)
+        gpu.C_phase[cells] = self.PAUSE
+        gpu.C_growth_fraction[cells] = 0.
+        return u[:, 2]
+
+    def age(self, gpu, dt):
+        """
+        Advances the age of every cell and works out its phase, in one pass
+        :param gpu:
+        :param dt:
+        :return:
+        """
+        gpu.C_age += dt
+
+        pausing = gpu.C_age < gpu.C_pause_duration
+        compressed = gpu.C_area < self.growth_trigger_fraction * gpu.C_new_cell_target_area
+        inhibited = ~pausing & compressed
+
+        gpu.C_pause_duration += cp.where(inhibited, dt, 0.).astype(cp.float32)
+        gpu.C_phase = cp.where(pausing, self.PAUSE,
+                               cp.where(inhibited, self.INHIBITED, self.GROWTH)).astype(cp.int8)
+        gpu.C_growth_fraction = cp.where(
+            pausing, 0., (gpu.C_age - gpu.C_pause_duration) / gpu.C_growth_duration
+        ).astype(cp.float32)
+
+    @staticmethod
+    def ready_to_divide(gpu) -> cp.ndarray:
+        """
+
+        :param gpu:
+        :return: a boolean mask over the cells
+        """
+        return gpu.C_pause_duration + gpu.C_growth_duration < gpu.C_age
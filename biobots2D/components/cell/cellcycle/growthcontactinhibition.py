@@ -1,20 +1,24 @@
-# import random
 from biobots2D.components.cell.abstractcell import AbstractCell
 from biobots2D.components.cell.cellcycle.abstractcellcyclemodel import AbstractCellCycleModel
 from utils import TodoException
-from utils.tools import prng
+from utils.rng import STREAM_CELL_CYCLE, PhiloxStream
 
 
 class GrowthContactInhibition(AbstractCellCycleModel):
-    def __init__(self, p, g, f, dt):
+    def __init__(self, p, g, f, dt, seed=0, *, key):
         """
 
         :param p:
         :param g:
         :param f:
         :param dt:
+        :param seed: the seed of the simulation
+        :param key: identifies this cell cycle among the others with the same seed, e.g. the
+        index of its cell. Cells with a fixed key draw the same phase durations regardless of
+        creation order
         """
         super().__init__()
+        draw = PhiloxStream(seed, key, STREAM_CELL_CYCLE).random
 
         # properties
         self.mean_pause_phase_duration = None
@@ -26,22 +30,15 @@ class GrowthContactInhibition(AbstractCellCycleModel):
         self.minimum_pause_phase_duration = 0
         self.minimum_growth_phase_duration = 4
 
-        # todo: We use our own psuedo-rng for now for interchangability with MATLAB version
-        # self.pause_phase_rng = random.random()
-        # self.growth_phase_rng = random.random()
-        self.pause_phase_duration = prng()
-        self.growth_phase_duration = prng()
+        self.pause_phase_duration = draw()
+        self.growth_phase_duration = draw()
 
         self.pause_colour = None
         self.growth_colour = None
         self.inhibited_colour = None
 
-        # todo: We use our own psuedo-rng for now for interchangability with MATLAB version
-        # constructor
-        # self.pause_phase_rng = lambda: random.uniform(-2, 2)
-        # self.growth_phase_rng = lambda: random.uniform(-2, 2)
-        self.pause_phase_rng = lambda: (prng() * 4) - 2
-        self.growth_phase_rng = lambda: (prng() * 4) - 2
+        self.pause_phase_rng = lambda: (draw() * 4) - 2
+        self.growth_phase_rng = lambda: (draw() * 4) - 2
 
         self.set_pause_phase_duration(p)
         self.set_growth_phase_duration(g)
@@ -51,9 +48,7 @@ class GrowthContactInhibition(AbstractCellCycleModel):
         self.dt = dt
 
         # By default cell will start off in the pause phase
-        # todo: We use our own psuedo-rng for now for interchangability with MATLAB version
-        # self.set_age(round(random.uniform(0, self.pause_phase_duration), 1))
-        self.set_age(round(prng() * self.pause_phase_duration, 1))
+        self.set_age(round(draw() * self.pause_phase_duration, 1))
 
         self.pause_colour = self.colour_set.get_number('PAUSE')
         self.growth_colour = self.colour_set.get_number('GROW')
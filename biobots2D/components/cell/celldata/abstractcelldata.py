@@ -27,6 +27,11 @@ class AbstractCellData(ABC):
         # single time step
         self.age_stamp = -1
 
+    # The quantity in CudaMemory that holds this data for every cell. A cell that is bound to a
+    # memory reads it from there, where it is calculated for all cells at once and kept for the
+    # step, see AbstractCell.get_memory_data
+    memory_array = None
+
     @property
     @abstractmethod
     def name(self):
@@ -56,6 +61,9 @@ class AbstractCellData(ABC):
         pass
 
     def get_data(self, c: AbstractCell):
+        if c.memory is not None and self.memory_array is not None:
+            return c.get_memory_data(self.memory_array)
+
         if self.age_stamp == c.get_age():
             return self.data
         else:
@@ -6,6 +6,8 @@ from utils.polyshapes import polyarea
 
 
 class CellArea(AbstractCellData):
+    memory_array = 'C_area'
+
     def __init__(self):
         super().__init__()
         self._name = 'cell_area'
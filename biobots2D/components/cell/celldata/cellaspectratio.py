@@ -0,0 +1,39 @@
+from biobots2D.components.cell.abstractcell import AbstractCell
+from biobots2D.components.cell.celldata.abstractcelldata import AbstractCellData
+
+
+class CellAspectRatio(AbstractCellData):
+    memory_array = 'C_aspect_ratio'
+
+    def __init__(self):
+        super().__init__()
+        self._name = 'cell_aspect_ratio'
+        self._data = []
+
+    @property
+    def name(self):
+        return self._name
+
+    @name.setter
+    def name(self, value):
+        self._name = value
+
+    @property
+    def data(self):
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+
+    def calculate_data(self, c: AbstractCell):
+        """
+        The ratio of the long to the short axis of the ellipse with the same second moments as
+        the cell
+        :param c:
+        :return:
+        """
+        xx, yy, xy = c.get_cell_second_moments()
+        mean = 0.5 * (xx + yy)
+        spread = (0.25 * (xx - yy) ** 2 + xy ** 2) ** .5
+        self.data = float(((mean + spread) / (mean - spread)) ** .5)
@@ -1,8 +1,11 @@
+import torch
+
 from biobots2D.components.cell.celldata.abstractcelldata import AbstractCellData
-from utils import TodoException
 
 
 class CellCentre(AbstractCellData):
+    memory_array = 'C_centroid'
+
     def __init__(self):
         super().__init__()
         self._name = 'cell_centre'
@@ -30,4 +33,11 @@ class CellCentre(AbstractCellData):
         :param c:
         :return:
         """
-        raise TodoException
\ No newline at end of file
+        x = torch.stack([node.x for node in c.node_list])
+        y = torch.stack([node.y for node in c.node_list])
+        x1, y1 = torch.roll(x, -1), torch.roll(y, -1)
+        cross = x * y1 - x1 * y
+
+        area = 0.5 * torch.sum(cross)
+        self.data = torch.stack((torch.sum((x + x1) * cross),
+                                 torch.sum((y + y1) * cross))) / (6 * area)
\ No newline at end of file
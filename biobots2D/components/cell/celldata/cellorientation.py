@@ -0,0 +1,38 @@
+import math
+
+from biobots2D.components.cell.abstractcell import AbstractCell
+from biobots2D.components.cell.celldata.abstractcelldata import AbstractCellData
+
+
+class CellOrientation(AbstractCellData):
+    memory_array = 'C_orientation'
+
+    def __init__(self):
+        super().__init__()
+        self._name = 'cell_orientation'
+        self._data = []
+
+    @property
+    def name(self):
+        return self._name
+
+    @name.setter
+    def name(self, value):
+        self._name = value
+
+    @property
+    def data(self):
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+
+    def calculate_data(self, c: AbstractCell):
+        """
+        The angle of the long axis with the x axis, in (-pi / 2, pi / 2]
+        :param c:
+        :return:
+        """
+        xx, yy, xy = c.get_cell_second_moments()
+        self.data = 0.5 * math.atan2(2 * float(xy), float(xx - yy))
@@ -3,7 +3,7 @@ from biobots2D.components.cell.celldata.abstractcelldata import AbstractCellData
 
 
 class CellPerimeter(AbstractCellData):
-
+    memory_array = 'C_perimeter'
 
     def __init__(self):
         super().__init__()
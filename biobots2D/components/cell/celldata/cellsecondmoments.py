@@ -0,0 +1,53 @@
+import torch
+
+from biobots2D.components.cell.abstractcell import AbstractCell
+from biobots2D.components.cell.celldata.abstractcelldata import AbstractCellData
+
+
+class CellSecondMoments(AbstractCellData):
+    memory_array = 'C_second_moments'
+
+    def __init__(self):
+        super().__init__()
+        self._name = 'cell_second_moments'
+        self._data = []
+
+    @property
+    def name(self):
+        return self._name
+
+    @name.setter
+    def name(self, value):
+        self._name = value
+
+    @property
+    def data(self):
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+
+    def calculate_data(self, c: AbstractCell):
+        """
+        The second moments of area about the centroid, divided by the area, as xx, yy and xy.
+        The polygon is first moved to the mean of its nodes, which keeps the sums small. Node
+        list must be in order around the cell
+        :param c:
+        :return:
+        """
+        x = torch.stack([node.x for node in c.node_list])
+        y = torch.stack([node.y for node in c.node_list])
+        x, y = x - torch.mean(x), y - torch.mean(y)
+        x1, y1 = torch.roll(x, -1), torch.roll(y, -1)
+        cross = x * y1 - x1 * y
+
+        area = 0.5 * torch.sum(cross)
+        cx = torch.sum((x + x1) * cross) / (6 * area)
+        cy = torch.sum((y + y1) * cross) / (6 * area)
+
+        xx = torch.sum((x ** 2 + x * x1 + x1 ** 2) * cross) / (12 * area) - cx ** 2
+        yy = torch.sum((y ** 2 + y * y1 + y1 ** 2) * cross) / (12 * area) - cy ** 2
+        xy = torch.sum((x * y1 + 2 * x * y + 2 * x1 * y1 + x1 * y) * cross) / (24 * area) \
+            - cx * cy
+        self.data = torch.stack((xx, yy, xy))
@@ -3,6 +3,8 @@ from biobots2D.components.cell.celldata.abstractcelldata import AbstractCellData
 
 
 class TargetArea(AbstractCellData):
+    memory_array = 'C_target_area'
+
     def __init__(self):
         super().__init__()
         self._name = 'target_area'
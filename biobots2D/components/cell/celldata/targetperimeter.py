@@ -6,6 +6,8 @@ from biobots2D.components.cell.celldata.abstractcelldata import AbstractCellData
 
 
 class TargetPerimeter(AbstractCellData):
+    memory_array = 'C_target_perimeter'
+
     def __init__(self):
         super().__init__()
         self._name = 'target_perimeter'
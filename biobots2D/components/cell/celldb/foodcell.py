@@ -3,6 +3,8 @@ from biobots2D.components.cell.element import Element
 
 
 class FoodCell(AbstractCell):
+    __slots__ = ()
+
     def __init__(self, node_list, element_ids, id_):
         super(FoodCell, self).__init__()
         self.id = id_
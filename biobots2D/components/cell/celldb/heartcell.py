@@ -3,6 +3,8 @@ from biobots2D.components.cell.element import Element
 
 
 class HeartCell(AbstractCell):
+    __slots__ = ()
+
     def __init__(self, node_list, element_ids, id_):
         super(HeartCell, self).__init__()
         self.id = id_
@@ -3,6 +3,8 @@ from biobots2D.components.cell.element import Element
 
 
 class SensorCell(AbstractCell):
+    __slots__ = ()
+
     def __init__(self, node_list, element_ids, id_, inh=False):
         super(SensorCell, self).__init__()
         self.id = id_
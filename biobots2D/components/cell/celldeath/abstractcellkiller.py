@@ -1,5 +1,7 @@
 from abc import ABC, abstractmethod
 
+import cupy as cp
+
 
 class AbstractCellKiller(ABC):
     """
@@ -10,8 +12,33 @@ class AbstractCellKiller(ABC):
     If an internal cell needs to be killed, this method leaves a gap that cannot be knitted back
     together (at least at this stage). If a cell needs to die when it is internal, a special
     apoptosis killer will need to be used
+
+    A cell killer is a predicate over the cell arrays in memory, so every cell is judged at once.
+    Each cell is judged on its own; killers that look at the tissue as a whole are
+    AbstractTissueLevelCellKiller
     """
 
+    def __init__(self, cell_types=None):
+        """
+        :param cell_types: only cells of these types can be killed, all types if None
+        """
+        self.cell_types = None if cell_types is None else cp.array(cell_types)
+
     @abstractmethod
-    def make_kill_list(self, cell_list):
-        pass
\ No newline at end of file
+    def make_kill_list(self, t) -> cp.ndarray:
+        """
+        :param t: the simulation
+        :return: a boolean mask over the cells, True for the cells that die
+        """
+        pass
+
+    def cells_to_kill(self, t) -> cp.ndarray:
+        """
+        make_kill_list restricted to the cell types of the killer
+        :param t:
+        :return:
+        """
+        kill = self.make_kill_list(t)
+        if self.cell_types is not None:
+            kill &= cp.isin(t.gpu.C_type, self.cell_types)
+        return kill
@@ -1,5 +1,7 @@
 from abc import ABC, abstractmethod
 
+import cupy as cp
+
 from utils import TodoException
 
 
@@ -12,10 +14,18 @@ class AbstractTissueLevelCellKiller(ABC):
     If an internal cell needs to be killed, this method leaves a gap that cannot be knitted back
     together (at least at this stage). If a cell needs to die when it is internal, a special
     apoptosis killer will need to be used
+
+    Unlike AbstractCellKiller, the fate of a cell can depend on the other cells of the tissue.
+    The killer only decides which cells die; the simulation removes them, see
+    AbstractCellSimulation.kill_cells
     """
 
     @abstractmethod
-    def kill_cells(self, t):
+    def kill_cells(self, t) -> cp.ndarray:
+        """
+        :param t: the simulation
+        :return: a boolean mask over the cells, True for the cells that die
+        """
         pass
 
     def erase_cell_form_simulation(self, c):
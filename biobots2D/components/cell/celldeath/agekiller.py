@@ -0,0 +1,16 @@
+from biobots2D.components.cell.celldeath.abstractcellkiller import AbstractCellKiller
+
+
+class AgeKiller(AbstractCellKiller):
+    def __init__(self, max_age, cell_types=None):
+        """
+        Kills the cells that are older than max_age
+
+        :param max_age:
+        :param cell_types:
+        """
+        super().__init__(cell_types)
+        self.max_age = max_age
+
+    def make_kill_list(self, t):
+        return t.gpu.C_age > self.max_age
@@ -0,0 +1,18 @@
+from biobots2D.components.cell.celldeath.abstractcellkiller import AbstractCellKiller
+
+
+class AreaKiller(AbstractCellKiller):
+    def __init__(self, fraction, cell_types=None):
+        """
+        Kills the cells that are squeezed below fraction of their target area, a simple form of
+        apoptosis under compression
+
+        :param fraction:
+        :param cell_types:
+        """
+        super().__init__(cell_types)
+        self.fraction = fraction
+
+    def make_kill_list(self, t):
+        gpu = t.gpu
+        return gpu.C_area < self.fraction * gpu.C_target_area
@@ -0,0 +1,38 @@
+import cupy as cp
+
+from biobots2D.components.cell.celldeath.abstracttissuelevelcellkiller import \
+    AbstractTissueLevelCellKiller
+from biobots2D.components.cudaspacepartition import CudaSpacePartition
+
+
+class FoodConsumption(AbstractTissueLevelCellKiller):
+    def __init__(self, radius, food_type=3, eater_types=(2, 4)):
+        """
+        The food is eaten: a food cell dies once the centre of a cell of the bot is within
+        radius of its centre. In an ensemble only cells of the same replica eat each other
+
+        :param radius:
+        :param food_type:
+        :param eater_types: the cell types that eat, cilia and sensor cells by default
+        """
+        self.radius = radius
+        self.food_type = food_type
+        self.eater_types = cp.array(eater_types)
+        self.boxes = CudaSpacePartition(radius)
+
+    def kill_cells(self, t):
+        gpu = t.gpu
+        C_pos = cp.mean(gpu.N_pos[gpu.C_node_idxs], axis=1)
+
+        food = cp.where(gpu.C_type == self.food_type)[0]
+        eaters = cp.where(cp.isin(gpu.C_type, self.eater_types))[0]
+        kill = cp.zeros(gpu.C_type.shape[0], dtype=cp.bool_)
+        if food.shape[0] == 0 or eaters.shape[0] == 0:
+            return kill
+
+        # Only the eaters in the boxes around each food cell are compared with it
+        E_idxs, F_idxs = self.boxes.get_points_within(C_pos[eaters], C_pos[food], self.radius)
+        same_replica = gpu.C_replica[food[F_idxs]] == gpu.C_replica[eaters[E_idxs]]
+
+        kill[food[F_idxs[same_replica]]] = True
+        return kill
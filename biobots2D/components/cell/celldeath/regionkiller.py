@@ -0,0 +1,24 @@
+import cupy as cp
+
+from biobots2D.components.cell.celldeath.abstractcellkiller import AbstractCellKiller
+
+
+class RegionKiller(AbstractCellKiller):
+    def __init__(self, lower, upper, cell_types=None):
+        """
+        Kills the cells whose centre has left the rectangle from lower to upper, e.g. to keep a
+        growing tissue within the field of view
+
+        :param lower: (x, y) of the lower left corner
+        :param upper: (x, y) of the upper right corner
+        :param cell_types:
+        """
+        super().__init__(cell_types)
+        self.lower = cp.array(lower, dtype=cp.float32)
+        self.upper = cp.array(upper, dtype=cp.float32)
+
+    def make_kill_list(self, t):
+        # From the node positions, the cached cell positions belong to the start of the step. In
+        # an ensemble, every replica has its own rectangle
+        C_pos = cp.mean(t.gpu.local_positions()[t.gpu.C_node_idxs], axis=1)
+        return cp.any((C_pos < self.lower) | (C_pos > self.upper), axis=1)
@@ -1,7 +1,10 @@
 from biobots2D.components.cell.abstractcell import AbstractCell
 from biobots2D.components.cell.celldata.cellarea import CellArea
+from biobots2D.components.cell.celldata.cellaspectratio import CellAspectRatio
 from biobots2D.components.cell.celldata.cellcentre import CellCentre
+from biobots2D.components.cell.celldata.cellorientation import CellOrientation
 from biobots2D.components.cell.celldata.cellperimeter import CellPerimeter
+from biobots2D.components.cell.celldata.cellsecondmoments import CellSecondMoments
 from biobots2D.components.cell.celldata.targetarea import TargetArea
 from biobots2D.components.cell.celldata.targetperimeter import TargetPerimeter
 from biobots2D.components.cell.divisionnode.abstractsplitnode import AbstractSplitNode
@@ -11,6 +14,8 @@ from utils import TodoException
 
 
 class CellFree(AbstractCell):
+    __slots__ = ('cell_data_array', 'num_nodes', 'split_node_function')
+
     def __init__(self, *args):
         super().__init__()
         if len(args) == 3:
@@ -24,7 +29,8 @@ class CellFree(AbstractCell):
         self.ancestor_id = id_
 
         self.cell_data_array = [CellArea(), CellPerimeter(), CellCentre(), TargetPerimeter(),
-                                TargetArea()]
+                                TargetArea(), CellSecondMoments(), CellAspectRatio(),
+                                CellOrientation()]
 
         self.add_cell_data(self.cell_data_array)
 
@@ -1,11 +1,22 @@
 import torch
 from torch import tensor
 
+from biobots2D.components.arrayfield import ArrayField
 from biobots2D.components.node.node import Node
 from utils import TodoException
 
 
 class Element:
+    # A scene has many elements, so they have no __dict__
+    __slots__ = ('memory', 'memory_idx', 'id', 'eta_d', 'node_1', 'node_2', 'old_node_1',
+                 'old_node_2', 'modified_in_division', '_natural_length', '_stiffness',
+                 '_minimum_length', 'cell_list', 'internal', 'is_membrane', 'pointing_forward')
+
+    # Once the element is bound to a memory, these are read from its row in the element arrays
+    natural_length = ArrayField('E_natural_length', tensor=False)
+    stiffness = ArrayField('E_stiffness', tensor=False)
+    minimum_length = ArrayField('E_minimum_length', tensor=False)
+
     def __init__(self, node_1, node_2, id, pointing_forward=None):
         """
         All the initilising
@@ -38,6 +49,10 @@ class Element:
 
         self.id = id
 
+        # The simulation memory and the row of this element in it, see CudaMemory.bind
+        self.memory = None
+        self.memory_idx = None
+
         # The 'total drag' for the element at the centre of drag. This will be constant for an
         # element, unless the coeficient of drag is changed for a node
         self.eta_d = None
@@ -59,7 +74,6 @@ class Element:
 
         self.minimum_length = 0.2
 
-        self.node_list = [self.node_1, self.node_2]
         self.cell_list = []
 
         self.internal = False
@@ -94,11 +108,15 @@ class Element:
         """
         raise TodoException
 
+    @property
+    def node_list(self):
+        return [self.node_1, self.node_2]
+
     def set_natural_length(self, len_):
-        raise TodoException
+        self.natural_length = len_
 
     def get_natural_length(self):
-        raise TodoException
+        return self.natural_length
 
     def get_length(self):
         return torch.sum((self.node_1.position - self.node_2.position) ** 2) ** .5
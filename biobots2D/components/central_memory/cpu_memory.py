@@ -90,18 +90,12 @@ class CPUMemory:
         self._t = 0.
         self.spice = 0.
 
-    def clear_dynamic_memory(self, t):
-        self._vector_1_to_2 = None
-        self._outward_normal = None
-        self._element_length = None
-        self._C_area = None
-        self._C_perimeter = None
-        self._C_target_area = None
-        self._C_target_perimeter = None
-        self._C_pos = None
-        self._polygons = None
-        self._E_length = None
-        self._candidates = None
+    def clear_dynamic_memory(self, t, keep=()):
+        for name in ('_vector_1_to_2', '_outward_normal', '_element_length', '_C_area',
+                     '_C_perimeter', '_C_target_area', '_C_target_perimeter', '_C_pos',
+                     '_polygons', '_E_length', '_candidates'):
+            if name not in keep:
+                setattr(self, name, None)
         self._t = t
 
     @property
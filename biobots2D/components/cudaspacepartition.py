@@ -1,26 +1,233 @@
-from utils import TodoException
 import cupy as cp
+import cupyx
+
+
+def cross(u: cp.ndarray, v: cp.ndarray) -> cp.ndarray:
+    return u[:, 0] * v[:, 1] - u[:, 1] * v[:, 0]
+
+
+def time_of_impact(P0, P1, A0, A1, B0, B1):
+    """
+    The first time s in (0, 1] at which a node moving from P0 to P1 lies on an element moving
+    from A0B0 to A1B1, with all points moving linearly over the step. The node is on the line
+    through the element when
+        cross(B(s) - A(s), P(s) - A(s)) = a s^2 + b s + c = 0
+    and on the element itself when its projection falls between A(s) and B(s)
+    :return: the time of impact of every pair, inf for pairs that do not collide
+    """
+    e0 = B0 - A0
+    de = B1 - A1 - e0
+    p0 = P0 - A0
+    dp = P1 - A1 - p0
+
+    a = cross(de, dp)
+    b = cross(e0, dp) + cross(de, p0)
+    c = cross(e0, p0)
+
+    # Both roots of the quadratic without cancellation, and the root of the linear equation
+    # for when the quadratic term vanishes
+    disc = b * b - 4 * a * c
+    q = -0.5 * (b + cp.where(b < 0, -1., 1.) * cp.sqrt(cp.maximum(disc, 0.)))
+    linear = cp.abs(a) <= 1e-12 * (cp.abs(b) + cp.abs(c))
+    roots = cp.stack((cp.where(linear, -c / b, q / a), cp.where(linear, cp.inf, c / q)))
+
+    def on_element(s):
+        e = e0 + s[:, None] * de
+        p = p0 + s[:, None] * dp
+        t = cp.sum(e * p, axis=1) / cp.sum(e * e, axis=1)
+        return (0. < s) & (s <= 1.) & (0. <= t) & (t <= 1.)
+
+    valid = cp.stack([on_element(s) for s in roots]) & (linear | (disc >= 0.))[None, :]
+    return cp.min(cp.where(valid, roots, cp.inf), axis=0)
+
+
+def clamp_to_impact(P0, P1, N_idxs, E_node_1, E_node_2, safety):
+    """
+    Moves every node of a colliding node-element pair back along its path to safety times the
+    earliest time of impact it takes part in. The node and both end nodes of the element are
+    moved back together, so it makes no difference whether the node runs into the element or
+    the element into the node
+    :param P0: (N, 2) positions at the start of the step
+    :param P1: (N, 2) positions at the end of the step
+    :param N_idxs: the node of every candidate pair
+    :param E_node_1: the first end node of the element of every candidate pair
+    :param E_node_2: the second end node of the element of every candidate pair
+    :param safety: the fraction of the time of impact to move, below 1
+    :return: (positions, hit), the new end positions and whether any pair collided
+    """
+    toi = time_of_impact(P0[N_idxs], P1[N_idxs], P0[E_node_1], P1[E_node_1], P0[E_node_2],
+                         P1[E_node_2])
+
+    N_toi = cp.full(P1.shape[0], cp.inf, dtype=toi.dtype)
+    for idxs in (N_idxs, E_node_1, E_node_2):
+        cupyx.scatter_min(N_toi, idxs, toi)
+
+    free = cp.isinf(N_toi)
+    clamped = P0 + (safety * cp.minimum(N_toi, 1.))[:, None] * (P1 - P0)
+    return cp.where(free[:, None], P1, clamped).astype(P1.dtype), ~cp.all(free)
+
 
 class CudaSpacePartition:
-    def __init__(self, cpu, N, E1, E2):
-        self.dx = cp.float32(cpu.dx)
-        self.dy = cp.float32(cpu.dy)
+    """
+    A vectorised counterpart of SpacePartition. Instead of keeping nodes and elements in boxes
+    that are updated one node at a time, the boxes are rebuilt from the node positions in a
+    single pass every time the neighbourhood is queried. This is cheap, because it is only a
+    sort of the nodes by box key, and it avoids the dense N x E candidate matrix.
+
+    The box size is chosen each query so that every point within d_limit of an element lies in
+    the 3 x 3 block of boxes around the box that holds the element mid point. The query then
+    costs O(N log N + E + pairs) rather than O(N * E)
+    """
+
+    # Offsets to the 3 x 3 block of boxes around a box
+    DX = cp.array([-1, -1, -1, 0, 0, 0, 1, 1, 1], dtype=cp.int64)
+    DY = cp.array([-1, 0, 1, -1, 0, 1, -1, 0, 1], dtype=cp.int64)
+
+    def __init__(self, d_limit):
+        self.d_limit = cp.float32(d_limit)
+
+        # The boxes from the most recent call to put_nodes_in_boxes
+        self.box_size = None
+        self.lower_corner = None
+        self.n_rows = None
+        self.sorted_keys = None
+        self.sorted_nodes = None
+
+    def get_neighbouring_elements(self, N_pos: cp.ndarray, E_node_1: cp.ndarray,
+                                  E_node_2: cp.ndarray):
+        """
+        Finds every node-element pair where the node lies within d_limit of the element and its
+        projection falls on the element. Nodes are never paired with their own element.
+
+        :param N_pos: node positions (N x 2)
+        :param E_node_1: index of the first node of each element (E,)
+        :param E_node_2: index of the second node of each element (E,)
+        :return: (N_idxs, E_idxs) the node and element index of each pair
+        """
+        N_idxs, E_idxs = self.assemble_candidate_elements(N_pos, E_node_1, E_node_2)
+
+        start = N_pos[E_node_1[E_idxs]]
+        end = N_pos[E_node_2[E_idxs]]
+        line_vec = end - start
+        pnt_vec = N_pos[N_idxs] - start
+        line_len_sq = cp.sum(line_vec ** 2, axis=1)
+        t = cp.sum(line_vec * pnt_vec, axis=1) / line_len_sq
+        nearest = line_vec * t[:, None]
+        dist = cp.linalg.norm(nearest - pnt_vec, axis=1)
+
+        keep = (0. <= t) & (t <= 1.) & (dist < self.d_limit) \
+               & (N_idxs != E_node_1[E_idxs]) & (N_idxs != E_node_2[E_idxs])
+        keep = cp.where(keep)[0]
+
+        return N_idxs[keep], E_idxs[keep]
+
+    def get_swept_candidates(self, N_pos_start: cp.ndarray, N_pos_end: cp.ndarray,
+                             E_node_1: cp.ndarray, E_node_2: cp.ndarray):
+        """
+        The broad phase for continuous collision detection. Every node that could meet an
+        element while both move from their start to their end positions is paired with it: the
+        search radius is grown by the largest distance any two points can close in the step
+
+        :param N_pos_start:
+        :param N_pos_end:
+        :param E_node_1:
+        :param E_node_2:
+        :return: (N_idxs, E_idxs) candidate pairs, without the nodes of the element itself
+        """
+        displacement = cp.max(cp.linalg.norm(N_pos_end - N_pos_start, axis=1))
+        N_idxs, E_idxs = self.assemble_candidate_elements(N_pos_start, E_node_1, E_node_2,
+                                                          self.d_limit + 2 * displacement)
+        keep = cp.where((N_idxs != E_node_1[E_idxs]) & (N_idxs != E_node_2[E_idxs]))[0]
+        return N_idxs[keep], E_idxs[keep]
+
+    def assemble_candidate_elements(self, N_pos: cp.ndarray, E_node_1: cp.ndarray,
+                                    E_node_2: cp.ndarray, margin=None):
+        """
+        The broad phase. Pairs each element with every node in the 3 x 3 block of boxes around
+        its mid point.
+
+        :param N_pos:
+        :param E_node_1:
+        :param E_node_2:
+        :param margin: the distance from the element within which nodes must be found, d_limit
+        by default
+        :return: (N_idxs, E_idxs) candidate pairs, sorted by element
+        """
+        margin = self.d_limit if margin is None else margin
+        start = N_pos[E_node_1]
+        end = N_pos[E_node_2]
+        half_length = cp.max(cp.sum((end - start) ** 2, axis=1)) ** .5 / 2
+        self.put_nodes_in_boxes(N_pos, half_length + margin)
+
+        return self.nodes_in_blocks(self.get_box_indices(0.5 * (start + end)))
+
+    def get_points_within(self, points: cp.ndarray, queries: cp.ndarray, radius):
+        """
+        Pairs every query position with every point within radius of it, the point to point
+        counterpart of get_neighbouring_elements
+
+        :param points: (P x 2)
+        :param queries: (Q x 2)
+        :param radius:
+        :return: (P_idxs, Q_idxs) the point and query index of each pair
+        """
+        self.put_nodes_in_boxes(points, radius)
+        P_idxs, Q_idxs = self.nodes_in_blocks(self.get_box_indices(queries))
+        keep = cp.linalg.norm(points[P_idxs] - queries[Q_idxs], axis=1) < radius
+        keep = cp.where(keep)[0]
+        return P_idxs[keep], Q_idxs[keep]
+
+    def nodes_in_blocks(self, boxes: cp.ndarray):
+        """
+        Pairs each box with every node in the 3 x 3 block of boxes around it, from the boxes of
+        the most recent call to put_nodes_in_boxes
+
+        :param boxes: (B x 2) the (column, row) of each box
+        :return: (N_idxs, B_idxs) candidate pairs, sorted by box
+        """
+        keys = (boxes[:, 0, None] + self.DX[None, :]) * self.n_rows \
+               + (boxes[:, 1, None] + self.DY[None, :])
 
-    def get_neighbouring_elements(self, n: cp.ndarray, r: cp.float32):
+        # The nodes in a box are a contiguous run of the sorted keys
+        first = cp.searchsorted(self.sorted_keys, keys.ravel(), side='left')
+        last = cp.searchsorted(self.sorted_keys, keys.ravel(), side='right')
+        counts = last - first
 
+        # Expand every (box, neighbour) run into one entry per node without a Python loop
+        run_end = cp.cumsum(counts)
+        total = int(run_end[-1]) if run_end.shape[0] else 0
+        entry = cp.arange(total, dtype=cp.int64)
+        run = cp.searchsorted(run_end, entry, side='right')
+        offset = entry - (run_end - counts)[run]
 
+        N_idxs = self.sorted_nodes[first[run] + offset]
+        B_idxs = run // self.DX.shape[0]
+        return N_idxs, B_idxs
 
-        raise TodoException
+    def put_nodes_in_boxes(self, N_pos: cp.ndarray, box_size):
+        """
+        Sorts all the nodes by the key of the box they are in
 
-    def assemble_candidate_elements(self, n: cp.ndarray, r: cp.float32):
-        raise TodoException
+        :param N_pos:
+        :param box_size:
+        :return:
+        """
+        self.box_size = box_size
 
-    def quick_unique(self, b):
-        raise TodoException
+        # Leave a margin of one box so the neighbours of every box have non-negative indices
+        self.lower_corner = cp.floor(cp.min(N_pos, axis=0) / box_size).astype(cp.int64) - 1
+        N_box = self.get_box_indices(N_pos)
+        self.n_rows = cp.max(N_box[:, 1]) + 2
 
-    def put_node_in_box(self, b):
-        raise TodoException
+        keys = N_box[:, 0] * self.n_rows + N_box[:, 1]
+        self.sorted_nodes = cp.argsort(keys)
+        self.sorted_keys = keys[self.sorted_nodes]
 
-    def put_element_in_boxes(self, e):
-        raise TodoException
+    def get_box_indices(self, pos: cp.ndarray):
+        """
+        The (column, row) of the box that contains each position
 
+        :param pos:
+        :return:
+        """
+        return cp.floor(pos / self.box_size).astype(cp.int64) - self.lower_corner[None, :]
@@ -1,5 +1,7 @@
 from abc import ABC, abstractmethod
 
+import cupy as cp
+
 from biobots2D.components.simulation.cuda_memory import CudaMemory
 
 
@@ -12,3 +14,24 @@ class AbstractCellBasedForce(ABC):
     @abstractmethod
     def add_cell_based_forces(self, cell_list: list, gpu: CudaMemory):
         pass
+
+    def energy(self, gpu: CudaMemory):
+        """
+        The energy stored by this force, evaluated from the same cached quantities as the force
+        itself. Forces that are not the gradient of a potential return zeros
+
+        :param gpu:
+        :return: (energies, total) where energies holds one value per cell and total is
+        their sum as a 0-d array, so it can be reduced further without copying to the host
+        """
+        energies = cp.zeros(gpu.C_type.shape[0], dtype=cp.float32)
+        return energies, cp.sum(energies)
+
+    def set_dt(self, dt):
+        """
+        Called when the simulation changes its time step. Forces that keep their own copy of dt
+        override this
+        :param dt:
+        :return:
+        """
+        pass
@@ -1,11 +1,13 @@
-# import cupy as cp
-import numpy as cp
-from biobots2D.components.forces.cellbasedforce.abstractcellbasedforce import AbstractCellBasedForce
+import cupy as cp
 
-from biobots2D.components.simulation.cuda_memory import CudaMemory
+from biobots2D.components.forces.cellbasedforce.abstractcellbasedforce import AbstractCellBasedForce
+from biobots2D.components.simulation.cuda_memory import CudaMemory, per_replica, scatter_add
 
 
 class CiliaPropagationForce(AbstractCellBasedForce):
+    # Parameters that may differ between the replicas of an ensemble
+    replica_parameters = ('propagation_magnitude',)
+
     def __init__(self, propagation_magnitude):
         self.propagation_magnitude = cp.float32(propagation_magnitude)
 
@@ -16,24 +18,30 @@ class CiliaPropagationForce(AbstractCellBasedForce):
         :param gpu:
         :return:
         """
-        candidates = gpu.candidates
-        blocked = cp.any(candidates, axis=0)
+        # Cilia are blocked by any node within interaction range of their element
+        blocked = gpu.E_blocked
 
         # magnitude = sigmoid(
         #     gpu.C_inhibitory[gpu.E_cell_idx] * gpu.spice) \
         #             * self.propagation_magnitude
-        magnitude = self.propagation_magnitude
-
-
-        F = gpu.vector_1_to_2 * gpu.E_cilia_direction[:, None] * magnitude
-        F = cp.where(blocked[:,None], cp.zeros_like(F), F)
-        if gpu.spice > 0.5:
-            F = cp.where((gpu.C_inhibitory[gpu.E_cell_idx] == 1)[:,None], cp.zeros_like(F), F)
-        else:
-            F = cp.where((gpu.C_inhibitory[gpu.E_cell_idx] == -1)[:,None], cp.zeros_like(F), F)
+        magnitude = per_replica(self.propagation_magnitude, gpu.E_replica)
 
+        # Choose the inhibited side on the device, so spice never has to be copied to the host
+        inhibited = cp.where(gpu.spice[gpu.E_replica] > 0.5, gpu.E_inhibitory == 1,
+                             gpu.E_inhibitory == -1)
 
-        gpu.N_for[gpu.E_node_1] += F / 2
-        gpu.N_for[gpu.E_node_2] += F / 2
+        F = gpu.vector_1_to_2 * (gpu.E_cilia_direction * magnitude)[:, None]
+        F = cp.where((blocked | inhibited)[:, None], cp.zeros_like(F), F)
 
+        scatter_add(gpu.N_for, gpu.E_node_1, F / 2)
+        scatter_add(gpu.N_for, gpu.E_node_2, F / 2)
 
+    def energy(self, gpu: CudaMemory):
+        """
+        The cilia drive the bot, rather than pulling it towards a minimum, so there is no
+        potential. Every cell gets zero energy
+        :param gpu:
+        :return:
+        """
+        U = cp.zeros(gpu.C_type.shape, dtype=cp.float32)
+        return U, cp.sum(U)
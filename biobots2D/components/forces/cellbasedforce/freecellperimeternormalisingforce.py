@@ -60,9 +60,27 @@ class FreeCellPerimeterNormalisingForce(AbstractCellBasedForce):
 
         # mag = self.spring_rate_cuda * ((p @ gpu.cell2element) - l)
 
-        mag = self.spring_rate_cuda * cp.log(l / (p @ gpu.cell2element)) / cp.log(0.5)
+        mag = self.spring_rate_cuda * cp.log(l / p[gpu.E_cell_idx]) / cp.log(0.5)
 
 
         force = unit_vector_1_to_2 * mag[:, None]
         gpu.N_for[gpu.E_node_1] -= force
         gpu.N_for[gpu.E_node_2] += force
+
+    def energy(self, gpu: CudaMemory):
+        """
+        The tension in an element of length l is k * log(l / p) / log(2), with p the mean edge
+        length of its cell. Holding p fixed, the energy of the element is the integral of the
+        tension
+        U = k / log(2) * (l * log(l / p) - l + p)
+        which is zero when the edge has the mean length. The element energies are summed per cell
+        :param gpu:
+        :return:
+        """
+        p = gpu.C_perimeter / gpu.C_node_idxs.shape[1]
+        p = p[gpu.E_cell_idx]
+        l = gpu.element_length
+
+        U = self.spring_rate_cuda * (l * cp.log(l / p) - l + p) / -cp.log(0.5)
+        U = cp.bincount(gpu.E_cell_idx, weights=U, minlength=gpu.C_type.shape[0])
+        return U, cp.sum(U)
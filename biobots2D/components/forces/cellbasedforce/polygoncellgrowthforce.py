@@ -6,7 +6,7 @@ from numba import float32, guvectorize
 
 from biobots2D.components.cell.abstractcell import AbstractCell
 from biobots2D.components.forces.cellbasedforce.abstractcellbasedforce import AbstractCellBasedForce
-from biobots2D.components.simulation.cuda_memory import CudaMemory
+from biobots2D.components.simulation.cuda_memory import CudaMemory, scatter_add
 
 
 @guvectorize([(float32[:], float32[:], float32, float32[:])], '(n),(n),()->(n)', target="cuda")
@@ -114,12 +114,8 @@ class PolygonCellGrowthForce(AbstractCellBasedForce):
         v = u @ self.orthogonal_inwards
         F = -v * magnitude[:, None, None]
 
-        # broadcast from node_idxs in cell_lists to node idxs in N_for
-        F = F[:, None, :, :]
-        F = cp.einsum('ijk...,ikl...->ijl...', F, gpu.cell2node[:, :, :, None]).squeeze(1)
-        F = cp.sum(F, axis=0)
-
-        gpu.N_for += F
+        # scatter from node_idxs in cell_lists to node idxs in N_for
+        scatter_add(gpu.N_for, gpu.C_node_idxs.ravel(), F.reshape(-1, 2))
 
     def add_target_perimeter_forces(self, c: AbstractCell):
         """
@@ -152,15 +148,11 @@ class PolygonCellGrowthForce(AbstractCellBasedForce):
         r = gpu.vector_1_to_2
 
         # broadcast to elements per cell
-        F = r * (magnitude @ gpu.cell2element)[:, None]
-
-        # broadcast to nodes
-        F = cp.sum(F[:, None, :, None] * gpu.element2node[:, :, None, :], axis=0)
+        F = r * magnitude[gpu.E_cell_idx][:, None]
 
-        F_node_1 = F[:, :, 0]
-        F_node_2 = -F[:, :, 1]
-
-        gpu.N_for += F_node_1 + F_node_2
+        # scatter to nodes
+        scatter_add(gpu.N_for, gpu.E_node_1, F)
+        scatter_add(gpu.N_for, gpu.E_node_2, -F)
 
     def add_surface_tension_forces(self, c):
         """
@@ -204,14 +196,21 @@ class PolygonCellGrowthForce(AbstractCellBasedForce):
 
     def add_surface_tension_forces_cuda(self, gpu: CudaMemory):
         r = gpu.vector_1_to_2
-        surface_tension_energy_parameter = self.surface_tension_energy_parameter
         F = self.surface_tension_energy_parameter * r
 
-        A = F[:, None, :, None] * gpu.element2node[:, :, None, :]
-
-        F = cp.sum(F[:, None, :, None] * gpu.element2node[:, :, None, :], axis=0)
-        F_node_1 = F[:, :, 0]
-        F_node_2 = -F[:, :, 1]
-        F = F_node_1 + F_node_2
+        scatter_add(gpu.N_for, gpu.E_node_1, F)
+        scatter_add(gpu.N_for, gpu.E_node_2, -F)
 
-        gpu.N_for += F
+    def energy(self, gpu: CudaMemory):
+        """
+        The Nagai-Honda energy of each cell, the sum of the three terms whose gradients are the
+        forces above
+        U = \alpha (A - A_0)^2 + \beta (p - P_0)^2 + \sigma p
+        :param gpu:
+        :return:
+        """
+        U = self.area_energy_parameter_gpu * (gpu.C_area - gpu.C_target_area) ** 2 \
+            + self.perimeter_energy_parameter_gpu_x2 / 2 \
+            * (gpu.C_perimeter - gpu.C_target_perimeter) ** 2 \
+            + self.surface_tension_energy_parameter_gpu * gpu.C_perimeter
+        return U, cp.sum(U)
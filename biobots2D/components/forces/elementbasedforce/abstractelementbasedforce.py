@@ -1,5 +1,9 @@
 from abc import abstractmethod, ABC
 
+import cupy as cp
+
+from biobots2D.components.simulation.cuda_memory import CudaMemory
+
 
 class AbstractElementBasedForce(ABC):
     """
@@ -7,5 +11,26 @@ class AbstractElementBasedForce(ABC):
     each cell, or the whole population)
     """
     @abstractmethod
-    def add_element_based_forces(self, element_list:list):
-        pass
\ No newline at end of file
+    def add_element_based_forces(self, element_list: list, gpu: CudaMemory):
+        pass
+
+    def energy(self, gpu: CudaMemory):
+        """
+        The energy stored by this force, evaluated from the same cached quantities as the force
+        itself. Forces that are not the gradient of a potential return zeros
+
+        :param gpu:
+        :return: (energies, total) where energies holds one value per element and total is
+        their sum as a 0-d array, so it can be reduced further without copying to the host
+        """
+        energies = cp.zeros(gpu.E_node_1.shape[0], dtype=cp.float32)
+        return energies, cp.sum(energies)
+
+    def set_dt(self, dt):
+        """
+        Called when the simulation changes its time step. Forces that keep their own copy of dt
+        override this
+        :param dt:
+        :return:
+        """
+        pass
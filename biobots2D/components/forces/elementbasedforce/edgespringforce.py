@@ -0,0 +1,132 @@
+from typing import List
+
+import cupy as cp
+import torch
+
+from biobots2D.components.cell.element import Element
+from biobots2D.components.forces.elementbasedforce.abstractelementbasedforce import \
+    AbstractElementBasedForce
+from biobots2D.components.simulation.cuda_memory import CudaMemory, scatter_add
+
+
+class EdgeSpringForce(AbstractElementBasedForce):
+    def __init__(self, nonlinear=False, use_minimum_length=True):
+        """
+        A spring along every element, pulling it towards its natural length. The stiffness,
+        natural length and minimum length are taken per element from the E_* arrays in memory,
+        so every element can have its own spring while all of them are evaluated together.
+
+        The tension in an element of length l is
+
+        linear:
+            k * (l - l0)
+        nonlinear:
+            k * l0 * log(l / l0)
+
+        The nonlinear spring has the same stiffness k at l = l0, but gets stiffer under
+        compression and softer under extension. When use_minimum_length is set, an extra
+        repulsion
+            - k * lmin * log(lmin / l)
+        is added for l < lmin. It grows without bound as l -> 0, so elements can not collapse
+        onto a single point
+
+        A positive tension pulls the two nodes of the element together
+
+        :param nonlinear: use the logarithmic spring instead of the linear spring
+        :param use_minimum_length: guard against elements shorter than their minimum length
+        """
+        self.nonlinear = nonlinear
+        self.use_minimum_length = use_minimum_length
+
+    def add_element_based_forces(self, element_list: List[Element], gpu: CudaMemory):
+        """
+        For each element in the list, calculate the force and add it to the nodes
+        :param element_list:
+        :param gpu:
+        :return:
+        """
+        if gpu.EXEC_CPU:
+            for e in element_list:
+                self.apply_spring_force(e)
+
+        self.apply_spring_force_cuda(gpu)
+
+    def apply_spring_force(self, e: Element):
+        """
+
+        :param e:
+        :return:
+        """
+        l = e.get_length()
+        l0 = e.natural_length
+        k = e.stiffness
+
+        if self.nonlinear:
+            mag = k * l0 * torch.log(l / l0)
+        else:
+            mag = k * (l - l0)
+
+        if self.use_minimum_length and l < e.minimum_length:
+            mag = mag - k * e.minimum_length * torch.log(e.minimum_length / l)
+
+        force = mag * e.get_vector_1_to_2()
+
+        e.node_1.add_force_contribution(force)
+        e.node_2.add_force_contribution(-force)
+
+    def apply_spring_force_cuda(self, gpu: CudaMemory):
+        mag = self.tension_cuda(gpu)
+
+        force = gpu.vector_1_to_2 * mag[:, None]
+        scatter_add(gpu.N_for, gpu.E_node_1, force)
+        scatter_add(gpu.N_for, gpu.E_node_2, -force)
+
+    def tension_cuda(self, gpu: CudaMemory):
+        """
+        The tension in every element, in one pass
+        :param gpu:
+        :return:
+        """
+        l = gpu.element_length
+        l0 = gpu.E_natural_length
+        k = gpu.E_stiffness
+
+        if self.nonlinear:
+            mag = k * l0 * cp.log(l / l0)
+        else:
+            mag = k * (l - l0)
+
+        if self.use_minimum_length:
+            lmin = gpu.E_minimum_length
+            guard = k * lmin * cp.log(lmin / cp.minimum(l, lmin))
+            mag = mag - guard
+
+        return mag
+
+    def energy(self, gpu: CudaMemory):
+        """
+        The energy stored in each spring, the integral of the tension
+        linear:
+            k / 2 * (l - l0)^2
+        nonlinear:
+            k * l0 * (l * log(l / l0) - l + l0)
+        minimum length guard, with l' = min(l, lmin):
+            k * lmin * (l' * log(l' / lmin) - l' + lmin)
+        :param gpu:
+        :return:
+        """
+        l = gpu.element_length
+        l0 = gpu.E_natural_length
+        k = gpu.E_stiffness
+
+        if self.nonlinear:
+            U = k * l0 * (l * cp.log(l / l0) - l + l0)
+        else:
+            U = k / 2 * (l - l0) ** 2
+
+        if self.use_minimum_length:
+            lmin = gpu.E_minimum_length
+            l_ = cp.minimum(l, lmin)
+            U = U + k * lmin * (l_ * cp.log(l_ / lmin) - l_ + lmin)
+
+        return U, cp.sum(U)
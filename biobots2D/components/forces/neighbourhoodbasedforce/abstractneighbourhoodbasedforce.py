@@ -1,5 +1,8 @@
 from abc import ABC, abstractmethod
 
+import cupy as cp
+
+from biobots2D.components.simulation.cuda_memory import CudaMemory
 from utils import TodoException
 
 
@@ -13,6 +16,28 @@ class AbstractNeighbourhoodBasedForce(ABC):
     def add_neighbourhood_based_forces(self, node_list, p=None, gpu=None):
         pass
 
+    def energy(self, gpu: CudaMemory):
+        """
+        The energy stored by this force, evaluated from the same cached quantities as the force
+        itself. Forces that are not the gradient of a potential return zeros
+
+        :param gpu:
+        :return: (energies, total) where energies holds one value per node-element pair and
+        total is their sum as a 0-d array, so it can be reduced further without copying to the
+        host
+        """
+        energies = cp.zeros(gpu.pairs[0].shape[0], dtype=cp.float32)
+        return energies, cp.sum(energies)
+
+    def set_dt(self, dt):
+        """
+        Called when the simulation changes its time step. Forces that keep their own copy of dt
+        override this
+        :param dt:
+        :return:
+        """
+        pass
+
     def apply_forces_to_node_and_element(self, n, e, Fa, nltoA):
         """
         This takes a node, an element, a force, and a point and uses them to work out the forces
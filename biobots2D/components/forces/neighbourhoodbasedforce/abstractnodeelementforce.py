@@ -17,6 +17,9 @@ class AbstractNodeElementForce(AbstractNeighbourhoodBasedForce, ABC):
         self.r = None
         self.dt = None
 
+    def set_dt(self, dt):
+        self.dt = dt
+
     def apply_forces_to_node_and_element(self, n: Node, e: Element, Fa: Tensor, n1toA: Tensor):
         """
         This takes a node, an element, a force and a point and uses them to work out the forces
@@ -111,6 +111,10 @@ class CellCellInteractionForce(AbstractNodeElementForce):
         # cuda placeholders
         self.Fa = None
 
+    def set_dt(self, dt):
+        self.dt = dt
+        self.dt_cuda = cp.float32(dt)
+
     def add_neighbourhood_based_forces(self, node_list: List[Node],
                                        p: Union[SpacePartition, None] = None,
                                        gpu: CudaMemory = None):
@@ -198,30 +202,7 @@ class CellCellInteractionForce(AbstractNodeElementForce):
         self.apply_forces_to_node_and_element_cuda(gpu, N_idxs, E_idxs, Fa, n1toA)
 
     def get_neighbouring_elements_cuda(self, gpu: CudaMemory):
-        candidates = gpu.candidates
-
-        # candidates = cp.ones((gpu.N_pos.shape[0], gpu.E_node_1.shape[0]), dtype=cp.bool)
-        #
-        # # find nodes in element interaction regions
-        # pnt = gpu.N_pos
-        # start = gpu.N_pos[gpu.E_node_1]
-        # end = gpu.N_pos[gpu.E_node_2]
-        # line_vec = end - start
-        # pnt_vec = pnt[:, None] - start[None, :]
-        # line_len = cp.linalg.norm(line_vec, axis=1)
-        # line_unitvec = line_vec / line_len[:, None]
-        # pnt_vec_scaled = pnt_vec / line_len[None, :, None]
-        # t = cp.sum(line_unitvec[None, :, :] * pnt_vec_scaled, axis=2)
-        # nearest = line_vec[None, :, :] * t[:, :, None]
-        # dist = cp.linalg.norm(nearest - pnt_vec, axis=2)
-        # candidates = candidates & (0. <= t) & (t <= 1.) & (dist < self.d_limit_cuda)
-        #
-        # # same element
-        # # same_cell = cp.sum(gpu.cell2node.T[None, :] * gpu.cell2node.T[:, None], axis=2) > 0.5
-        #
-        # candidates = candidates & ~ gpu.node2element_mask
-        idxs = cp.argwhere(candidates)
-        N_idxs, E_idxs = idxs[:, 0], idxs[:, 1]
+        N_idxs, E_idxs = gpu.pairs
         return N_idxs, E_idxs
 
     def force_law(self, x, internal):
@@ -280,6 +261,54 @@ class CellCellInteractionForce(AbstractNodeElementForce):
 
         return Fa
 
+    def energy(self, gpu: CudaMemory):
+        """
+        The potential of the force law, U(x) = integral from x to dLim of F, so that -dU/dx
+        gives the scalar force in force_law_cuda. With w = x - dAsym, R = dSep - dAsym,
+        Ra = dLim - dSep and a = c / dSep
+
+        if dSep < x < dLim
+            sra / Ra * (G(dSep - x) - G(dSep - dLim)), G(z) = exp(a*z) * (z/a - 1/a^2)
+        if dAsym < x < dSep
+            srr * (R - w + w * log(w / R)) + U(dSep)
+
+        The repulsion is shifted by the depth of the attraction well, so U is continuous at
+        dSep. Internal pairs feel no repulsion, so they sit at the bottom of the well, and pairs
+        outside (dAsym, dLim) contribute nothing, matching the force
+        :param gpu:
+        :return:
+        """
+        N_idxs, E_idxs = self.get_neighbouring_elements_cuda(gpu)
+
+        n1ton = gpu.N_pos[N_idxs] - gpu.N_pos[gpu.E_node_1[E_idxs]]
+        x = cp.sum(n1ton * gpu.outward_normal[E_idxs], axis=1)
+
+        a = self.c_cuda / self.d_separation_cuda
+
+        def G(z):
+            return cp.exp(a * z) * (z / a - 1 / a ** 2)
+
+        well = self.spring_rate_attraction_cuda / self.attraction_range_cuda \
+               * (G(cp.float32(0.)) - G(self.d_separation_cuda - self.d_limit_cuda))
+
+        internal_mask = gpu.E_internal[E_idxs]
+        repulsion_mask = (self.d_asymptote_cuda < x) & (x < self.d_separation_cuda)
+        attraction_mask = (self.d_separation_cuda < x) & (x < self.d_limit_cuda)
+
+        U_att = self.spring_rate_attraction_cuda / self.attraction_range_cuda \
+                * (G(self.d_separation_cuda - x) - G(self.d_separation_cuda - self.d_limit_cuda))
+
+        # Clamp w so the log stays finite outside the repulsion range, where it is masked anyway
+        w = cp.maximum(x - self.d_asymptote_cuda, cp.float32(1e-12))
+        U_rep = self.spring_rate_repulsion_cuda \
+                * (self.repulsion_range_cuda - w + w * cp.log(w / self.repulsion_range_cuda))
+
+        U = cp.zeros(x.shape, dtype=cp.float32)
+        U = cp.where(attraction_mask, U_att, U)
+        U = cp.where(repulsion_mask & internal_mask, well, U)
+        U = cp.where(repulsion_mask & ~internal_mask, U_rep + well, U)
+        return U, cp.sum(U)
+
     def apply_forces_to_node_and_element_cuda(self, gpu: CudaMemory, N_idxs: cp.ndarray,
                                               E_idxs: cp.ndarray, Fa: cp.ndarray,
                                               n1toA: cp.ndarray):
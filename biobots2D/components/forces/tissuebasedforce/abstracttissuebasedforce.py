@@ -1,12 +1,41 @@
 from abc import ABC, abstractmethod
 
+import cupy as cp
+
+from biobots2D.components.simulation.cuda_memory import CudaMemory
+
 
 class AbstractTissueBasedForce(ABC):
     """
-    This class gives the details for how a force will be applied to each cell (as opposed to each
-    element, or the whole population)
+    This class gives the details for how a force will be applied to the whole population (as
+    opposed to each cell, or each element)
     """
 
     @abstractmethod
     def add_tissue_based_forces(self, tissue):
-        pass
\ No newline at end of file
+        """
+        :param tissue: the AbstractCellSimulation, whose memory holds the node arrays
+        :return:
+        """
+        pass
+
+    def energy(self, gpu: CudaMemory):
+        """
+        The energy stored by this force, evaluated from the same cached quantities as the force
+        itself. Forces that are not the gradient of a potential return zeros
+
+        :param gpu:
+        :return: (energies, total) where energies holds one value per node and total is
+        their sum as a 0-d array, so it can be reduced further without copying to the host
+        """
+        energies = cp.zeros(gpu.N_pos.shape[0], dtype=cp.float32)
+        return energies, cp.sum(energies)
+
+    def set_dt(self, dt):
+        """
+        Called when the simulation changes its time step. Forces that keep their own copy of dt
+        override this
+        :param dt:
+        :return:
+        """
+        pass
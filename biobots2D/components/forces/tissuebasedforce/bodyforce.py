@@ -0,0 +1,26 @@
+import cupy as cp
+
+from biobots2D.components.forces.tissuebasedforce.abstracttissuebasedforce import \
+    AbstractTissueBasedForce
+
+
+class BodyForce(AbstractTissueBasedForce):
+    def __init__(self, force):
+        """
+        A constant force applied to every node, like gravity or buoyancy
+
+        :param force: the (x, y) force on each node
+        """
+        self.force = cp.array(force, dtype=cp.float32)
+
+    def add_tissue_based_forces(self, tissue):
+        tissue.gpu.N_for += self.force[None, :]
+
+    def energy(self, gpu):
+        """
+        The potential -f . x of each node
+        :param gpu:
+        :return:
+        """
+        U = -cp.sum(gpu.local_positions() * self.force[None, :], axis=1)
+        return U, cp.sum(U)
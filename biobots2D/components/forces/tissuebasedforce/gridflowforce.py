@@ -0,0 +1,80 @@
+import cupy as cp
+
+from biobots2D.components.forces.tissuebasedforce.abstracttissuebasedforce import \
+    AbstractTissueBasedForce
+
+
+def bilinear_interpolation(grid: cp.ndarray, origin: cp.ndarray, spacing: cp.float32,
+                           pos: cp.ndarray):
+    """
+    Samples a field stored on a regular grid at every position at once. Grid point [i, j] sits
+    at origin + (i, j) * spacing. Positions outside the grid take the value at the nearest edge
+
+    :param grid: (nx, ny, ...) field values
+    :param origin: (x, y) position of grid point [0, 0]
+    :param spacing: distance between neighbouring grid points
+    :param pos: (N, 2) positions to sample
+    :return: (N, ...) sampled values
+    """
+    nx, ny = grid.shape[0], grid.shape[1]
+
+    # Fractional grid coordinates, clamped so the 2 x 2 stencil stays on the grid
+    g = (pos - origin[None, :]) / spacing
+    gx = cp.clip(g[:, 0], 0, nx - 1)
+    gy = cp.clip(g[:, 1], 0, ny - 1)
+    i = cp.minimum(cp.floor(gx).astype(cp.int64), nx - 2)
+    j = cp.minimum(cp.floor(gy).astype(cp.int64), ny - 2)
+    fx = (gx - i).reshape((-1,) + (1,) * (grid.ndim - 2))
+    fy = (gy - j).reshape((-1,) + (1,) * (grid.ndim - 2))
+
+    return (1 - fx) * (1 - fy) * grid[i, j] \
+        + fx * (1 - fy) * grid[i + 1, j] \
+        + (1 - fx) * fy * grid[i, j + 1] \
+        + fx * fy * grid[i + 1, j + 1]
+
+
+class GridFlowForce(AbstractTissueBasedForce):
+    def __init__(self, velocity_grid, origin, spacing):
+        """
+        The tissue is immersed in a fluid whose velocity varies in space. The velocity is
+        precomputed on a regular grid and sampled at the nodes with bilinear interpolation,
+        so the cost per step does not depend on how the field was made. Like UniformFlowForce,
+        a node in the flow feels a drag force eta * u
+
+        :param velocity_grid: (nx, ny, 2) fluid velocity at the grid points, at least 2 x 2
+        :param origin: (x, y) position of grid point [0, 0]
+        :param spacing: distance between neighbouring grid points
+        """
+        self.velocity_grid = None
+        self.origin = None
+        self.spacing = None
+        self.set_field(velocity_grid, origin, spacing)
+
+    def set_field(self, velocity_grid, origin, spacing):
+        """
+        Replace the flow field. The grid is copied to the device once, here
+
+        :param velocity_grid:
+        :param origin:
+        :param spacing:
+        :return:
+        """
+        self.velocity_grid = cp.asarray(velocity_grid, dtype=cp.float32)
+        self.origin = cp.array(origin, dtype=cp.float32)
+        self.spacing = cp.float32(spacing)
+
+    def add_tissue_based_forces(self, tissue):
+        gpu = tissue.gpu
+        # The field is the same for every replica of an ensemble
+        u = bilinear_interpolation(self.velocity_grid, self.origin, self.spacing,
+                                   gpu.local_positions())
+        gpu.N_for += gpu.N_eta[:, None] * u
+
+    def energy(self, gpu):
+        """
+        A general flow field is not the gradient of a potential, so every node gets zero energy
+        :param gpu:
+        :return:
+        """
+        U = cp.zeros(gpu.N_eta.shape, dtype=cp.float32)
+        return U, cp.sum(U)
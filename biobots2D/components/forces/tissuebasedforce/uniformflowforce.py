@@ -0,0 +1,30 @@
+import cupy as cp
+
+from biobots2D.components.forces.tissuebasedforce.abstracttissuebasedforce import \
+    AbstractTissueBasedForce
+
+
+class UniformFlowForce(AbstractTissueBasedForce):
+    def __init__(self, velocity):
+        """
+        The tissue is immersed in a fluid that flows with a constant velocity everywhere. In the
+        drag dominated regime a node is carried along with the fluid, which is the same as
+        applying a force eta * u to every node
+
+        :param velocity: the (x, y) velocity of the fluid
+        """
+        self.velocity = cp.array(velocity, dtype=cp.float32)
+
+    def add_tissue_based_forces(self, tissue):
+        gpu = tissue.gpu
+        gpu.N_for += gpu.N_eta[:, None] * self.velocity[None, :]
+
+    def energy(self, gpu):
+        """
+        A uniform flow acts like a constant force eta * u, so it has the potential
+        -eta * u . x per node
+        :param gpu:
+        :return:
+        """
+        U = -gpu.N_eta * cp.sum(gpu.local_positions() * self.velocity[None, :], axis=1)
+        return U, cp.sum(U)
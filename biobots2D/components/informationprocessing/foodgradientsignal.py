@@ -16,6 +16,12 @@ class FoodGradientSignal(AbstractSignal):
 
         dmatrix = cp.sum((S_pos[:, None, :] - F_pos[None, :, :]) ** 2, axis=2) ** .5
 
+        # Sensors only smell the food of their own replica
+        S_replica = gpu.C_replica[gpu.Ctype_4]
+        dmatrix *= S_replica[:, None] == gpu.C_replica[gpu.Ctype_3][None, :]
+
         # melange = 1 / (pi * (dmatrix + 1) ** 2 - pi * dmatrix ** 2)
         spice_production = dmatrix * gpu.C_inhibitory[gpu.Ctype_4][:,None]
-        gpu.spice = sigmoid(cp.sum(spice_production))
+        spice_production = cp.bincount(S_replica, weights=cp.sum(spice_production, axis=1),
+                                        minlength=gpu.n_replicas)
+        gpu.spice = sigmoid(spice_production)
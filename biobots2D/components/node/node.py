@@ -4,24 +4,42 @@ from typing import List
 import torch
 from torch import Tensor
 
+from biobots2D.components.arrayfield import ArrayField
 from biobots2D.components.node.nodedata.elementneighbours import ElementNeighbours
 from utils import TodoException
 
 
 class Node:
+    # A scene has many nodes, so they have no __dict__
+    __slots__ = ('memory', 'memory_idx', '_position', '_previous_position', '_force',
+                 '_previous_force', '_eta', 'id', 'element_list', 'cell_list', 'is_top_node',
+                 'node_adjusted', 'pre_adjusted_position', '_node_data')
+
+    # Once the node is bound to a memory, these are views of its row in the node arrays. Before
+    # that, only the position is made up front
+    position = ArrayField('N_pos')
+    previous_position = ArrayField('N_pos_previous', fallback='N_pos',
+                                   default=lambda n: n.position.clone())
+    force = ArrayField('N_for', default=lambda n: torch.zeros(2))
+    previous_force = ArrayField('N_for_previous', fallback='N_for',
+                                default=lambda n: torch.zeros(2))
+    eta = ArrayField('N_eta', tensor=False)
+
     def __init__(self, x: Tensor, y: Tensor, id_):
         """
         A class specifying the details about nodes
         """
-        self.x = x
-        self.y = y
+        # The simulation memory and the row of this node in it, see CudaMemory.bind
+        self.memory = None
+        self.memory_idx = None
+
         self.position = torch.tensor([x, y])
         # Need to give the node a previous position so elements can move to a new nox on the very
-        # first time step
-        self.previous_position = torch.tensor([x, y])
+        # first time step. Until it moves, that is a copy of the position, made when it is needed
+        self.previous_position = None
         self.id = id_
-        self.force = torch.tensor([0., 0.])
-        self.previous_force = torch.tensor([0., 0.])
+        self.force = None
+        self.previous_force = None
 
         # This will be circular - each element will have two nodes. Each node can be part of
         # multiple elements, similarly for cells
@@ -36,10 +54,31 @@ class Node:
         self.node_adjusted = False
         self.pre_adjusted_position = []
 
-        self.node_data = [ElementNeighbours()]
+        self._node_data = None
 
     def delete(self):
-        raise TodoException
+        """
+        Breaks the circular references with the elements and cells, so a node that is no longer
+        part of the simulation can be garbage collected
+        :return:
+        """
+        self.element_list = []
+        self.cell_list = []
+        self.memory = None
+
+    @property
+    def node_data(self):
+        if self._node_data is None:
+            self._node_data = [ElementNeighbours()]
+        return self._node_data
+
+    @property
+    def x(self):
+        return self.position[0]
+
+    @property
+    def y(self):
+        return self.position[1]
 
     def add_force_contribution(self, force: Tensor):
         if torch.any(force.isnan() | force.isinf()):
@@ -123,7 +162,6 @@ class Node:
         """
         self.previous_position = self.position
         self.position = pos
-        self.x, self.y = pos
 
     def __str__(self):
         return f"Node {self.id}"
@@ -1,4 +1,5 @@
 from abc import abstractmethod, ABC
+from contextlib import nullcontext
 import random
 from typing import List, Union
 
@@ -9,10 +10,12 @@ from torch import tensor
 from tqdm import tqdm
 
 from biobots2D.components.cell.abstractcell import AbstractCell
+from biobots2D.components.cell.cellcycle.cellcycleengine import CellCycleEngine
 from biobots2D.components.cell.celldeath.abstractcellkiller import AbstractCellKiller
 from biobots2D.components.cell.celldeath.abstracttissuelevelcellkiller import \
     AbstractTissueLevelCellKiller
 from biobots2D.components.cell.element import Element
+from biobots2D.components.cudaspacepartition import clamp_to_impact
 from biobots2D.components.forces.cellbasedforce.abstractcellbasedforce import AbstractCellBasedForce
 from biobots2D.components.forces.elementbasedforce.abstractelementbasedforce import \
     AbstractElementBasedForce
@@ -22,17 +25,25 @@ from biobots2D.components.forces.tissuebasedforce.abstracttissuebasedforce impor
     AbstractTissueBasedForce
 from biobots2D.components.informationprocessing.abstractsignal import AbstractSignal
 from biobots2D.components.node.node import Node
+from biobots2D.components.simulation import checkpoint
+from biobots2D.components.simulation.checkpoint import AutoCheckpoint
 from biobots2D.components.simulation.cuda_memory import CudaMemory
 from biobots2D.components.simulation.datastore.abstractdatastore import AbstractDataStore
 from biobots2D.components.simulation.datawriter.abstractdatawriter import AbstractDataWriter
+from biobots2D.components.simulation.integrators.abstractintegrator import AbstractIntegrator
+from biobots2D.components.simulation.integrators.forwardeuler import ForwardEuler
 from biobots2D.components.simulation.modifiers.abstractsimulationmodifier import \
     AbstractSimulationModifier
+from biobots2D.components.simulation.profiler import SimulationProfiler
+from biobots2D.components.simulation.timestep.abstracttimestepcontroller import \
+    AbstractTimeStepController
 from biobots2D.components.simulation.stopping.abstractstoppingcondition import \
     AbstractStoppingCondition
+from biobots2D.components.simulation.topology import divide_cells, remove_cells
 from biobots2D.components.spacepartition import SpacePartition
 from utils import TodoException
-from utils import Renderer
-from utils.tools import prng
+from utils import AsyncRenderer, Renderer
+from utils.rng import STREAM_DIVISION, uniform, unit_vectors
 
 
 class AbstractCellSimulation(ABC):
@@ -56,13 +67,28 @@ class AbstractCellSimulation(ABC):
         self.stochastic_jiggle = True  # Brownian noise?
         self.epsilon = 0.0001  # Size of the jiggle force
 
+        # Nodes that would pass through an element stop at this fraction of the way to it, see
+        # ccd
+        self.ccd_safety = 0.9
+        self.ccd_iterations = 4
+
         self.cell_based_forces: List[AbstractCellBasedForce] = []
         self.element_based_forces: List[AbstractElementBasedForce] = []
         self.neighbourhood_based_forces: List[AbstractNeighbourhoodBasedForce] = []
         self.tissue_based_forces: List[AbstractTissueBasedForce] = []
         self.information_processing_signals: List[AbstractSignal] = []
 
+        # Forces and signals that only need to be evaluated every k steps, keyed by their place
+        # in the simulation, e.g. "cell forces/0". Values are (every, extrapolate)
+        self.cadences = {}
+        self._trial_state = False
+
         self.stopping_conditions: List[AbstractStoppingCondition] = []
+        # Evaluate the stopping conditions every this many steps
+        self.stopping_check_every = 1
+
+        # Render or write only every this many outputs, see SteadyState
+        self.output_stride = 1
 
         self.stopped = False
 
@@ -86,10 +112,31 @@ class AbstractCellSimulation(ABC):
 
         self.write_to_file = True
 
+        # Optional timing of the phases of each time step, see enable_profiling
+        self.profiler: Union[None, SimulationProfiler] = None
+        # The renderer of the last asynchronous animation, for its summary in report
+        self.async_renderer: Union[None, AsyncRenderer] = None
+
+        # Optional variable time step size, see set_time_step_controller
+        self.time_step_controller: Union[None, AbstractTimeStepController] = None
+
+        # How the node positions are advanced from the forces, see set_integrator
+        self.integrator: AbstractIntegrator = ForwardEuler()
+
+        # Optional array based cell cycle, see set_cell_cycle_engine
+        self.cell_cycle_engine: Union[None, CellCycleEngine] = None
+        # The gap left between the daughters of a division
+        self.division_separation = 0.1
+
+        # Optional periodic checkpoints, see enable_auto_checkpoint
+        self.auto_checkpoint: Union[None, AutoCheckpoint] = None
+
         # placeholders
         self.epsilon_cuda = cp.float32(self.epsilon)
         self.zero_point_five = cp.float32(0.5)
         self.dt_cuda = cp.float32(self.dt)
+        self.last_dt = self.dt
+        self.last_dt_cuda = self.dt_cuda
 
     @property
     @abstractmethod
@@ -124,55 +171,85 @@ class AbstractCellSimulation(ABC):
         Updates all the forces and applies the movements
         :return:
         """
-        self.generate_information_processing_signals()
-
+        if self.profiler is not None:
+            self.profiler.close_step()
 
+        with self._profile('signals'):
+            self.generate_information_processing_signals()
 
-        # self.generate_tissue_based_forces()
-        self.generate_cell_based_forces()
-        self.generate_element_based_forces()
+        self.generate_forces()
 
-        if self.using_boxes:
-            self.generate_neighbourhood_based_forces()
+        if self.time_step_controller is not None:
+            # A rejected step shrinks dt, so the forces that depend on it are recalculated
+            while True:
+                with self._profile('step control'):
+                    accepted = self.time_step_controller.accept_step(self)
+                if accepted:
+                    break
+                self.gpu.N_for = cp.zeros_like(self.gpu.N_for)
+                self.generate_forces()
 
-        self.make_nodes_move()
+        with self._profile('movement'):
+            self.make_nodes_move()
 
         # Division must occur after movement
-        # self.make_cells_divide()
+        with self._profile('division'):
+            self.make_cells_divide()
 
-        # self.kill_cells()
+        with self._profile('death'):
+            self.kill_cells()
 
-        self.modify_simulation_state()
+        with self._profile('modifiers'):
+            self.modify_simulation_state()
 
-        self.make_cells_age()
+        with self._profile('ageing'):
+            self.make_cells_age()
 
         self.step += 1
-        self.t = self.step * self.dt
+        self.t = self.t + self.dt
+        # The step that was just taken, the controller may choose another dt for the next one
+        self.last_dt = self.dt
+        self.last_dt_cuda = self.dt_cuda
+
+        if self.time_step_controller is not None:
+            self.time_step_controller.end_step(self)
+
+        with self._profile('ccd'):
+            self.ccd(self.gpu)
 
         # self.store_data()
-        #
-        # if self.write_to_file:
-        #     self.write_data()
 
-        if self.is_stopping_condition_met():
-            self.stopped = True
+        # After the collision clamp, so the output and the stopping conditions see the positions
+        # the next step starts from
+        if self.write_to_file and self.data_writers:
+            with self._profile('output'):
+                self.write_data()
+
+        with self._profile('stopping conditions'):
+            if self.is_stopping_condition_met():
+                self.stopped = True
+
+        if self.profiler is not None:
+            self.profiler.end_step(self.gpu)
 
-        self.ccd(self.gpu)
+        with self._profile('memory clearing'):
+            self.gpu.clear_dynamic_memory(self.t, self._held_quantities())
 
-        self.gpu.clear_dynamic_memory(self.t)
+        if self.auto_checkpoint is not None:
+            with self._profile('checkpoint'):
+                self.auto_checkpoint.step(self)
 
-    def n_time_steps(self, n):
+    def n_time_steps(self, n, report=True):
         """
         Advances a set number of time steps
         :param n:
+        :param report: print the profiler and time step summaries at the end
         :return:
         """
 
         for ii in range(n):
             # Do all the calculations
-            # t0 = time.time()
             self.next_time_step()
-            # pyout(time.time() - t0)
 
             # if self.step % 1000 == 0:
             #     print(f"Time = {self.t:.3f} hours")
@@ -181,37 +258,219 @@ class AbstractCellSimulation(ABC):
                 print(f"Stopping condition met at t={self.t:.3f}")
                 break
 
-    def run_to_time(self, t):
+        if report:
+            self.report()
+
+    def run_to_time(self, t, report=True):
         """
-        Given a time, run the simulation until we reach said time
+        Given a time, run the simulation until we reach said time. With a time step controller
+        the last step is shortened to land on t
         :param t:
+        :param report: print the profiler and time step summaries at the end
         :return:
         """
-        raise TodoException
+        while self.t < t and not self.stopped:
+            if self.time_step_controller is not None and self.t + self.dt > t:
+                self.set_dt(t - self.t)
+            self.next_time_step()
+
+        if self.stopped:
+            print(f"Stopping condition met at t={self.t:.3f}")
+
+        if report:
+            self.report()
+
+    def report(self):
+        """
+        Prints the summaries of the profiler, the time step controller and the renderer of the
+        last animation, if they are used
+        :return:
+        """
+        if self.profiler is not None:
+            self.profiler.report()
+        if self.time_step_controller is not None:
+            tqdm.write(self.time_step_controller.summary())
+        if self.auto_checkpoint is not None:
+            self.auto_checkpoint.report()
+        if self.async_renderer is not None and self.async_renderer.summary() is not None:
+            tqdm.write(self.async_renderer.summary())
+        for condition in self.stopping_conditions:
+            if condition.summary() is not None:
+                tqdm.write(condition.summary())
+
+    def set_dt(self, dt):
+        """
+        Changes the time step size, and passes it on to everything that keeps a copy
+        :param dt:
+        :return:
+        """
+        self.dt = dt
+        self.dt_cuda = cp.float32(dt)
+        for force in self.forces:
+            force.set_dt(dt)
+
+    def set_time_step_controller(self, c: AbstractTimeStepController):
+        """
+
+        :param c:
+        :return:
+        """
+        self.time_step_controller = c
+
+    def generate_forces(self):
+        """
+        Adds the contributions of all forces to the node forces in memory
+        :return:
+        """
+        if self.profiler is not None:
+            self.profiler.force_evaluations += 1
+
+        with self._profile('tissue forces'):
+            self.generate_tissue_based_forces()
+        with self._profile('cell forces'):
+            self.generate_cell_based_forces()
+        with self._profile('element forces'):
+            self.generate_element_based_forces()
+
+        if self.using_boxes:
+            with self._profile('neighbourhood forces'):
+                self.generate_neighbourhood_based_forces()
+
+    def evaluate_forces_at(self, N_pos, t):
+        """
+        The forces on all nodes if they were at N_pos at time t, from the full signal and force
+        pipeline. This is how multi stage integrators look at intermediate states. Afterwards the
+        memory is exactly as it was: positions, forces, previous positions, spice and all cached
+        quantities are restored
+        :param N_pos: trial node positions
+        :param t: trial time
+        :return: the node forces at the trial state, without stochastic jiggle
+        """
+        gpu = self.gpu
+        N_pos_current, N_for_current, spice = gpu.N_pos, gpu.N_for, gpu.spice
+        stash = gpu.stash_dynamic_memory()
+
+        gpu.N_pos = N_pos
+        gpu.N_for = cp.zeros_like(N_for_current)
+        gpu._t = t
+        self._trial_state = True
+        with self._profile('signals'):
+            self.generate_information_processing_signals()
+        self.generate_forces()
+        self._trial_state = False
+        N_for = gpu.N_for
+        if self.profiler is not None:
+            self.profiler.count_recomputations(gpu)
+
+        gpu.N_pos, gpu.N_for, gpu.spice = N_pos_current, N_for_current, spice
+        gpu.restore_dynamic_memory(stash)
+        return N_for
+
+    def set_integrator(self, integrator: AbstractIntegrator):
+        """
+
+        :param integrator:
+        :return:
+        """
+        self.integrator = integrator
+
+    @property
+    def forces(self):
+        """
+        Every force in the simulation, whatever it acts on
+        :return:
+        """
+        return self.tissue_based_forces + self.cell_based_forces + self.element_based_forces \
+            + self.neighbourhood_based_forces
+
+    def total_energy(self):
+        """
+        The sum of the energies of all forces. It stays on the device, so the caller decides
+        when to pay for the transfer
+        :return:
+        """
+        return sum((force.energy(self.gpu)[1] for force in self.forces), cp.float32(0.))
+
+    def save_checkpoint(self, path):
+        """
+        Writes the full state of the simulation to a binary file. Call between steps
+        :param path:
+        :return:
+        """
+        checkpoint.save(self, path)
+
+    def load_checkpoint(self, path, mmap=True):
+        """
+        Continues from a checkpoint. The simulation must have been built the same way as the
+        one that saved it
+        :param path:
+        :param mmap: memory map the file instead of reading it in one go
+        :return:
+        """
+        checkpoint.load(self, path, mmap)
+
+    def enable_auto_checkpoint(self, path, every=1000):
+        """
+        Save a checkpoint every so many steps, see AutoCheckpoint
+        :param path:
+        :param every:
+        :return:
+        """
+        self.auto_checkpoint = AutoCheckpoint(path, every)
+        return self.auto_checkpoint
+
+    def enable_profiling(self, window=100, synchronize_streams=False, path=None):
+        """
+        Time every phase of the time step and every force. See SimulationProfiler
+        :param window: the number of steps in the rolling statistics
+        :param synchronize_streams: wait for the GPU around every phase for exact timings
+        :param path: csv file for the rolling statistics
+        :return: the profiler
+        """
+        self.profiler = SimulationProfiler(window, synchronize_streams, path)
+        return self.profiler
+
+    def _profile(self, name):
+        """
+        A context manager that times its block when profiling is enabled, and does nothing
+        otherwise
+        :param name:
+        :return:
+        """
+        if self.profiler is None:
+            return nullcontext()
+        return self.profiler.phase(name)
 
     def generate_tissue_based_forces(self):
         """
 
         :return:
         """
-        for force in self.tissue_based_forces:
-            force.add_tissue_based_forces(self)
+        for ii, force in enumerate(self.tissue_based_forces):
+            with self._profile(f"tissue forces/{type(force).__name__}"):
+                self._add_at_cadence(f"tissue forces/{ii}",
+                                     lambda: force.add_tissue_based_forces(self))
 
     def generate_cell_based_forces(self):
         """
 
         :return:
         """
-        for force in self.cell_based_forces:
-            force.add_cell_based_forces(self.cell_list, self.gpu)
+        for ii, force in enumerate(self.cell_based_forces):
+            with self._profile(f"cell forces/{type(force).__name__}"):
+                self._add_at_cadence(f"cell forces/{ii}",
+                                     lambda: force.add_cell_based_forces(self.cell_list, self.gpu))
 
     def generate_element_based_forces(self):
         """
 
         :return:
         """
-        for force in self.element_based_forces:
-            force.add_element_based_forces(self.element_list)
+        for ii, force in enumerate(self.element_based_forces):
+            with self._profile(f"element forces/{type(force).__name__}"):
+                self._add_at_cadence(
+                    f"element forces/{ii}",
+                    lambda: force.add_element_based_forces(self.element_list, self.gpu))
 
     def generate_neighbourhood_based_forces(self):
         """
@@ -221,12 +480,91 @@ class AbstractCellSimulation(ABC):
         if self.boxes is None:
             ValueError("Space partition required for NeighbourhoodForces, but none set")
 
-        for force in self.neighbourhood_based_forces:
-            force.add_neighbourhood_based_forces(self.node_list, self.boxes, self.gpu)
+        for ii, force in enumerate(self.neighbourhood_based_forces):
+            with self._profile(f"neighbourhood forces/{type(force).__name__}"):
+                self._add_at_cadence(
+                    f"neighbourhood forces/{ii}",
+                    lambda: force.add_neighbourhood_based_forces(self.node_list, self.boxes,
+                                                                 self.gpu))
 
     def generate_information_processing_signals(self):
-        for signal in self.information_processing_signals:
-            signal.add_signal(self.gpu)
+        for ii, signal in enumerate(self.information_processing_signals):
+            if not self._is_due(f"signals/{ii}"):
+                # spice keeps the value of the last evaluation
+                continue
+            with self._profile(f"signals/{type(signal).__name__}"):
+                signal.add_signal(self.gpu)
+
+    def set_cadence(self, key, every=1, extrapolate=False):
+        """
+        Evaluate a force or signal only every k steps. In between, the contribution of the last
+        evaluation is added to the node forces again, or, with extrapolate, a linear
+        extrapolation from the last two evaluations. A signal simply keeps its last value.
+        Integrator stages always reuse the held contribution of a slow force
+        :param key: the place of the force or signal, e.g. "cell forces/0" or "signals/1"
+        :param every: the number of steps between evaluations
+        :param extrapolate: extrapolate force contributions linearly in time
+        :return:
+        """
+        if every > 1:
+            self.cadences[key] = (every, extrapolate)
+        else:
+            self.cadences.pop(key, None)
+
+    def set_quantity_cadence(self, name, every=1):
+        """
+        Keep a cached quantity of the memory for every k steps instead of calculating it again
+        each step. Only for quantities that do not depend on the node positions, like the
+        target area that follows the slowly changing growth fraction; the forces that use it
+        are still evaluated every step
+        :param name: the quantity, e.g. 'C_target_area'
+        :param every: the number of steps between calculations
+        :return:
+        """
+        self.set_cadence(f"quantities/{name}", every)
+
+    def _held_quantities(self):
+        """
+        The cached quantities to keep at the end of this step
+        :return:
+        """
+        return [f"_{key.split('/', 1)[1]}" for key, (every, _) in self.cadences.items()
+                if key.startswith('quantities/') and self.step % every != 0]
+
+    def _is_due(self, key):
+        """
+        Whether a force or signal must be evaluated in the current step
+        :param key:
+        :return:
+        """
+        if key not in self.cadences:
+            return True
+        if not key.startswith('signals') and key not in self.gpu.held_contributions:
+            return True
+        return not self._trial_state and self.step % self.cadences[key][0] == 0
+
+    def _add_at_cadence(self, key, add_forces):
+        """
+        Adds the forces of add_forces to N_for, or the held contribution of its last evaluation
+        when it is not due in this step
+        :param key:
+        :param add_forces:
+        :return:
+        """
+        if key not in self.cadences:
+            add_forces()
+            return
+
+        gpu = self.gpu
+        if not self._is_due(key):
+            gpu.N_for = gpu.N_for + gpu.held_contribution(key, self.t, self.cadences[key][1])
+            return
+
+        N_for = gpu.N_for
+        gpu.N_for = cp.zeros_like(N_for)
+        add_forces()
+        gpu.hold_contribution(key, self.t, gpu.N_for)
+        gpu.N_for = N_for + gpu.N_for
 
     def make_nodes_move(self):
         """
@@ -234,7 +572,11 @@ class AbstractCellSimulation(ABC):
         :return:
         """
         if self.gpu.EXEC_CPU:
-            for n in self.node_list:
+            if self.stochastic_jiggle:
+                directions = unit_vectors(self.seed or 0, self.step,
+                                          numpy.array([n.id for n in self.node_list]))
+
+            for ii, n in enumerate(self.node_list):
                 eta = n.eta
                 force = n.force
 
@@ -243,9 +585,8 @@ class AbstractCellSimulation(ABC):
                     # out
                     # of unstable equilibria
 
-                    # Make a random direction vector
-                    v = tensor([prng() - 0.5, prng() - 0.5])
-                    v = v / v.norm()
+                    # Make a random direction vector, the same one the GPU path makes
+                    v = tensor(directions[ii])
 
                     # Add the random vector, and make sure that it is orders of magnitude smaller
                     # than the actual force
@@ -266,8 +607,7 @@ class AbstractCellSimulation(ABC):
             # of unstable equilibria
 
             # Make a random direction vector
-            v = cp.random.random(self.gpu.N_pos.shape) - self.zero_point_five
-            v /= cp.linalg.norm(v, axis=1)[:, None]
+            v = self.random_directions()
 
             # Add the random vector, and make sure that it is orders of magnitude smaller
             # than the actual force
@@ -276,9 +616,18 @@ class AbstractCellSimulation(ABC):
         self.gpu.N_pos_previous = cp.copy(self.gpu.N_pos)
         self.gpu.N_for_previous = cp.copy(self.gpu.N_for)
 
-        self.gpu.N_pos += self.dt_cuda / self.gpu.N_eta[:, None] * self.gpu.N_for
+        self.gpu.N_pos = self.integrator.integrate(self)
         self.gpu.N_for = cp.zeros_like(self.gpu.N_for_previous)
 
+    def random_directions(self):
+        """
+        A random unit vector for every node, for the stochastic jiggle. The counter based
+        generator is keyed by the seed, the step and the node id, so the jiggle does not depend
+        on the order of the nodes or on the backend
+        :return:
+        """
+        return unit_vectors(self.seed or 0, self.step, self.gpu.N_id)
+
     def adjust_node_position(self, n, new_pos):
         """
         Only used by modifiers. Do not use to progress the simulation
@@ -295,17 +644,24 @@ class AbstractCellSimulation(ABC):
 
     def make_cells_divide(self):
         """
-        Call the divide process, and update the lists
+        Divides every cell that the cell cycle engine finds ready, all at once on the arrays, see
+        divide_cells. The split node of each cell is drawn at random, keyed by the step and the
+        id of the first node of the cell. Without a cell cycle engine no cell divides
         :return:
         """
-        new_cells: List[AbstractCell] = []
-        new_elements: List[Element] = []
-        new_nodes: List[Node] = []
-        for c in self.cell_list:
-            if c.is_ready_to_divide():
-                raise TodoException
+        if self.cell_cycle_engine is None:
+            return
 
-        self.add_new_cells(new_cells, new_elements, new_nodes)
+        cells = cp.where(self.cell_cycle_engine.ready_to_divide(self.gpu))[0]
+        if cells.shape[0] == 0:
+            return
+
+        k = self.gpu.C_node_idxs.shape[1]
+        u = uniform(self.seed or 0, self.step, self.gpu.C_node_ids[cells, 0], STREAM_DIVISION)
+        split = cp.minimum((u[:, 0] * k).astype(cp.int64), k - 1)
+
+        parents, daughters = divide_cells(self.gpu, cells, split, self.division_separation)
+        self.cell_cycle_engine.new_cells(self.gpu, cp.concatenate((parents, daughters)))
 
     def add_new_cells(self, new_cells, new_elements, new_nodes):
         """
@@ -345,66 +701,148 @@ class AbstractCellSimulation(ABC):
             for c in self.cell_list:
                 c.age_cell(self.dt)
 
-        self.gpu.C_age += self.dt_cuda
+        if self.cell_cycle_engine is None:
+            self.gpu.C_age += self.dt_cuda
+        else:
+            self.cell_cycle_engine.age(self.gpu, self.dt_cuda)
 
-    def add_cell_based_force(self, f: AbstractCellBasedForce):
+    def set_cell_cycle_engine(self, engine: CellCycleEngine):
+        """
+        Age the cells with an array based cell cycle. The memory must exist already. Cells only
+        divide on the arrays, see make_cells_divide, so the engine can't be used when the cell
+        objects are stepped on the CPU, since they would no longer match the arrays
+        :param engine:
+        :return:
+        """
+        if self.gpu.EXEC_CPU:
+            raise ValueError("A cell cycle engine divides the cells on the arrays only, it can't "
+                             "be used with EXEC_CPU")
+        self.cell_cycle_engine = engine
+        engine.initialise(self.gpu)
+
+    def add_cell_based_force(self, f: AbstractCellBasedForce, every=1, extrapolate=False):
         """
 
         :param f:
+        :param every: evaluate the force every this many steps, see set_cadence
+        :param extrapolate:
         :return:
         """
+        self.set_cadence(f"cell forces/{len(self.cell_based_forces)}", every, extrapolate)
         self.cell_based_forces.append(f)
 
-    def add_element_based_force(self, f):
+    def add_element_based_force(self, f: AbstractElementBasedForce, every=1, extrapolate=False):
         """
 
         :param f:
+        :param every: evaluate the force every this many steps, see set_cadence
+        :param extrapolate:
         :return:
         """
-        raise TodoException
+        self.set_cadence(f"element forces/{len(self.element_based_forces)}", every, extrapolate)
+        self.element_based_forces.append(f)
 
-    def add_neighbourhood_based_force(self, f: AbstractNeighbourhoodBasedForce):
+    def add_neighbourhood_based_force(self, f: AbstractNeighbourhoodBasedForce, every=1,
+                                      extrapolate=False):
         """
 
         :param f:
+        :param every: evaluate the force every this many steps, see set_cadence
+        :param extrapolate:
         :return:
         """
+        self.set_cadence(f"neighbourhood forces/{len(self.neighbourhood_based_forces)}", every,
+                         extrapolate)
         self.neighbourhood_based_forces.append(f)
 
-    def add_tissue_based_force(self, f):
+    def add_tissue_based_force(self, f: AbstractTissueBasedForce, every=1, extrapolate=False):
         """
 
         :param f:
+        :param every: evaluate the force every this many steps, see set_cadence
+        :param extrapolate:
         :return:
         """
-        raise TodoException
+        self.set_cadence(f"tissue forces/{len(self.tissue_based_forces)}", every, extrapolate)
+        self.tissue_based_forces.append(f)
 
-    def add_information_processing_signal(self, s: AbstractSignal):
+    def add_information_processing_signal(self, s: AbstractSignal, every=1):
+        self.set_cadence(f"signals/{len(self.information_processing_signals)}", every)
         self.information_processing_signals.append(s)
 
-    def add_tissue_level_killer(self, k):
+    def add_tissue_level_killer(self, k: AbstractTissueLevelCellKiller):
         """
 
         :param k:
         :return:
         """
-        raise TodoException
+        self.tissue_level_killers.append(k)
 
-    def add_cell_killer(self, k):
+    def add_cell_killer(self, k: AbstractCellKiller):
         """
 
         :param k:
         :return:
         """
-        raise TodoException
+        self.cell_killers.append(k)
 
-    def add_stopping_condition(self, s):
+    def kill_cells(self):
+        """
+        Removes the cells that any killer marks, all at once, see remove_cells. The killers are
+        predicates over the cell arrays, so a step without deaths costs one reduction per killer
+        and nothing else
+        :return:
+        """
+        if not self.tissue_level_killers and not self.cell_killers:
+            return
+
+        kill = cp.zeros(self.gpu.C_type.shape[0], dtype=cp.bool_)
+        for k in self.tissue_level_killers:
+            kill |= k.kill_cells(self)
+        for k in self.cell_killers:
+            kill |= k.cells_to_kill(self)
+
+        cells = cp.where(kill)[0]
+        if cells.shape[0] == 0:
+            return
+
+        lists = (self.cell_list, self.node_list, self.element_list)
+        moves = remove_cells(self.gpu, cells, tuple(len(lst) for lst in lists))
+
+        # Nodes and elements can be shared with a neighbouring cell that survives, so only those
+        # that were removed with the cells are taken out of the partition and deleted
+        dead_nodes, dead_elements = moves[1][3], moves[2][3]
+        if self.gpu.EXEC_CPU and self.using_boxes:
+            for ii in cp.asnumpy(dead_elements[dead_elements < len(self.element_list)]):
+                if not self.element_list[ii].internal:
+                    self.boxes.remove_element_from_partition(self.element_list[ii])
+        for ii in cp.asnumpy(dead_nodes[dead_nodes < len(self.node_list)]):
+            if self.gpu.EXEC_CPU and self.using_boxes:
+                self.boxes.remove_node_from_partition(self.node_list[ii])
+            self.node_list[ii].delete()
+
+        # The objects belong to the rows the simulation was built with. Those stay in front of
+        # the rows that division adds, and only move among themselves, so the objects move the
+        # same way as their rows, and only the moved objects are bound again
+        for lst, (sources, targets, kept, _) in zip(lists, moves):
+            for source, target in zip(cp.asnumpy(sources).tolist(),
+                                      cp.asnumpy(targets).tolist()):
+                if source < len(lst):
+                    lst[target] = lst[source]
+                    if not self.gpu.EXEC_CPU:
+                        lst[target].memory_idx = target
+            del lst[kept:]
+
+    def add_stopping_condition(self, s: AbstractStoppingCondition, every=None):
         """
 
         :param s:
+        :param every: if given, check all stopping conditions every this many steps
         :return:
         """
-        raise TodoException
+        self.stopping_conditions.append(s)
+        if every is not None:
+            self.stopping_check_every = every
 
     def add_simulation_modifier(self, m):
         """
@@ -464,32 +902,62 @@ class AbstractCellSimulation(ABC):
 
     def is_stopping_condition_met(self):
         """
-
+        Evaluates all stopping conditions on the device every stopping_check_every steps and
+        brings the results to the host in a single transfer. A condition is met when it holds
+        for every replica, and then decides whether the run stops, see on_met
         :return:
         """
-        for stopping_condition in self.stopping_conditions:
-            if stopping_condition.check_stopping_condition():
-                return True
-        return False
+        if not self.stopping_conditions or self.step % self.stopping_check_every != 0:
+            return False
+
+        met = cp.stack([cp.all(condition.has_stopping_condition_been_met(self))
+                        for condition in self.stopping_conditions])
+        met = cp.asnumpy(met)
+
+        stopped = False
+        for condition, condition_met in zip(self.stopping_conditions, met):
+            if condition_met:
+                stopped |= condition.on_met(self)
+        return stopped
 
     def get_num_elements(self):
         return len(self.element_list)
 
-    def animate(self, n, sm):
+    def animate(self, n, sm, headless=False, asynchronous=False, policy=AsyncRenderer.BLOCK):
         """
         Since we aren't storing data at this point, the only way to animate is to calculate then
         plot
         :param n:
         :param sm:
+        :param headless: only write the video, without a display
+        :param asynchronous: draw and encode the frames on a worker thread while the simulation
+        carries on, headless only, see AsyncRenderer
+        :param policy: what to do when the worker is behind, AsyncRenderer.BLOCK or DROP
         :return:
         """
+        if asynchronous and not headless:
+            raise ValueError("The display can only be drawn from the main thread")
 
-        R = Renderer(self.gpu)
+        if asynchronous:
+            R = AsyncRenderer(self.gpu, policy=policy)
+        else:
+            R = Renderer(self.gpu, headless=headless)
         R.render()
 
-        for _ in tqdm(range(0, n, sm)):
-            self.n_time_steps(sm)
-            R.render()
+        for frame, _ in enumerate(tqdm(range(0, n, sm))):
+            self.n_time_steps(sm, report=False)
+            if self.stopped:
+                break
+            if frame % self.output_stride == 0:
+                with self._profile('render'):
+                    R.render()
+
+        if asynchronous:
+            with self._profile('render'):
+                R.close()
+            self.async_renderer = R
+
+        self.report()
 
     def _get_next_node_id(self):
         """
@@ -519,34 +987,27 @@ class AbstractCellSimulation(ABC):
         return ii
 
     def ccd(self, gpu: CudaMemory):
-        candidates = gpu.candidates
-        idxs = cp.argwhere(candidates)
-        if len(idxs) == 0:
+        """
+        Swept continuous collision detection. Nodes and elements are taken to move in straight
+        lines over the step. The node and the element end nodes of every colliding pair are put
+        back along their paths to ccd_safety times their earliest time of impact, see
+        clamp_to_impact, all other nodes keep their position. Holding nodes back can make
+        other pairs collide, so the test is repeated on the shortened paths until nothing
+        collides, at most ccd_iterations times. The host only waits for the device to learn
+        whether anything collided
+        :param gpu:
+        :return:
+        """
+        if gpu.N_pos_previous is None:
             return
 
-        N_idxs, E_idxs = idxs[:, 0], idxs[:, 1]
-
-        N_pos = gpu.N_pos[N_idxs]
-        N_prp = gpu.N_pos_previous[N_idxs]
-        E_nd1 = gpu.N_pos[gpu.E_node_1[E_idxs]]
-        E_nd2 = gpu.N_pos[gpu.E_node_2[E_idxs]]
-
-        A = E_nd1
-        B = E_nd2
-        C = N_prp
-        D = N_pos
-
-        ax, ay = A[:, 0], A[:, 1]
-        bx, by = B[:, 0], B[:, 1]
-        cx, cy = C[:, 0], C[:, 1]
-        dx, dy = D[:, 0], D[:, 1]
-
-        q_nom = ax * (by - cy) + bx * (cy - ay) + cx * (ay - by)
-        q_den = (dx - cx) * (by - ay) + (cy - dy) * (bx - ax)
-        q = q_nom / q_den
-        p = (cx - ax + q * (dx - cx)) / (bx - ax)
-
-        shorten = (0. <= p) & (p < 1.) & (0. <= q) & (q <= 1.)
+        for _ in range(self.ccd_iterations):
+            N_idxs, E_idxs = gpu.swept_pairs()
+            if N_idxs.shape[0] == 0:
+                return
 
-        if any(shorten):
-            gpu.N_pos[N_idxs][shorten] = (A + 0.9 * p[:, None] * (B - A))[shorten]
+            gpu.N_pos, hit = clamp_to_impact(gpu.N_pos_previous, gpu.N_pos, N_idxs,
+                                             gpu.E_node_1[E_idxs], gpu.E_node_2[E_idxs],
+                                             self.ccd_safety)
+            if not bool(hit):
+                return
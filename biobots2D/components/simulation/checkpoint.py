@@ -0,0 +1,220 @@
+"""
+Checkpoints of a running simulation. A checkpoint holds the arrays and plain attributes of the
+simulation and its memory, the held contributions of slow forces, and the state of the stopping
+conditions and the time step controller, so a run that is restored continues as it would have.
+
+The cell, element and node objects are not saved. The simulation a checkpoint is loaded into is
+built the same way as the saved one, so its objects match the rows it was built with. Once cells
+have divided or died before the checkpoint, the rows no longer match those objects, and only
+the arrays are valid; anything that reads the objects, like the CPU path or the per cell data
+writers, does not reproduce the uninterrupted run. The profiler, the data writers and the
+renderer keep no state in the checkpoint either.
+"""
+import json
+import os
+import threading
+import time
+
+import cupy as cp
+import numpy as np
+from tqdm import tqdm
+
+MAGIC = b'BBCKPT01'
+ALIGNMENT = 64
+
+
+def _aligned(n):
+    return -(-n // ALIGNMENT) * ALIGNMENT
+
+
+def _plain(value):
+    if isinstance(value, (list, tuple)):
+        return all(_plain(v) for v in value)
+    return value is None or isinstance(value, (bool, int, float, str))
+
+
+def _components(s):
+    """
+    The objects with state that a checkpoint holds besides the simulation and its memory: the
+    stopping conditions and the time step controller. They are matched by their position, so
+    they must be added in the same order to the simulation a checkpoint is loaded into
+    :param s:
+    :return: (prefix, object) pairs
+    """
+    components = [(f"stop{ii}", c) for ii, c in enumerate(s.stopping_conditions)]
+    components += [(f"replicastop{ii}", c)
+                   for ii, c in enumerate(getattr(s, 'replica_stopping_conditions', []))]
+    if s.time_step_controller is not None:
+        components.append(('timestep', s.time_step_controller))
+    return components
+
+
+def snapshot(s):
+    """
+    Copies the state of a simulation to the host. Every array and every plain number, string or
+    boolean attribute of the simulation and of its memory is included, as are the held
+    contributions of slow forces. The stopping conditions and the time step controller are
+    included the same way, and with them also their None and list attributes, e.g. the history
+    of SteadyState and when it became steady. Must be taken between steps, when the cached
+    quantities are empty. The jiggle comes from a counter based generator keyed by seed and
+    step, so those two are all of the random state
+    :param s: the simulation
+    :return: (scalars, arrays), arrays maps a name to (backend, host array)
+    """
+    scalars, arrays = {}, {}
+    for prefix, obj in [('sim', s), ('gpu', s.gpu)] + _components(s):
+        for name, value in vars(obj).items():
+            key = f"{prefix}.{name}"
+            if isinstance(value, cp.ndarray):
+                arrays[key] = ('cupy', cp.asnumpy(value))
+            elif isinstance(value, np.generic):
+                arrays[key] = ('numpy', np.asarray(value))
+            elif isinstance(value, (bool, int, float, str)):
+                scalars[key] = value
+            elif prefix not in ('sim', 'gpu') and _plain(value):
+                scalars[key] = value
+
+    for key, history in s.gpu.held_contributions.items():
+        for ii, (t, contribution) in enumerate(history):
+            scalars[f"held.{ii}.{key}"] = t
+            arrays[f"held.{ii}.{key}"] = ('cupy', cp.asnumpy(contribution))
+
+    return scalars, arrays
+
+
+def write(path, scalars, arrays):
+    """
+    Writes a checkpoint: the magic bytes, the length of the json header, the header, and every
+    array as raw bytes at an aligned offset, so each can be memory mapped on load. The file is
+    written next to path and moved into place, so a crash never leaves half a checkpoint
+    :param path:
+    :param scalars:
+    :param arrays:
+    :return:
+    """
+    layout, offset = {}, 0
+    for name, (backend, host) in arrays.items():
+        layout[name] = [backend, host.dtype.str, list(host.shape), offset]
+        offset = _aligned(offset + host.nbytes)
+    header = json.dumps({'scalars': scalars, 'arrays': layout}).encode()
+    data_start = _aligned(len(MAGIC) + 8 + len(header))
+
+    tmp = f"{path}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(MAGIC)
+        f.write(np.uint64(len(header)).tobytes())
+        f.write(header)
+        for name, (_, host) in arrays.items():
+            f.seek(data_start + layout[name][3])
+            f.write(np.ascontiguousarray(host).tobytes())
+    os.replace(tmp, path)
+
+
+def save(s, path):
+    write(path, *snapshot(s))
+
+
+def load(s, path, mmap=True):
+    """
+    Restores a checkpoint into a simulation that was built the same way as the one that was
+    saved, e.g. with the same model and constructor arguments, stopping conditions and time
+    step controller. The run then continues as the saved run would have, with the limits on the
+    objects given at the top of this module
+    :param s:
+    :param path:
+    :param mmap: memory map the arrays instead of reading the whole file first
+    :return:
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a checkpoint")
+        header_length = int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+        header = json.loads(f.read(header_length))
+    data_start = _aligned(len(MAGIC) + 8 + header_length)
+
+    arrays = {}
+    for name, (backend, dtype, shape, offset) in header['arrays'].items():
+        count = int(np.prod(shape))
+        if count == 0:
+            host = np.empty(shape, dtype=dtype)
+        elif mmap:
+            host = np.memmap(path, dtype=dtype, mode='r', offset=data_start + offset,
+                             shape=(count,)).reshape(shape)
+        else:
+            host = np.fromfile(path, dtype=dtype, count=count,
+                               offset=data_start + offset).reshape(shape)
+        arrays[name] = cp.asarray(host) if backend == 'cupy' else np.array(host)[()]
+
+    objects = dict([('sim', s), ('gpu', s.gpu)] + _components(s))
+    held = {}
+    for name, value in {**header['scalars'], **arrays}.items():
+        prefix, attribute = name.split('.', 1)
+        if prefix == 'held':
+            continue
+        if prefix not in objects:
+            raise ValueError(f"The checkpoint has state for {prefix}, which the simulation does "
+                             f"not have")
+        setattr(objects[prefix], attribute, value)
+
+    for name, contribution in arrays.items():
+        if name.startswith('held.'):
+            _, ii, key = name.split('.', 2)
+            held.setdefault(key, []).append((int(ii), header['scalars'][name], contribution))
+    s.gpu.held_contributions = {key: [(t, c) for _, t, c in sorted(history, key=lambda h: h[0])]
+                                for key, history in held.items()}
+
+    # Pass dt on to the forces that keep a copy
+    s.set_dt(s.dt)
+
+
+class AutoCheckpoint:
+    def __init__(self, path, every=1000):
+        """
+        Saves a checkpoint every so many steps. The step only waits for the arrays to be copied
+        to the host; the file is written by a background thread. If the previous checkpoint is
+        still being written when the next one is due, the new one is skipped instead of queued,
+        so the time a step can lose to checkpointing is bounded by one device to host copy
+        :param path: the checkpoint file, replaced by every new checkpoint
+        :param every: the number of steps between checkpoints
+        """
+        self.path = path
+        self.every = every
+
+        self.writer: threading.Thread = None
+        self.written = 0
+        self.skipped = 0
+        self.write_time = 0.
+
+    def step(self, s):
+        """
+        Must be called at the end of every step
+        :param s:
+        :return:
+        """
+        if s.step % self.every != 0:
+            return
+        if self.writer is not None and self.writer.is_alive():
+            self.skipped += 1
+            return
+
+        state = snapshot(s)
+        self.writer = threading.Thread(target=self._write, args=state, daemon=True)
+        self.writer.start()
+
+    def _write(self, scalars, arrays):
+        t0 = time.perf_counter()
+        write(self.path, scalars, arrays)
+        self.write_time += time.perf_counter() - t0
+        self.written += 1
+
+    def wait(self):
+        if self.writer is not None:
+            self.writer.join()
+
+    def summary(self):
+        return f"checkpoints: {self.written} written to {self.path}, {self.skipped} skipped, " \
+               f"{self.write_time / max(self.written, 1):.3f} s per write"
+
+    def report(self):
+        self.wait()
+        tqdm.write(self.summary())
@@ -1,13 +1,14 @@
-import time
 from typing import List, Union
 
 # import numpy as cp
 import cupy as cp
+import cupyx
 # from numba import cuda, float32, vectorize, guvectorize, int64
 import numpy as np
 
 from biobots2D.components.cell.abstractcell import AbstractCell
 from biobots2D.components.cell.element import Element
+from biobots2D.components.cudaspacepartition import CudaSpacePartition
 from biobots2D.components.node.node import Node
 
 
@@ -26,10 +27,46 @@ def dot(A: cp.ndarray, B: cp.ndarray) -> cp.ndarray:
     return cp.einsum('...i,...i->...', A, B)
 
 
+def scatter_add(A: cp.ndarray, idxs: cp.ndarray, B: cp.ndarray):
+    """
+    A[idxs] += B, but repeated indices accumulate instead of overwriting each other
+    """
+    cupyx.scatter_add(A, idxs, B)
+
+
+def per_replica(value, replica_idxs: cp.ndarray):
+    """
+    A force parameter is either one value shared by all replicas, or an array with one value per
+    replica. Returns something that broadcasts against arrays indexed like replica_idxs
+    """
+    if cp.ndim(value) == 0:
+        return value
+    return value[replica_idxs]
+
+
 class CudaMemory:
     EXEC_CPU = False
     RENDER = True
 
+    # Quantities derived from the node positions. Each is calculated on first use in a time step
+    # and kept until clear_dynamic_memory is called at the end of the step
+    DYNAMIC_MEMORY = ('_vector_1_to_2', '_outward_normal', '_element_length', '_C_area',
+                      '_C_perimeter', '_C_target_area', '_C_target_perimeter', '_C_pos',
+                      '_polygons', '_E_length', '_pairs', '_E_blocked', '_C_centroid',
+                      '_C_second_moments', '_C_aspect_ratio', '_C_orientation', '_host')
+
+    # The arrays with one row per cell, node or element, for adding and removing rows. Arrays a
+    # simulation does not use are None
+    CELL_ARRAYS = ('C_node_ids', 'C_node_idxs', 'C_element_idxs', 'C_age', 'C_type',
+                   'C_grown_cell_target_area', 'C_new_cell_target_area', 'C_inhibitory',
+                   'C_pause_duration', 'C_growth_duration', 'C_phase', 'C_growth_fraction',
+                   'C_replica')
+    NODE_ARRAYS = ('N_id', 'N_pos', 'N_for', 'N_pos_previous', 'N_for_previous', 'N_eta',
+                   'N_replica')
+    ELEMENT_ARRAYS = ('E_node_1_id', 'E_node_2_id', 'E_cell_idx', 'E_node_1', 'E_node_2',
+                      'E_internal', 'E_cilia_direction', 'E_inhibitory', 'E_natural_length',
+                      'E_stiffness', 'E_minimum_length', 'E_replica')
+
     def __init__(self,
                  cell_list: List[AbstractCell],
                  element_list: List[Element],
@@ -45,8 +82,15 @@ class CudaMemory:
         self.C_age = list2cupy([c.age for c in cell_list])
         self.C_type = list2cupy([c.cell_type for c in cell_list])
         self.C_grown_cell_target_area = list2cupy([c.grown_cell_target_area for c in cell_list])
+        self.C_new_cell_target_area = list2cupy([c.new_cell_target_area for c in cell_list])
         self.C_inhibitory = cp.array([c.inhibitory for c in cell_list])
 
+        # Cell cycle, filled in by a CellCycleEngine if the simulation uses one
+        self.C_pause_duration = None
+        self.C_growth_duration = None
+        self.C_phase = None
+        self.C_growth_fraction = None
+
         # Cell type indexes
         self.Ctype_0 = cp.argwhere(self.C_type == 0).squeeze(1)
         self.Ctype_1 = cp.argwhere(self.C_type == 1).squeeze(1)
@@ -73,57 +117,304 @@ class CudaMemory:
         self.E_cilia_direction = cp.array(
             [0 if e.pointing_forward is None else
              1 if e.pointing_forward else -1 for e in element_list])
+        self.E_inhibitory = self.C_inhibitory[self.E_cell_idx]
+        self.E_natural_length = list2cupy(element_list, 'natural_length')
+        self.E_stiffness = list2cupy(element_list, 'stiffness')
+        self.E_minimum_length = list2cupy(element_list, 'minimum_length')
+
+        # Replicas. A single simulation is one replica, see concatenate for ensembles
+        self.n_replicas = 1
+        self.C_replica = cp.zeros(self.C_type.shape[0], dtype=cp.int64)
+        self.N_replica = cp.zeros(self.N_pos.shape[0], dtype=cp.int64)
+        self.E_replica = cp.zeros(self.E_node_1.shape[0], dtype=cp.int64)
+        # Where each replica is laid out, see local_positions
+        self.replica_offsets = None
 
         # SpacePartition
-        # self.boxes = CudaSpacePartition(space_partition)
+        self.boxes = CudaSpacePartition(d_limit)
 
-        # Broadcast matrices
-        self.cell2node = self.__make_cell2node_matrix(cell_list)
-        self.cell2element = self.__make_cell2element_matrix(cell_list)
-        self.element2node = self.__make_element2node_matrices(element_list)
         self.rotate_clockwise_2d = cp.array([[0., -1.], [1., .0]], dtype=cp.float32)
 
-        # Masks
-        self.node2element_mask = self.__make_node2element_mask(element_list)
-        # self.cell2node_mask = self.cell2node.astype(cp.bool)
-        self.cell2element_mask = self.cell2element.astype(cp.bool)
-
         # Dynamic memory
-        self._vector_1_to_2 = None
-        self._outward_normal = None
-        self._element_length = None
-        self._C_area = None
-        self._C_perimeter = None
-        self._C_target_area = None
-        self._C_target_perimeter = None
-        self._C_pos = None
-        self._polygons = None
-        self._E_length = None
-        self._candidates = None
+        for name in self.DYNAMIC_MEMORY:
+            setattr(self, name, None)
 
         self._t = 0.
-        self.spice = 0.
+        # Counts the changes to the rows, see refresh_indices
+        self.topology_version = 0
+        # One signal value per replica
+        self.spice = cp.zeros(self.n_replicas, dtype=cp.float32)
+
+        # Contributions to N_for of forces that are only evaluated every k steps. Each entry is
+        # keyed by the place of the force in the simulation and holds (t, contribution) of the
+        # last two evaluations
+        self.held_contributions = {}
+        self.evaluations = {}
+        self.reuses = {}
 
         # self._dmatrix_l2 = None
         # numerical placeholders
         self.pi = cp.float32(np.pi)
 
-    def clear_dynamic_memory(self, t):
-        self._vector_1_to_2 = None
-        self._outward_normal = None
-        self._element_length = None
-        self._C_area = None
-        self._C_perimeter = None
-        self._C_target_area = None
-        self._C_target_perimeter = None
-        self._C_pos = None
-        self._polygons = None
-        self._E_length = None
-        self._candidates = None
+        self.bind(cell_list, element_list, node_list)
+
+    @classmethod
+    def concatenate(cls, memories: List['CudaMemory']) -> 'CudaMemory':
+        """
+        Stacks the memories of independent simulations into one block diagonal memory, so a
+        single pass over the arrays advances all of them. Index tables are shifted by the number
+        of nodes, elements and cells of the replicas before them, and every node, element and
+        cell records the replica it belongs to. Nodes are never paired with elements of another
+        replica
+        :param memories: one memory per replica, all with the same number of nodes per cell
+        :return:
+        """
+        def offsets(sizes):
+            return np.concatenate(([0], np.cumsum(sizes)[:-1])).tolist()
+
+        n_off = offsets([m.N_pos.shape[0] for m in memories])
+        e_off = offsets([m.E_node_1.shape[0] for m in memories])
+        c_off = offsets([m.C_type.shape[0] for m in memories])
+        id_off = offsets([int(cp.max(m.N_id)) + 1 for m in memories])
+
+        def stack(name, shifts=None):
+            if shifts is None:
+                return cp.concatenate([getattr(m, name) for m in memories])
+            return cp.concatenate([getattr(m, name) + shift for m, shift in zip(memories, shifts)])
+
+        def replica(sizes):
+            return cp.repeat(cp.arange(len(memories)), sizes)
+
+        gpu = cls.__new__(cls)
+        gpu.d_limit = memories[0].d_limit
+
+        gpu.C_node_ids = stack('C_node_ids', id_off)
+        gpu.C_node_idxs = stack('C_node_idxs', n_off)
+        gpu.C_element_idxs = stack('C_element_idxs', e_off)
+        gpu.C_age = stack('C_age')
+        gpu.C_type = stack('C_type')
+        gpu.C_grown_cell_target_area = stack('C_grown_cell_target_area')
+        gpu.C_new_cell_target_area = stack('C_new_cell_target_area')
+        gpu.C_inhibitory = stack('C_inhibitory')
+        for name in ('C_pause_duration', 'C_growth_duration', 'C_phase', 'C_growth_fraction'):
+            cycling = getattr(memories[0], name) is not None
+            setattr(gpu, name, stack(name) if cycling else None)
+        for ctype in range(5):
+            setattr(gpu, f"Ctype_{ctype}", cp.argwhere(gpu.C_type == ctype).squeeze(1))
+
+        gpu.N_id = stack('N_id', id_off)
+        gpu.N_id2idx = cp.zeros((int(cp.max(gpu.N_id)) + 1,), dtype=cp.int64)
+        gpu.N_id2idx[gpu.N_id] = cp.arange(gpu.N_id.shape[0])
+        gpu.N_pos = stack('N_pos')
+        gpu.N_for = stack('N_for')
+        gpu.N_pos_previous = None
+        gpu.N_for_previous = None
+        gpu.N_eta = stack('N_eta')
+
+        gpu.E_node_1_id = stack('E_node_1_id', id_off)
+        gpu.E_node_2_id = stack('E_node_2_id', id_off)
+        gpu.E_cell_idx = stack('E_cell_idx', c_off)
+        gpu.E_node_1 = stack('E_node_1', n_off)
+        gpu.E_node_2 = stack('E_node_2', n_off)
+        for name in ('E_internal', 'E_cilia_direction', 'E_inhibitory', 'E_natural_length',
+                     'E_stiffness', 'E_minimum_length'):
+            setattr(gpu, name, stack(name))
+
+        gpu.n_replicas = len(memories)
+        gpu.C_replica = replica([m.C_type.shape[0] for m in memories])
+        gpu.N_replica = replica([m.N_pos.shape[0] for m in memories])
+        gpu.E_replica = replica([m.E_node_1.shape[0] for m in memories])
+        gpu.replica_offsets = None
+
+        gpu.boxes = CudaSpacePartition(gpu.d_limit)
+        gpu.rotate_clockwise_2d = memories[0].rotate_clockwise_2d
+
+        for name in cls.DYNAMIC_MEMORY:
+            setattr(gpu, name, None)
+        gpu._t = memories[0]._t
+        gpu.topology_version = 0
+        gpu.spice = stack('spice')
+
+        gpu.held_contributions = {}
+        gpu.evaluations = {}
+        gpu.reuses = {}
+
+        gpu.pi = memories[0].pi
+        return gpu
+
+    def bind(self, cell_list: List[AbstractCell], element_list: List[Element],
+             node_list: List[Node]):
+        """
+        Turns the objects into views of their rows in memory: positions, forces, ages and the
+        like are read from and written to the arrays, see ArrayField, and the cell data is read
+        from the quantities calculated for all cells at once. The objects are in the order of
+        the rows. When rows move, the objects that moved with them must be given their new
+        memory_idx, see AbstractCellSimulation.kill_cells.
+
+        The CPU path keeps its own copy of the state in the objects, to compare against, so
+        nothing is bound with EXEC_CPU
+        :param cell_list:
+        :param element_list:
+        :param node_list:
+        :return:
+        """
+        if self.EXEC_CPU:
+            return
+        for lst in (cell_list, element_list, node_list):
+            for ii, obj in enumerate(lst):
+                obj.memory = self
+                obj.memory_idx = ii
+
+    def host(self, name) -> np.ndarray:
+        """
+        A host copy of one of the arrays or cached quantities, made on first use in a time step.
+        For code that reads the values of single cells, e.g. the cell objects, so that reading
+        every cell costs one transfer per step instead of one per cell
+        :param name: e.g. 'C_area'
+        :return:
+        """
+        if self._host is None:
+            self._host = {}
+        if name not in self._host:
+            self._host[name] = cp.asnumpy(getattr(self, name))
+        return self._host[name]
+
+    def local_positions(self) -> cp.ndarray:
+        """
+        The node positions in the frame of their own replica. The replicas of an ensemble are
+        laid out side by side, so anything that depends on where a node is, and not only on
+        where it is relative to other nodes of its replica, must use these
+        :return:
+        """
+        if self.replica_offsets is None:
+            return self.N_pos
+        return self.N_pos - self.replica_offsets[self.N_replica]
+
+    def clear_dynamic_memory(self, t, keep=()):
+        """
+        Empties the cached quantities at the end of a step
+        :param t:
+        :param keep: quantities that change slowly and are kept for the next step, e.g.
+        '_C_target_area', see AbstractCellSimulation.set_quantity_cadence
+        :return:
+        """
+        for name in self.DYNAMIC_MEMORY:
+            if name in keep and getattr(self, name) is not None:
+                self.reuses[name] = self.reuses.get(name, 0) + 1
+                continue
+            setattr(self, name, None)
         self._t = t
 
         # self._dmatrix_l2 = None
 
+    def stash_dynamic_memory(self):
+        """
+        Takes the cached quantities out of memory, so they can be put back with
+        restore_dynamic_memory after the memory has been used for a different state
+        :return:
+        """
+        stash = {name: getattr(self, name) for name in self.DYNAMIC_MEMORY}
+        stash['_t'] = self._t
+        for name in self.DYNAMIC_MEMORY:
+            setattr(self, name, None)
+        return stash
+
+    def restore_dynamic_memory(self, stash):
+        for name, value in stash.items():
+            setattr(self, name, value)
+
+    def hold_contribution(self, key, t, contribution: cp.ndarray):
+        """
+        Keep the contribution of a slow force, so it can be reused in the following steps
+        :param key:
+        :param t: the time the contribution was evaluated at
+        :param contribution: the change it made to N_for
+        :return:
+        """
+        history = self.held_contributions.get(key, [])
+        # a rejected and retried step evaluates again at the same time
+        history = [(t_, c) for t_, c in history if t_ != t]
+        self.held_contributions[key] = (history + [(t, contribution)])[-2:]
+        self.evaluations[key] = self.evaluations.get(key, 0) + 1
+
+    def held_contribution(self, key, t, extrapolate=False) -> cp.ndarray:
+        """
+        The contribution of a slow force at time t, either the last evaluation as is, or
+        extrapolated linearly from the last two
+        :param key:
+        :param t:
+        :param extrapolate:
+        :return:
+        """
+        self.reuses[key] = self.reuses.get(key, 0) + 1
+        history = self.held_contributions[key]
+        t1, c1 = history[-1]
+        if not extrapolate or len(history) < 2:
+            return c1
+        t0, c0 = history[0]
+        return c1 + (c1 - c0) * cp.float32((t - t1) / (t1 - t0))
+
+    def clear_held_contributions(self):
+        """
+        Must be called when the number of nodes changes, the held contributions no longer fit
+        :return:
+        """
+        self.held_contributions = {}
+
+    def append_rows(self, names, sources: cp.ndarray) -> cp.ndarray:
+        """
+        Grows every array in names by copies of the rows at sources. The caller overwrites the
+        new rows where they differ from their source, and calls refresh_indices when done
+        :param names: CELL_ARRAYS, NODE_ARRAYS or ELEMENT_ARRAYS
+        :param sources: the row each new row is copied from
+        :return: the indices of the new rows
+        """
+        start = getattr(self, names[0]).shape[0]
+        for name in names:
+            array = getattr(self, name)
+            if array is not None:
+                setattr(self, name, cp.concatenate((array, array[sources])))
+        return cp.arange(start, start + sources.shape[0])
+
+    def move_rows(self, names, sources: cp.ndarray, targets: cp.ndarray, size):
+        """
+        Copies the rows at sources over the rows at targets in every array in names, then cuts
+        the arrays to size. The caller remaps the index tables that point at the moved rows, and
+        calls refresh_indices when done
+        :param names: CELL_ARRAYS, NODE_ARRAYS or ELEMENT_ARRAYS
+        :param sources:
+        :param targets:
+        :param size: the number of rows that are kept
+        :return:
+        """
+        for name in names:
+            array = getattr(self, name)
+            if array is not None:
+                array[targets] = array[sources]
+                setattr(self, name, array[:size])
+
+    def refresh_indices(self):
+        """
+        Rebuilds everything that is derived from the index tables, after cells, elements or nodes
+        were added or removed: the id tables, the cell type indexes, the cached quantities and the
+        held contributions of slow forces. Also moves topology_version on, so writers know the
+        rows changed
+        :return:
+        """
+        self.N_id2idx = cp.zeros((int(cp.max(self.N_id)) + 1,), dtype=cp.int64)
+        self.N_id2idx[self.N_id] = cp.arange(self.N_id.shape[0])
+        self.C_node_ids = self.N_id[self.C_node_idxs]
+        self.E_node_1_id = self.N_id[self.E_node_1]
+        self.E_node_2_id = self.N_id[self.E_node_2]
+
+        for ctype in range(5):
+            setattr(self, f"Ctype_{ctype}", cp.argwhere(self.C_type == ctype).squeeze(1))
+
+        for name in self.DYNAMIC_MEMORY:
+            setattr(self, name, None)
+        self.clear_held_contributions()
+        self.topology_version += 1
+
     @property
     def vector_1_to_2(self) -> cp.ndarray:
         if self._vector_1_to_2 is None:
@@ -154,13 +445,86 @@ class CudaMemory:
                                         - dot(y, cp.roll(x, 1, axis=1)))
         return self._C_area
 
+    @property
+    def C_centroid(self) -> cp.ndarray:
+        """
+        The centre of mass of every cell polygon. Unlike C_pos, the mean of the nodes, it does not
+        depend on how the nodes are spread around the cell
+        """
+        if self._C_centroid is None:
+            self.__cell_shape()
+        return self._C_centroid
+
+    @property
+    def C_second_moments(self) -> cp.ndarray:
+        """
+        The second moments of area of every cell polygon about its centroid, divided by the
+        area, as columns xx, yy and xy
+        """
+        if self._C_second_moments is None:
+            self.__cell_shape()
+        return self._C_second_moments
+
+    @property
+    def C_aspect_ratio(self) -> cp.ndarray:
+        """
+        The ratio of the long to the short axis of the ellipse with the same second moments as
+        the cell, 1 for a regular polygon
+        """
+        if self._C_aspect_ratio is None:
+            xx, yy, xy = self.C_second_moments.T
+            mean = 0.5 * (xx + yy)
+            spread = (0.25 * (xx - yy) ** 2 + xy ** 2) ** .5
+            self._C_aspect_ratio = ((mean + spread) / (mean - spread)) ** .5
+        return self._C_aspect_ratio
+
+    @property
+    def C_orientation(self) -> cp.ndarray:
+        """
+        The angle of the long axis of every cell with the x axis, in (-pi / 2, pi / 2]
+        """
+        if self._C_orientation is None:
+            xx, yy, xy = self.C_second_moments.T
+            self._C_orientation = 0.5 * cp.arctan2(2 * xy, xx - yy)
+        return self._C_orientation
+
+    def __cell_shape(self):
+        """
+        Centroid and second moments of all cell polygons in one pass, from the standard sums over
+        the edges of a polygon. The polygons are first moved to the mean of their nodes, which
+        keeps the sums small
+        :return:
+        """
+        polygons = self.polygons - self.C_pos[:, None]
+        x, y = polygons[:, :, 0], polygons[:, :, 1]
+        x1, y1 = cp.roll(x, -1, axis=1), cp.roll(y, -1, axis=1)
+        cross = x * y1 - x1 * y
+
+        # Signed, so the sums are right whichever way round the nodes go
+        area = 0.5 * cp.sum(cross, axis=1)
+        cx = cp.sum((x + x1) * cross, axis=1) / (6 * area)
+        cy = cp.sum((y + y1) * cross, axis=1) / (6 * area)
+
+        xx = cp.sum((x ** 2 + x * x1 + x1 ** 2) * cross, axis=1) / (12 * area) - cx ** 2
+        yy = cp.sum((y ** 2 + y * y1 + y1 ** 2) * cross, axis=1) / (12 * area) - cy ** 2
+        xy = cp.sum((x * y1 + 2 * x * y + 2 * x1 * y1 + x1 * y) * cross, axis=1) \
+            / (24 * area) - cx * cy
+
+        self._C_centroid = self.C_pos + cp.stack((cx, cy), axis=1)
+        self._C_second_moments = cp.stack((xx, yy, xy), axis=1)
+
     @property
     def C_target_area(self) -> cp.ndarray:
         if self._C_target_area is None:
-            self._C_target_area = cp.empty_like(self._C_area)
+            self._C_target_area = cp.empty_like(self.C_area)
 
-            # Type 0 has constant target area
-            self._C_target_area[:] = self.C_grown_cell_target_area[:]
+            # Type 0 has constant target area, unless a cell cycle makes it grow from new to
+            # grown size
+            if self.C_growth_fraction is None:
+                self._C_target_area[:] = self.C_grown_cell_target_area[:]
+            else:
+                self._C_target_area[:] = self.C_new_cell_target_area + self.C_growth_fraction \
+                    * (self.C_grown_cell_target_area - self.C_new_cell_target_area)
 
             # Type 1 grows and shrinks as a polygon
 
@@ -213,28 +577,44 @@ class CudaMemory:
         return self._E_length
 
     @property
-    def candidates(self):
-        if self._candidates is None:
-            t0 = time.time()
-            candidates = cp.ones((self.N_pos.shape[0], self.E_node_1.shape[0]), dtype=cp.bool)
-
-            # find nodes in element interaction regions
-            pnt = self.N_pos
-            start = self.N_pos[self.E_node_1]
-            end = self.N_pos[self.E_node_2]
-            line_vec = end - start
-            pnt_vec = pnt[:, None] - start[None, :]
-            line_len = cp.linalg.norm(line_vec, axis=1)
-            line_unitvec = line_vec / line_len[:, None]
-            pnt_vec_scaled = pnt_vec / line_len[None, :, None]
-            t = cp.sum(line_unitvec[None, :, :] * pnt_vec_scaled, axis=2)
-            nearest = line_vec[None, :, :] * t[:, :, None]
-            dist = cp.linalg.norm(nearest - pnt_vec, axis=2)
-            candidates = candidates & (0. <= t) & (t <= 1.) & (dist < self.d_limit)
-
-            candidates = candidates & ~ self.node2element_mask
-            self._candidates = candidates
-        return self._candidates
+    def pairs(self):
+        """
+        The node-element pairs within interaction range, as (N_idxs, E_idxs)
+        """
+        if self._pairs is None:
+            N_idxs, E_idxs = self.boxes.get_neighbouring_elements(self.N_pos, self.E_node_1,
+                                                                  self.E_node_2)
+            self._pairs = self.within_replica(N_idxs, E_idxs)
+        return self._pairs
+
+    def swept_pairs(self):
+        """
+        The node-element pairs that could collide while the nodes move from N_pos_previous to
+        N_pos, see CudaSpacePartition.get_swept_candidates
+        """
+        N_idxs, E_idxs = self.boxes.get_swept_candidates(self.N_pos_previous, self.N_pos,
+                                                         self.E_node_1, self.E_node_2)
+        return self.within_replica(N_idxs, E_idxs)
+
+    def within_replica(self, N_idxs: cp.ndarray, E_idxs: cp.ndarray):
+        """
+        Drops the pairs of a node and an element of different replicas
+        """
+        if self.n_replicas > 1:
+            same = cp.where(self.N_replica[N_idxs] == self.E_replica[E_idxs])[0]
+            N_idxs, E_idxs = N_idxs[same], E_idxs[same]
+        return N_idxs, E_idxs
+
+    @property
+    def E_blocked(self):
+        """
+        True for every element that has at least one node within interaction range. Counts the
+        pair list instead of reducing a dense N x E matrix, so it is O(E + pairs)
+        """
+        if self._E_blocked is None:
+            _, E_idxs = self.pairs
+            self._E_blocked = cp.bincount(E_idxs, minlength=self.E_node_1.shape[0]) > 0
+        return self._E_blocked
 
     @property
     def C_pos(self):
@@ -242,28 +622,6 @@ class CudaMemory:
             self._C_pos = cp.mean(self.N_pos[self.C_node_idxs], axis=1)
         return self._C_pos
 
-    def __make_cell2node_matrix(self, clst: List[AbstractCell]):
-        matrix = cp.zeros((self.C_node_idxs.shape[0], self.C_node_idxs.shape[1],
-                           self.N_pos.shape[0]))
-        for cii, c in enumerate(clst):
-            for nii, n in enumerate(c.node_list):
-                matrix[cii][nii][self.C_node_idxs[cii, nii]] = 1.
-        return matrix
-
-    def __make_element2node_matrices(self, elst: List[Element]):
-        matrix = cp.zeros((self.E_node_1_id.shape[0], self.N_pos.shape[0], 2), dtype=cp.float32)
-        for eii, e in enumerate(elst):
-            matrix[eii, self.N_id2idx[e.node_1.id], 0] = 1.
-            matrix[eii, self.N_id2idx[e.node_2.id], 1] = 1.
-        return matrix
-
-    def __make_cell2element_matrix(self, cell_list: List[AbstractCell]):
-        matrix = cp.zeros((self.C_node_idxs.shape[0], self.E_node_1.shape[0]), dtype=cp.float32)
-        for c_ii, c in enumerate(cell_list):
-            for e in c.element_list:
-                matrix[c_ii, e.id] = 1.
-        return matrix
-
     def __make_c_node_idxs(self, clst: List[AbstractCell], nlst: List[Node]):
         n_id = cp.array([n.id for n in nlst])
 
@@ -279,10 +637,3 @@ class CudaMemory:
         for ii in range(self.N_id.shape[0]):
             N_id2idx[self.N_id[ii]] = ii
         return N_id2idx
-
-    def __make_node2element_mask(self, elst: List[Element]):
-        mask = cp.zeros((self.N_pos.shape[0], self.E_node_1.shape[0]), dtype=cp.bool)
-        for eii, e in enumerate(elst):
-            mask[self.N_id2idx[e.node_1.id], eii] = True
-            mask[self.N_id2idx[e.node_2.id], eii] = True
-        return mask
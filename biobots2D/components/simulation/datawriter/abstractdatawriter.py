@@ -77,11 +77,13 @@ class AbstractDataWriter(ABC):
 
     def write_data(self, t):
         """
-
+        Writes every sampling_multiple steps, and of those only every output_stride of the
+        simulation, so output becomes coarse once SteadyState raises the stride
         :param t: AbstractCellSimulation
         :return:
         """
-        if t.step % self.sampling_multiple == 0:
+        if t.step % self.sampling_multiple == 0 \
+                and (t.step // self.sampling_multiple) % t.output_stride == 0:
             if not self.full_path_made:
                 self.make_full_path()
                 self.full_path_made = True
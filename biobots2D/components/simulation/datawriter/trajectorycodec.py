@@ -0,0 +1,108 @@
+import os
+import zlib
+
+import numpy as np
+
+RECORD = np.dtype(np.uint64)
+
+
+def _shuffle(a: np.ndarray) -> bytes:
+    # Groups the first bytes of every integer, then the second and so on. Small deltas make the
+    # high bytes almost all zero, which compresses far better than the bytes interleaved
+    return a.view(np.uint8).reshape(-1, a.itemsize).T.tobytes()
+
+
+def _unshuffle(data: bytes, dtype) -> np.ndarray:
+    dtype = np.dtype(dtype)
+    planes = np.frombuffer(data, dtype=np.uint8).reshape(dtype.itemsize, -1)
+    return np.ascontiguousarray(planes.T).view(dtype).ravel()
+
+
+class TrajectoryCodec:
+    def __init__(self, d_separation, tolerance=0.01, level=1):
+        """
+        Compresses the frames of a WriteTrajectory. The positions are rounded to a grid whose
+        spacing makes the error at most tolerance times d_separation, the preferred distance
+        between neighbouring cells, so the error is small against every length that matters to
+        the mechanics. The first frame of a chunk is a keyframe that holds the grid positions,
+        every later frame only the difference from the frame before, which is exact on the grid
+        and so never drifts. Each frame is byte shuffled and compressed with zlib on its own, so
+        chunks stay appendable.
+
+        Reading a frame decodes its chunk from the keyframe, so the chunk length of the writer is
+        the keyframe interval and bounds the cost of random access. With tolerance 0.01, the
+        grid positions fit in int32 for domains up to about 10^7 times d_separation across
+        :param d_separation: the cell cell separation distance of the model
+        :param tolerance: the largest position error as a fraction of d_separation
+        :param level: the zlib compression level, 1 is fastest
+        """
+        self.quantum = 2. * tolerance * d_separation
+        self.level = level
+        self.previous = None
+
+    def to_header(self):
+        return {'quantum': self.quantum, 'compressor': 'zlib', 'level': self.level}
+
+    def reset(self):
+        """
+        Makes the next frame a keyframe
+        :return:
+        """
+        self.previous = None
+
+    def encode(self, positions: np.ndarray) -> bytes:
+        """
+
+        :param positions: (nodes, 2) node positions
+        :return: the record of the frame, its length followed by the compressed data
+        """
+        grid = np.rint(positions / self.quantum).astype(np.int32)
+        delta = grid if self.previous is None else grid - self.previous
+        self.previous = grid
+
+        data = zlib.compress(_shuffle(delta), self.level)
+        return np.array(len(data), dtype=RECORD).tobytes() + data
+
+    @staticmethod
+    def count_frames(path) -> int:
+        """
+        Counts the complete frames of a chunk file, reading only the record lengths
+        :param path:
+        :return:
+        """
+        size = os.path.getsize(path)
+        frames, offset = 0, 0
+        with open(path, 'rb') as f:
+            while offset + RECORD.itemsize <= size:
+                f.seek(offset)
+                length = int(np.frombuffer(f.read(RECORD.itemsize), dtype=RECORD)[0])
+                offset += RECORD.itemsize + length
+                if offset > size:
+                    break
+                frames += 1
+        return frames
+
+    @staticmethod
+    def decode_chunk(data: bytes, nodes, quantum, dtype=np.float32) -> np.ndarray:
+        """
+        Decodes every complete frame of a chunk
+        :param data: the contents of the chunk file
+        :param nodes: the number of nodes in every frame
+        :param quantum: the grid spacing, see to_header
+        :param dtype: of the positions
+        :return: (frames, nodes, 2) node positions
+        """
+        deltas, offset = [], 0
+        while offset + RECORD.itemsize <= len(data):
+            length = int(np.frombuffer(data, dtype=RECORD, count=1, offset=offset)[0])
+            offset += RECORD.itemsize
+            if offset + length > len(data):
+                break
+            delta = _unshuffle(zlib.decompress(data[offset:offset + length]), np.int32)
+            deltas.append(delta.reshape(nodes, 2))
+            offset += length
+
+        if not deltas:
+            return np.empty((0, nodes, 2), dtype=dtype)
+        grid = np.cumsum(np.stack(deltas), axis=0, dtype=np.int64)
+        return (grid * quantum).astype(dtype)
@@ -0,0 +1,257 @@
+import atexit
+import bisect
+import json
+import os
+from collections import OrderedDict
+
+import cupy as cp
+import numpy as np
+
+from biobots2D.components.simulation.abstractcellsimulation import AbstractCellSimulation
+from biobots2D.components.simulation.datawriter.abstractdatawriter import AbstractDataWriter
+from biobots2D.components.simulation.datawriter.trajectorycodec import TrajectoryCodec
+
+# Everything needed to draw the cells from the node positions, written once per topology
+TOPOLOGY_ARRAYS = ('N_id', 'C_node_ids', 'C_node_idxs', 'C_type', 'E_node_1_id', 'E_node_2_id')
+
+HEADER = 'header.json'
+TIMES = 'times.bin'
+
+
+class WriteTrajectory(AbstractDataWriter):
+
+    def __init__(self, sm, sub_dir, chunk_frames=100, codec: TrajectoryCodec = None):
+        """
+        Stores the node positions of every sampled step as raw binary, instead of the CSV of
+        WriteSpatialState. The positions of a frame are appended to the current chunk file, and
+        a new chunk is started every chunk_frames frames, so each chunk can be memory mapped as
+        a (frames, nodes, 2) array, see Trajectory.
+
+        The topology, i.e. the node ids of the cells and elements and the cell types, is only
+        written when it changes. Every change, a division or death, is an event in the header
+        with the frame it applies from, and starts a new chunk, since the number of nodes may
+        have changed. The header is only rewritten when a chunk starts; the number of frames in
+        a chunk follows from its size, so a run that stops early leaves a readable trajectory.
+        The chunk file and the times are kept open while a chunk is written, and flushed when
+        it ends, by close, or at exit.
+
+        With a codec, the frames are quantised, delta coded and compressed, and each chunk
+        starts with a keyframe, see TrajectoryCodec
+        :param sm: sampling multiple
+        :param sub_dir:
+        :param chunk_frames: frames per chunk
+        :param codec: optional compression
+        """
+        super().__init__()
+        self._file_names = {HEADER, TIMES}
+        self._subdirectory_structure = [sub_dir, 'Trajectory/']
+        self.sampling_multiple = sm
+        self.multiple_files = False
+        self.chunk_frames = chunk_frames
+        self.codec = codec
+
+        self.header = {'dtype': None, 'chunk_frames': chunk_frames, 'chunks': [],
+                       'topologies': [], 'codec': None if codec is None else codec.to_header()}
+        self.frames = 0
+        self.chunk = None
+        self.topology_version = None
+        self.step = None
+
+        # Open while a chunk is written
+        self.chunk_file = None
+        self.times_file = None
+        atexit.register(self.close)
+
+    @property
+    def file_names(self):
+        return self._file_names
+
+    @file_names.setter
+    def file_names(self, value):
+        self._file_names = value
+
+    @property
+    def subdirectory_stucture(self):
+        return self._subdirectory_structure
+
+    @subdirectory_stucture.setter
+    def subdirectory_structure(self, value):
+        self._subdirectory_structure = value
+
+    def gather_data(self, t: AbstractCellSimulation):
+        """
+        Copies the positions to the host, and the topology if it changed since the last frame
+        :param t:
+        :return:
+        """
+        gpu = t.gpu
+        self.data = {'positions': cp.asnumpy(gpu.N_pos)}
+        if gpu.topology_version != self.topology_version:
+            self.data['topology'] = {name: cp.asnumpy(getattr(gpu, name))
+                                     for name in TOPOLOGY_ARRAYS}
+            self.topology_version = gpu.topology_version
+        self.step = t.step
+
+    def write_to_single_file(self):
+        positions = np.ascontiguousarray(self.data['positions'])
+
+        if 'topology' in self.data:
+            topology = self.data['topology']
+            name = f"topology_{len(self.header['topologies']):05d}.npz"
+            np.savez(os.path.join(self.full_path, name), **topology)
+            self.header['topologies'].append({'file': name, 'frame': self.frames,
+                                              'step': self.step, 't': self.time_point,
+                                              'cells': len(topology['C_type']),
+                                              'nodes': len(topology['N_id'])})
+            self.chunk = None
+
+        if self.chunk is None or self.frames - self.chunk['first_frame'] == self.chunk_frames:
+            self.start_chunk(positions)
+        elif self.chunk_file is None:
+            self.open_chunk()
+
+        self.chunk_file.write(
+            positions.tobytes() if self.codec is None else self.codec.encode(positions))
+        self.times_file.write(np.array([self.step, self.time_point], dtype=np.float64).tobytes())
+        self.frames += 1
+
+    def close(self):
+        """
+        Closes the files of the current chunk, so everything written so far is on disk
+        :return:
+        """
+        for f in (self.chunk_file, self.times_file):
+            if f is not None:
+                f.close()
+        self.chunk_file = None
+        self.times_file = None
+
+    def start_chunk(self, positions):
+        self.header['dtype'] = positions.dtype.str
+        self.chunk = {'file': f"positions_{len(self.header['chunks']):05d}.bin",
+                      'first_frame': self.frames, 'nodes': positions.shape[0],
+                      'topology': len(self.header['topologies']) - 1}
+        self.header['chunks'].append(self.chunk)
+        if self.codec is not None:
+            self.codec.reset()
+
+        # Written next to the header and moved into place, so it is never half written
+        path = os.path.join(self.full_path, HEADER)
+        with open(f"{path}.tmp", 'w') as f:
+            json.dump(self.header, f)
+        os.replace(f"{path}.tmp", path)
+
+        self.open_chunk()
+
+    def open_chunk(self):
+        """
+        Opens the files of the current chunk for appending, after closing those of the last
+        :return:
+        """
+        self.close()
+        self.chunk_file = open(os.path.join(self.full_path, self.chunk['file']), 'ab')
+        self.times_file = open(os.path.join(self.full_path, TIMES), 'ab')
+
+
+class Trajectory:
+    def __init__(self, path, cached_chunks=4):
+        """
+        Reads a trajectory written by WriteTrajectory. The chunks are memory mapped, so only the
+        frames that are used are read from disk. Compressed chunks are decoded whole on first
+        use and the last few are kept, so stepping through neighbouring frames is cheap
+        :param path: the folder of the trajectory
+        :param cached_chunks: how many decoded chunks to keep
+        """
+        self.path = path
+        with open(os.path.join(path, HEADER)) as f:
+            self.header = json.load(f)
+        self.dtype = np.dtype(self.header['dtype'])
+        self.codec = self.header.get('codec')
+
+        self.cached_chunks = cached_chunks
+        self._decoded = OrderedDict()
+
+        # The memory mapped positions of every chunk, or None for compressed chunks
+        self.chunks = []
+        frames = 0
+        for chunk in self.header['chunks']:
+            file = os.path.join(path, chunk['file'])
+            if not os.path.exists(file):
+                break
+            if self.codec is None:
+                n = os.path.getsize(file) // (chunk['nodes'] * 2 * self.dtype.itemsize)
+            else:
+                n = TrajectoryCodec.count_frames(file)
+            if n == 0:
+                break
+            self.chunks.append(None if self.codec else np.memmap(
+                file, dtype=self.dtype, mode='r', shape=(n, chunk['nodes'], 2)))
+            frames = chunk['first_frame'] + n
+        self.first_frames = [chunk['first_frame'] for chunk in self.header['chunks']]
+
+        times = np.fromfile(os.path.join(path, TIMES), dtype=np.float64).reshape(-1, 2)
+        self.n_frames = min(len(times), frames)
+        self.steps = times[:self.n_frames, 0].astype(np.int64)
+        self.times = times[:self.n_frames, 1]
+
+        self._topologies = {}
+
+    def __len__(self):
+        return self.n_frames
+
+    def _decode(self, ii):
+        """
+        The positions of a compressed chunk, decoded from its keyframe
+        :param ii: the chunk
+        :return: (frames, nodes, 2)
+        """
+        if ii in self._decoded:
+            self._decoded.move_to_end(ii)
+            return self._decoded[ii]
+
+        chunk = self.header['chunks'][ii]
+        with open(os.path.join(self.path, chunk['file']), 'rb') as f:
+            data = f.read()
+        positions = TrajectoryCodec.decode_chunk(data, chunk['nodes'], self.codec['quantum'],
+                                                 self.dtype)
+
+        self._decoded[ii] = positions
+        if len(self._decoded) > self.cached_chunks:
+            self._decoded.popitem(last=False)
+        return positions
+
+    def _chunk(self, frame):
+        if not 0 <= frame < self.n_frames:
+            raise IndexError(f"Frame {frame} is not in the trajectory")
+        return bisect.bisect_right(self.first_frames, frame) - 1
+
+    def positions(self, frame) -> np.ndarray:
+        """
+
+        :param frame:
+        :return: (nodes, 2) node positions, a view of the file
+        """
+        ii = self._chunk(frame)
+        chunk = self.chunks[ii] if self.codec is None else self._decode(ii)
+        return chunk[frame - self.first_frames[ii]]
+
+    def topology(self, frame) -> dict:
+        """
+
+        :param frame:
+        :return: the arrays of TOPOLOGY_ARRAYS that apply to the frame
+        """
+        version = self.header['chunks'][self._chunk(frame)]['topology']
+        if version not in self._topologies:
+            file = os.path.join(self.path, self.header['topologies'][version]['file'])
+            with np.load(file) as arrays:
+                self._topologies[version] = dict(arrays)
+        return self._topologies[version]
+
+    @property
+    def events(self):
+        """
+        The topology changes, with the frame, step and time they apply from
+        :return:
+        """
+        return self.header['topologies']
@@ -0,0 +1,164 @@
+import copy
+import numbers
+from typing import List
+
+import cupy as cp
+import numpy as np
+
+from biobots2D.components.simulation.abstractcellsimulation import AbstractCellSimulation
+from biobots2D.components.simulation.cuda_memory import CudaMemory
+from biobots2D.components.simulation.freecellsimulation import FreeCellSimulation
+from biobots2D.components.simulation.stopping.abstractstoppingcondition import \
+    AbstractStoppingCondition
+from utils.rng import unit_vectors
+
+
+class EnsembleSimulation(FreeCellSimulation):
+    def __init__(self, replicas: List[AbstractCellSimulation], spacing=None, check_every=10):
+        """
+        Advances many independent replicas of a simulation with one pass over the arrays per
+        step. The memories of the replicas are concatenated block diagonally (see
+        CudaMemory.concatenate), and the replicas are laid out side by side so the spatial hash
+        hardly ever looks at two replicas at once. Nodes are never paired with elements of
+        another replica.
+
+        The replicas must be built by the same model, so they have the same forces and signals
+        in the same order. A force parameter that differs between the replicas becomes an
+        array with one value per replica, which is only allowed for the parameters a force
+        lists in replica_parameters. Every replica draws its jiggle with its own seed and its
+        own node ids, so it gets the same numbers as when it runs alone. Every replica also has
+        its own stopping state: a replica that meets a replica stopping condition is frozen
+        while the others carry on.
+
+        All replicas share t and dt. Only the GPU path is supported, the node, element and cell
+        objects of the replicas are kept for rendering but their ids overlap.
+
+        :param replicas: the simulations to run, e.g. [Gradient(seed=s) for s in range(64)]
+        :param spacing: the distance between the origins of neighbouring replicas. Defaults to
+        twice the widest replica
+        :param check_every: evaluate the replica stopping conditions every this many steps
+        """
+        super().__init__()
+        first = replicas[0]
+
+        self.replicas = replicas
+        self.n_replicas = len(replicas)
+        self.stopping_check_every = check_every
+
+        self.dt = first.dt
+        self.dt_cuda = cp.float32(self.dt)
+        self.stochastic_jiggle = first.stochastic_jiggle
+        self.epsilon = first.epsilon
+        self.epsilon_cuda = cp.float32(self.epsilon)
+        self.using_boxes = first.using_boxes
+        self.integrator = first.integrator
+
+        for replica in replicas:
+            self.node_list += replica.node_list
+            self.element_list += replica.element_list
+            self.cell_list += replica.cell_list
+
+        self.tissue_based_forces = self._merge([r.tissue_based_forces for r in replicas])
+        self.cell_based_forces = self._merge([r.cell_based_forces for r in replicas])
+        self.element_based_forces = self._merge([r.element_based_forces for r in replicas])
+        self.neighbourhood_based_forces = self._merge(
+            [r.neighbourhood_based_forces for r in replicas])
+        self.information_processing_signals = self._merge(
+            [r.information_processing_signals for r in replicas])
+        self.cadences = dict(first.cadences)
+
+        # Lay the replicas out along x
+        lower = [cp.min(r.gpu.N_pos, axis=0) for r in replicas]
+        upper = [cp.max(r.gpu.N_pos, axis=0) for r in replicas]
+        if spacing is None:
+            spacing = 2 * max(float(u[0] - l[0]) for l, u in zip(lower, upper))
+        self.replica_offsets = cp.zeros((self.n_replicas, 2), dtype=cp.float32)
+        self.replica_offsets[:, 0] = cp.arange(self.n_replicas) * spacing
+
+        self.gpu = CudaMemory.concatenate([r.gpu for r in replicas])
+        self.gpu.N_pos = self.gpu.N_pos + self.replica_offsets[self.gpu.N_replica]
+        self.gpu.replica_offsets = self.replica_offsets
+        # The objects are still views of the rows of their replica, which no longer moves on
+        self.gpu.bind(self.cell_list, self.element_list, self.node_list)
+
+        # The key of the counter based generator for every replica, and the shift of the node ids
+        # of every replica, see CudaMemory.concatenate. Both are looked up per node, so they stay
+        # valid when cells die or divide
+        self.replica_seeds = cp.array([r.seed or 0 for r in replicas], dtype=cp.uint64)
+        self.replica_id_offsets = cp.cumsum(cp.array(
+            [0] + [int(cp.max(r.gpu.N_id)) + 1 for r in replicas[:-1]], dtype=cp.int64))
+
+        self.replica_stopping_conditions: List[AbstractStoppingCondition] = []
+        self.replica_stopped = cp.zeros(self.n_replicas, dtype=cp.bool_)
+        self.replica_stop_time = cp.full(self.n_replicas, cp.nan, dtype=cp.float32)
+
+    @staticmethod
+    def _merge(components: List[List]):
+        """
+        One force or signal per position in the replica lists. Scalar parameters that differ
+        between replicas are turned into arrays with one value per replica
+        :param components: per replica, its list of forces or signals
+        :return:
+        """
+        merged = []
+        for instances in zip(*components):
+            shared = copy.copy(instances[0])
+            for name, value in vars(shared).items():
+                if not isinstance(value, (numbers.Number, np.generic)):
+                    continue
+                values = [float(getattr(instance, name)) for instance in instances]
+                if len(set(values)) == 1:
+                    continue
+                if name not in getattr(shared, 'replica_parameters', ()):
+                    raise ValueError(f"{type(shared).__name__}.{name} differs between replicas, "
+                                     f"but is not a per replica parameter")
+                setattr(shared, name, cp.array(values, dtype=cp.float32))
+            merged.append(shared)
+        return merged
+
+    def add_replica_stopping_condition(self, condition: AbstractStoppingCondition):
+        """
+        A replica is frozen as soon as the condition holds for it
+        :param condition:
+        :return:
+        """
+        self.replica_stopping_conditions.append(condition)
+
+    def is_stopping_condition_met(self):
+        """
+        Replica conditions are evaluated on the device every stopping_check_every steps, so the
+        host only waits for the device to see if all replicas have stopped
+        :return:
+        """
+        if self.replica_stopping_conditions and self.step % self.stopping_check_every == 0:
+            for condition in self.replica_stopping_conditions:
+                met = condition.has_stopping_condition_been_met(self) & ~self.replica_stopped
+                self.replica_stop_time = cp.where(met, cp.float32(self.t), self.replica_stop_time)
+                self.replica_stopped |= met
+            if bool(cp.all(self.replica_stopped)):
+                return True
+        return super().is_stopping_condition_met()
+
+    def random_directions(self):
+        """
+        Every replica draws the jiggle of its nodes with its own seed and node ids, in one call
+        for all replicas
+        :return:
+        """
+        N_replica = self.gpu.N_replica
+        return unit_vectors(self.replica_seeds[N_replica], self.step,
+                            self.gpu.N_id - self.replica_id_offsets[N_replica])
+
+    def make_nodes_move_cuda(self):
+        super().make_nodes_move_cuda()
+
+        # Stopped replicas stay where they are
+        frozen = self.replica_stopped[self.gpu.N_replica]
+        self.gpu.N_pos = cp.where(frozen[:, None], self.gpu.N_pos_previous, self.gpu.N_pos)
+
+    def replica_node_positions(self):
+        """
+        The node positions of all replicas in their own frame, without the layout offsets
+        :return:
+        """
+        return self.gpu.local_positions()
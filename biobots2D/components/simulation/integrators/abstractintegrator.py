@@ -0,0 +1,24 @@
+from abc import ABC, abstractmethod
+
+
+class AbstractIntegrator(ABC):
+    """
+    This class sets out how node positions are advanced through one time step.
+
+    The motion is drag dominated, so a node moves with velocity N_for / N_eta. When integrate
+    is called, N_for holds the forces at the start of the step. Multi stage methods get the
+    forces at their intermediate states from AbstractCellSimulation.evaluate_forces_at, which
+    leaves the memory untouched.
+    """
+
+    @abstractmethod
+    def integrate(self, t):
+        """
+        :param t: AbstractCellSimulation
+        :return: the node positions at the end of the step
+        """
+        pass
+
+    @staticmethod
+    def velocity(t, N_for):
+        return N_for / t.gpu.N_eta[:, None]
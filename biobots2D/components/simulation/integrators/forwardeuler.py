@@ -0,0 +1,12 @@
+from biobots2D.components.simulation.integrators.abstractintegrator import AbstractIntegrator
+
+
+class ForwardEuler(AbstractIntegrator):
+    """
+    x(t + dt) = x(t) + dt * v(x(t))
+
+    First order, and one force evaluation per step
+    """
+
+    def integrate(self, t):
+        return t.gpu.N_pos + t.dt_cuda * self.velocity(t, t.gpu.N_for)
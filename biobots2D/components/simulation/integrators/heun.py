@@ -0,0 +1,21 @@
+from biobots2D.components.simulation.integrators.abstractintegrator import AbstractIntegrator
+
+
+class Heun(AbstractIntegrator):
+    """
+    The explicit trapezoidal rule (RK2)
+    k1 = v(x)
+    k2 = v(x + dt * k1)
+    x(t + dt) = x + dt / 2 * (k1 + k2)
+
+    Second order, and two force evaluations per step
+    """
+
+    def integrate(self, t):
+        gpu = t.gpu
+        dt = t.dt_cuda
+
+        k1 = self.velocity(t, gpu.N_for)
+        k2 = self.velocity(t, t.evaluate_forces_at(gpu.N_pos + dt * k1, t.t + t.dt))
+
+        return gpu.N_pos + dt / 2 * (k1 + k2)
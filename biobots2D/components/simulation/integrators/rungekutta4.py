@@ -0,0 +1,26 @@
+from biobots2D.components.simulation.integrators.abstractintegrator import AbstractIntegrator
+
+
+class RungeKutta4(AbstractIntegrator):
+    """
+    The classic fourth order Runge-Kutta method
+    k1 = v(x)
+    k2 = v(x + dt / 2 * k1)
+    k3 = v(x + dt / 2 * k2)
+    k4 = v(x + dt * k3)
+    x(t + dt) = x + dt / 6 * (k1 + 2 * k2 + 2 * k3 + k4)
+
+    Fourth order, and four force evaluations per step
+    """
+
+    def integrate(self, t):
+        gpu = t.gpu
+        dt = t.dt_cuda
+        t_half = t.t + t.dt / 2
+
+        k1 = self.velocity(t, gpu.N_for)
+        k2 = self.velocity(t, t.evaluate_forces_at(gpu.N_pos + dt / 2 * k1, t_half))
+        k3 = self.velocity(t, t.evaluate_forces_at(gpu.N_pos + dt / 2 * k2, t_half))
+        k4 = self.velocity(t, t.evaluate_forces_at(gpu.N_pos + dt * k3, t.t + t.dt))
+
+        return gpu.N_pos + dt / 6 * (k1 + 2 * k2 + 2 * k3 + k4)
@@ -0,0 +1,187 @@
+import csv
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from tqdm import tqdm
+
+from biobots2D.components.simulation.cuda_memory import CudaMemory, synchronize
+
+
+class SimulationProfiler:
+    def __init__(self, window=100, synchronize_streams=False, path=None):
+        """
+        Records where the time goes in AbstractCellSimulation.next_time_step. Every phase of the
+        step and every force object is timed with time.perf_counter. GPU kernels run
+        asynchronously, so without synchronize_streams the time of a kernel is booked to
+        whichever phase next waits for the device. Synchronising gives honest per phase timings,
+        at the cost of removing the overlap between host and device.
+
+        Besides wall time, the profiler counts the node-element pairs found each step, how often
+        the forces were evaluated and how often each derived quantity in CudaMemory was
+        calculated, including the evaluations of integrator stages and rejected steps.
+
+        A step is closed when the next one starts, or by report, so whatever runs between steps,
+        like rendering, is booked to the step before it.
+
+        Phases can run inside others, e.g. the forces of the integrator stages run inside
+        movement. Time is booked exclusively, a phase does not include the phases run inside it,
+        so the shares add up to the whole. The exception is the breakdown of a phase by object,
+        named like 'cell forces/EdgeSpringForce', which is part of its parent and left out of the
+        total.
+
+        :param window: the number of steps in the rolling statistics
+        :param synchronize_streams: wait for the device before and after every phase
+        :param path: if given, rolling statistics are appended to this csv file every window
+        steps
+        """
+        self.window = window
+        self.synchronize_streams = synchronize_streams
+        self.path = path
+
+        self.steps = 0
+
+        # Accumulated over the whole run, keyed by phase name
+        self.total_time = {}
+        self.calls = {}
+
+        # Per step durations of the last window steps, keyed by phase name
+        self.recent_time = {}
+        self._step_time = {}
+        # The open phases, innermost last, each with the time of the phases run inside it
+        self._open = []
+
+        self.total_pairs = 0
+        self.recent_pairs = deque(maxlen=window)
+
+        # Number of times each derived quantity was calculated
+        self.recomputations = {name.lstrip('_'): 0 for name in CudaMemory.DYNAMIC_MEMORY}
+        self.force_evaluations = 0
+
+        self._step_open = False
+        self._written_at = 0
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Times the code in the with block and books it under name, less the time of the phases
+        run inside it
+        :param name:
+        :return:
+        """
+        if self.synchronize_streams:
+            synchronize()
+        t0 = time.perf_counter()
+        self._open.append([name, 0.])
+        try:
+            yield
+        finally:
+            if self.synchronize_streams:
+                synchronize()
+            _, nested = self._open.pop()
+            elapsed = time.perf_counter() - t0
+            if self._open and not name.startswith(f"{self._open[-1][0]}/"):
+                self._open[-1][1] += elapsed
+            elapsed -= nested
+            self.total_time[name] = self.total_time.get(name, 0.) + elapsed
+            self.calls[name] = self.calls.get(name, 0) + 1
+            self._step_time[name] = self._step_time.get(name, 0.) + elapsed
+
+    def count_recomputations(self, gpu: CudaMemory):
+        """
+        Counts the derived quantities that are in memory. Must be called before they are
+        discarded, at the end of the step and after every trial evaluation
+        :param gpu:
+        :return:
+        """
+        for name in gpu.DYNAMIC_MEMORY:
+            if getattr(gpu, name) is not None:
+                self.recomputations[name.lstrip('_')] += 1
+
+    def end_step(self, gpu: CudaMemory):
+        """
+        Must be called once per step, before the dynamic memory is cleared. The pair count is
+        read from the shape of the pair list, so it does not wait for the device. The timings of
+        the step are kept open until close_step
+        :param gpu:
+        :return:
+        """
+        if gpu._pairs is not None:
+            n_pairs = gpu._pairs[0].shape[0]
+            self.total_pairs += n_pairs
+            self.recent_pairs.append(n_pairs)
+
+        self.count_recomputations(gpu)
+        self._step_open = True
+
+    def close_step(self):
+        """
+        Moves the timings of the last step into the rolling statistics. Called at the start of
+        the next step and by report
+        :return:
+        """
+        if not self._step_open:
+            return
+        self._step_open = False
+
+        for name, elapsed in self._step_time.items():
+            if name not in self.recent_time:
+                self.recent_time[name] = deque(maxlen=self.window)
+            self.recent_time[name].append(elapsed)
+        self._step_time = {}
+        # The open phases, innermost last, each with the time of the phases run inside it
+        self._open = []
+
+        self.steps += 1
+        if self.path is not None and self.steps % self.window == 0:
+            self.write_rolling_statistics()
+
+    def rolling_mean(self, name):
+        recent = self.recent_time.get(name, ())
+        return sum(recent) / len(recent) if len(recent) else 0.
+
+    def write_rolling_statistics(self):
+        """
+        Appends one row per phase with the mean duration over the last window steps
+        :return:
+        """
+        self._written_at = self.steps
+        new_file = not os.path.isfile(self.path)
+        with open(self.path, 'a+', newline='') as f:
+            writer = csv.writer(f, delimiter=',', quotechar='|', quoting=csv.QUOTE_MINIMAL)
+            if new_file:
+                writer.writerow(['step', 'phase', 'mean_ms', 'mean_pairs'])
+            mean_pairs = sum(self.recent_pairs) / len(self.recent_pairs) \
+                if len(self.recent_pairs) else 0.
+            for name in self.recent_time:
+                writer.writerow([self.steps, name, f"{self.rolling_mean(name) * 1e3:.5f}",
+                                 f"{mean_pairs:.1f}"])
+
+    def summary(self):
+        """
+        A table of all phases, slowest first
+        :return:
+        """
+        steps = max(self.steps, 1)
+        total = sum(self.total_time[name] for name in self.total_time if '/' not in name)
+
+        lines = [f"{'phase':<48}{'calls':>8}{'total s':>10}{'ms/step':>10}"
+                 f"{'rolling':>10}{'share':>8}"]
+        for name in sorted(self.total_time, key=self.total_time.get, reverse=True):
+            lines.append(f"{name:<48}{self.calls[name]:>8}{self.total_time[name]:>10.3f}"
+                         f"{self.total_time[name] / steps * 1e3:>10.3f}"
+                         f"{self.rolling_mean(name) * 1e3:>10.3f}"
+                         f"{self.total_time[name] / max(total, 1e-12):>8.1%}")
+
+        lines.append(f"steps: {self.steps}, pairs/step: {self.total_pairs / steps:.1f}, "
+                     f"force evaluations/step: {self.force_evaluations / steps:.2f}")
+        lines.append("recomputations: " + ", ".join(
+            f"{name}={count}" for name, count in self.recomputations.items() if count))
+        return '\n'.join(lines)
+
+    def report(self):
+        self.close_step()
+        tqdm.write(self.summary())
+        if self.path is not None and self._written_at != self.steps:
+            self.write_rolling_statistics()
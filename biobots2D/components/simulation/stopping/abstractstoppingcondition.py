@@ -17,10 +17,35 @@ class AbstractStoppingCondition(ABC):
 
     @abstractmethod
     def has_stopping_condition_been_met(self, t):
+        """
+        A vectorised predicate over the memory arrays. It stays on the device, so the
+        simulation can evaluate all conditions and fetch the results in one transfer
+
+        :param t: the simulation
+        :return: a boolean device array with one entry per replica
+        """
         pass
 
     def check_stopping_condition(self, t):
-        stopped = self.has_stopping_condition_been_met(t)
+        met = bool(self.has_stopping_condition_been_met(t).all())
+        return met and self.on_met(t)
+
+    def on_met(self, t):
+        """
+        Called on the host once the condition holds for every replica
 
-        if stopped:
-            print(f"Simulation stopped by {self.name}")
+        :param t: the simulation
+        :return: whether the run stops
+        """
+        self.announce()
+        return True
+
+    def announce(self):
+        print(f"Simulation stopped by {self.name}")
+
+    def summary(self):
+        """
+        Statistics for the end of run report, or None
+        :return:
+        """
+        return None
@@ -0,0 +1,46 @@
+import cupy as cp
+import cupyx
+
+from biobots2D.components.simulation.stopping.abstractstoppingcondition import \
+    AbstractStoppingCondition
+
+
+class CentroidNearFood(AbstractStoppingCondition):
+    def __init__(self, radius, cell_types=(2, 4), food_type=3):
+        """
+        Stops when the centroid of the bot is within radius of a food cell. The bot is made of
+        the cells of the given types, cilia and sensor cells by default. In an ensemble every
+        replica is only compared with its own food
+
+        :param radius:
+        :param cell_types: the cell types that make up the bot
+        :param food_type:
+        """
+        self.radius = radius
+        self.cell_types = cp.array(cell_types)
+        self.food_type = food_type
+
+    @property
+    def name(self):
+        return f"centroid within {self.radius} of food"
+
+    def has_stopping_condition_been_met(self, t):
+        gpu = t.gpu
+
+        # From the node positions, the cached cell positions belong to the start of the step
+        C_pos = cp.mean(gpu.local_positions()[gpu.C_node_idxs], axis=1)
+
+        bot = cp.where(cp.isin(gpu.C_type, self.cell_types))[0]
+        bot_replica = gpu.C_replica[bot]
+        count = cp.bincount(bot_replica, minlength=gpu.n_replicas)
+        centroid = cp.stack([cp.bincount(bot_replica, weights=C_pos[bot, ii],
+                                         minlength=gpu.n_replicas) for ii in range(2)], axis=1)
+        centroid /= cp.maximum(count, 1)[:, None]
+
+        food = cp.where(gpu.C_type == self.food_type)[0]
+        food_replica = gpu.C_replica[food]
+        distance = cp.linalg.norm(C_pos[food] - centroid[food_replica], axis=1)
+
+        nearest = cp.full(gpu.n_replicas, cp.inf, dtype=distance.dtype)
+        cupyx.scatter_min(nearest, food_replica, distance)
+        return nearest < self.radius
@@ -0,0 +1,31 @@
+import cupy as cp
+import cupyx
+
+from biobots2D.components.simulation.stopping.abstractstoppingcondition import \
+    AbstractStoppingCondition
+
+
+class MaxNodeSpeedBelow(AbstractStoppingCondition):
+    def __init__(self, threshold):
+        """
+        Stops when no node moved faster than threshold in the last step
+
+        :param threshold: speed in distance per unit of time
+        """
+        self.threshold = threshold
+
+    @property
+    def name(self):
+        return f"max node speed below {self.threshold}"
+
+    def has_stopping_condition_been_met(self, t):
+        gpu = t.gpu
+        if gpu.N_pos_previous is None:
+            return cp.zeros(gpu.n_replicas, dtype=cp.bool_)
+
+        # dt may already be changed for the next step, the displacement is over the last one
+        speed = cp.linalg.norm(gpu.N_pos - gpu.N_pos_previous, axis=1) / t.last_dt_cuda
+
+        max_speed = cp.zeros(gpu.n_replicas, dtype=speed.dtype)
+        cupyx.scatter_max(max_speed, gpu.N_replica, speed)
+        return max_speed < self.threshold
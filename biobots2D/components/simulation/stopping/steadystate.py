@@ -0,0 +1,120 @@
+import cupy as cp
+
+from biobots2D.components.simulation.stopping.abstractstoppingcondition import \
+    AbstractStoppingCondition
+
+
+class SteadyState(AbstractStoppingCondition):
+    STATISTICS = ('node speed', 'mean force', 'area drift')
+
+    def __init__(self, speed_tolerance=1e-3, force_tolerance=None, area_tolerance=1e-4,
+                 window=20, coarse_stride=None):
+        """
+        Detects mechanical equilibrium. Every time it is evaluated it records, per replica
+        - the mean node speed over the last step
+        - the mean magnitude of the node forces of the last step
+        - the relative drift of the total cell area per step since the last evaluation
+        with a few reductions on the memory arrays, into a rolling window that stays on the
+        device. The run is steady once every recorded value in a full window is below its
+        tolerance. A tolerance of None leaves that statistic out.
+
+        By default the run then stops. With coarse_stride the run carries on, but the output
+        stride of the simulation is raised to coarse_stride, so an equilibrated run produces
+        little output. The switch happens in on_met, so the steady flag reaches the host with
+        the other stopping conditions and never on its own. As a replica stopping condition of
+        an ensemble, coarse_stride is not supported; a steady replica is frozen
+
+        :param speed_tolerance:
+        :param force_tolerance:
+        :param area_tolerance:
+        :param window: the number of evaluations that must all be below tolerance
+        :param coarse_stride: if given, switch to coarse output instead of stopping
+        """
+        self.tolerances = (speed_tolerance, force_tolerance, area_tolerance)
+        self.window = window
+        self.coarse_stride = coarse_stride
+
+        self.history = None
+        self.evaluations = 0
+        self.previous_area = None
+        self.previous_step = None
+        self.steady_since = None
+
+    @property
+    def name(self):
+        return "steady state"
+
+    def has_stopping_condition_been_met(self, t):
+        gpu = t.gpu
+        if gpu.N_pos_previous is None:
+            return cp.zeros(gpu.n_replicas, dtype=cp.bool_)
+
+        statistics = self.record(t)
+
+        if self.history is None:
+            self.history = cp.full((self.window,) + statistics.shape, cp.inf, dtype=cp.float32)
+        self.history[self.evaluations % self.window] = statistics
+        self.evaluations += 1
+
+        steady = cp.ones(gpu.n_replicas, dtype=cp.bool_)
+        for ii, tolerance in enumerate(self.tolerances):
+            if tolerance is not None:
+                steady &= cp.max(self.history[:, ii], axis=0) < tolerance
+
+        return steady
+
+    def on_met(self, t):
+        if self.coarse_stride is None:
+            return super().on_met(t)
+
+        if self.steady_since is None:
+            self.steady_since = t.step
+            t.output_stride = self.coarse_stride
+            print(f"Steady state at step {t.step}, switching to coarse output")
+        return False
+
+    def record(self, t):
+        """
+        The statistics of the current step
+        :param t:
+        :return: (3, replicas) array
+        """
+        gpu = t.gpu
+        nodes = cp.bincount(gpu.N_replica, minlength=gpu.n_replicas)
+
+        def node_mean(values):
+            return cp.bincount(gpu.N_replica, weights=values, minlength=gpu.n_replicas) / nodes
+
+        # dt may already be changed for the next step, the displacement is over the last one
+        speed = node_mean(cp.linalg.norm(gpu.N_pos - gpu.N_pos_previous, axis=1)
+                          / t.last_dt_cuda)
+        force = node_mean(cp.linalg.norm(gpu.N_for_previous, axis=1))
+
+        area = cp.bincount(gpu.C_replica, weights=gpu.C_area, minlength=gpu.n_replicas)
+        if self.previous_area is None:
+            drift = cp.full(gpu.n_replicas, cp.inf)
+        else:
+            drift = cp.abs(area - self.previous_area) / self.previous_area \
+                    / max(t.step - self.previous_step, 1)
+        self.previous_area = area
+        self.previous_step = t.step
+
+        return cp.stack((speed, force, drift)).astype(cp.float32)
+
+    def summary(self):
+        """
+        The rolling means of the statistics over the last window, per replica
+        :return:
+        """
+        if self.history is None:
+            return None
+        filled = self.history[:min(self.evaluations, self.window)]
+        means = cp.asnumpy(cp.nanmean(cp.where(cp.isinf(filled), cp.nan, filled), axis=0))
+
+        lines = [f"steady state: {self.evaluations} evaluations"
+                 + ("" if self.steady_since is None else
+                    f", coarse output since step {self.steady_since}")]
+        for name, mean, tolerance in zip(self.STATISTICS, means, self.tolerances):
+            values = ', '.join(f"{value:.3e}" for value in mean)
+            lines.append(f"  {name:<12} rolling mean {values} (tolerance {tolerance})")
+        return '\n'.join(lines)
@@ -0,0 +1,32 @@
+from abc import ABC, abstractmethod
+
+
+class AbstractTimeStepController(ABC):
+    """
+    This class sets out the required functions for choosing the time step size while the
+    simulation runs.
+
+    Once the forces for a step are known, the controller decides if the step can be taken with
+    the current dt. If not, it picks a smaller dt and the simulation recalculates the forces and
+    asks again. After the step the controller sets the dt for the next step.
+    """
+
+    @abstractmethod
+    def accept_step(self, t):
+        """
+        :param t: AbstractCellSimulation, with the forces for this step in memory
+        :return: True if the step can go ahead with t.dt, otherwise t.dt has been reduced
+        """
+        pass
+
+    @abstractmethod
+    def end_step(self, t):
+        """
+        Called after the step has been taken and the time updated
+        :param t:
+        :return:
+        """
+        pass
+
+    def summary(self):
+        return ""
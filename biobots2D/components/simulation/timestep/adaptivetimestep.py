@@ -0,0 +1,107 @@
+import cupy as cp
+
+from biobots2D.components.simulation.timestep.abstracttimestepcontroller import \
+    AbstractTimeStepController
+
+
+class AdaptiveTimeStep(AbstractTimeStepController):
+    def __init__(self, d_separation, d_asymptote, dt_min, dt_max, max_fraction=0.1, safety=0.9,
+                 max_growth=1.5):
+        """
+        Chooses dt so that no node moves further in one step than a fraction of the repulsion
+        range of the cell-cell interaction force, d_separation - d_asymptote. Most of the time
+        the tissue is close to steady and dt can grow to dt_max, while fast transients get
+        small steps.
+
+        A step is rejected, and retried with a smaller dt, when
+        - the largest node displacement is above max_fraction * (d_separation - d_asymptote), or
+        - a node that is currently in front of an element would end up at or behind the force
+          asymptote of that element
+        Once dt has shrunk to dt_min the step is taken regardless.
+
+        Both checks come back from the device in one transfer per attempt.
+
+        :param d_separation: preferred separation of the interaction force
+        :param d_asymptote: asymptote of the interaction force
+        :param dt_min: smallest time step
+        :param dt_max: largest time step
+        :param max_fraction: the largest allowed displacement, as a fraction of the repulsion
+        range
+        :param safety: factor below 1 applied to each new step size, so it does not sit right at
+        the limit
+        :param max_growth: the largest factor dt may grow by between steps
+        """
+        self.d_asymptote = cp.float32(d_asymptote)
+        self.max_displacement = cp.float32(max_fraction * (d_separation - d_asymptote))
+        self.dt_min = dt_min
+        self.dt_max = dt_max
+        self.safety = safety
+        self.max_growth = max_growth
+
+        self.next_dt = None
+        self.rejections = 0
+        self.total_rejections = 0
+
+        # One entry per accepted step: (step, t, dt, rejections before acceptance)
+        self.history = []
+        self._dt_taken = None
+
+    def accept_step(self, t):
+        gpu = t.gpu
+        dt = t.dt
+
+        step = t.dt_cuda / gpu.N_eta[:, None] * gpu.N_for
+        displacement = cp.max(cp.linalg.norm(step, axis=1))
+
+        crossed = self.crosses_asymptote(gpu, gpu.N_pos + step)
+
+        displacement, crossed = cp.asnumpy(cp.stack((displacement, crossed.astype(cp.float32))))
+        ratio = float(self.max_displacement) / max(float(displacement), 1e-12)
+
+        if (crossed or ratio < 1.) and dt > self.dt_min:
+            new_dt = dt * self.safety * min(ratio, 1.)
+            if crossed:
+                new_dt = min(new_dt, dt / 2)
+            t.set_dt(max(new_dt, self.dt_min))
+            self.rejections += 1
+            self.total_rejections += 1
+            return False
+
+        self._dt_taken = dt
+        self.next_dt = min(max(dt * min(self.max_growth, self.safety * ratio), self.dt_min),
+                           self.dt_max)
+        return True
+
+    def crosses_asymptote(self, gpu, N_pos_new):
+        """
+        True if any node-element pair, other than internal ones, goes from in front of the
+        asymptote to at or behind it
+        :param gpu:
+        :param N_pos_new: the positions at the end of the proposed step
+        :return: a 0-d boolean array
+        """
+        N_idxs, E_idxs = gpu.pairs
+        external = ~gpu.E_internal[E_idxs]
+
+        x_old = cp.sum((gpu.N_pos[N_idxs] - gpu.N_pos[gpu.E_node_1[E_idxs]])
+                       * gpu.outward_normal[E_idxs], axis=1)
+
+        n1 = N_pos_new[gpu.E_node_1[E_idxs]]
+        u = N_pos_new[gpu.E_node_2[E_idxs]] - n1
+        u /= cp.linalg.norm(u, axis=1)[:, None]
+        v = u @ gpu.rotate_clockwise_2d
+        x_new = cp.sum((N_pos_new[N_idxs] - n1) * v, axis=1)
+
+        return cp.any(external & (x_old > self.d_asymptote) & (x_new <= self.d_asymptote))
+
+    def end_step(self, t):
+        self.history.append((t.step, t.t, self._dt_taken, self.rejections))
+        self.rejections = 0
+        t.set_dt(self.next_dt)
+
+    def summary(self):
+        if not len(self.history):
+            return "No adaptive steps taken"
+        dts = [h[2] for h in self.history]
+        return f"steps: {len(self.history)}, rejected: {self.total_rejections}, " \
+               f"dt min/mean/max: {min(dts):.2e}/{sum(dts) / len(dts):.2e}/{max(dts):.2e}"
@@ -0,0 +1,199 @@
+import cupy as cp
+
+from biobots2D.components.simulation.cuda_memory import CudaMemory, dot
+
+
+def divide_cells(gpu: CudaMemory, cells: cp.ndarray, split: cp.ndarray, separation):
+    """
+    Divides cells in one pass over the arrays, the batched form of CellFree.divide. Every cell
+    is cut along the line from its split node to the point half way round its ring, which is
+    the opposite node when the cells have an even number of nodes, and the midpoint of the
+    opposite element when they have an odd number.
+
+    The first daughter keeps the row of the parent, its half of the perimeter with the split
+    and opposite nodes, and the elements along it. The second daughter is a new row with the
+    other half of the perimeter, whose ends are copies of the split and opposite nodes. Both
+    get intermediate nodes along the cut, so they have as many nodes as the parent. The nodes on
+    the cut are moved half of separation apart, each towards its own daughter.
+
+    For k nodes per cell, each division adds k nodes, k elements and a cell. They are appended
+    to the arrays, and the index tables of the parents are rewritten, the memory object is kept
+    :param gpu:
+    :param cells: indices of the dividing cells
+    :param split: for each dividing cell, the position of the split node in its ring
+    :param separation: the gap between the daughters
+    :return: (parents, daughters), the cell indices of the first and second daughters
+    """
+    k = gpu.C_node_idxs.shape[1]
+    h, r = divmod(k, 2)
+    d = cells.shape[0]
+
+    # Nodes and elements of every dividing cell starting from its split node, so P[:, 0] is
+    # the split node and P[:, h] the opposite one, or the first end of the opposite element
+    # when k is odd. Element m joins node m to node m + 1
+    ring = (split[:, None] + cp.arange(k)) % k
+    P = cp.take_along_axis(gpu.C_node_idxs[cells], ring, axis=1)
+    PE = cp.take_along_axis(gpu.C_element_idxs[cells], ring, axis=1)
+
+    s = gpu.N_pos[P[:, 0]]
+    o = 0.5 * (gpu.N_pos[P[:, h]] + gpu.N_pos[P[:, h + r]])
+    normal = (o - s) @ gpu.rotate_clockwise_2d
+    normal /= cp.linalg.norm(normal, axis=1)[:, None]
+    # Points towards the side of the first daughter
+    side = cp.where(dot(cp.mean(gpu.N_pos[P[:, 1:h + 1]], axis=1) - s, normal) < 0, -1., 1.)
+    shift = (0.5 * separation * side)[:, None] * normal
+
+    # Per division, the new nodes are the opposite node of the first daughter when k is odd,
+    # the intermediate nodes of the first daughter, the copies of the opposite and split nodes,
+    # and the intermediate nodes of the second daughter. When k is odd the opposite element is
+    # cut at its midpoint, so neither daughter keeps a node of the parent there. The new rows
+    # are copied from the split node, the elements of the parent and the parent. The second
+    # half of the opposite element, when k is odd, is copied from the opposite element
+    element_sources = cp.repeat(PE[:, :1], k, axis=1)
+    if r:
+        element_sources[:, h] = PE[:, h]
+    new_nodes = gpu.append_rows(gpu.NODE_ARRAYS, cp.repeat(P[:, 0], k)).reshape(d, k)
+    new_elements = gpu.append_rows(gpu.ELEMENT_ARRAYS, element_sources.ravel()).reshape(d, k)
+    daughters = gpu.append_rows(gpu.CELL_ARRAYS, cells)
+
+    # The elements along the cut are inside the parent, so they have no cilia and are not
+    # internal or inhibitory, whatever the element they were copied from
+    cut_elements = cp.concatenate((new_elements[:, :h], new_elements[:, h + r:]), axis=1).ravel()
+    for name in ('E_internal', 'E_cilia_direction', 'E_inhibitory'):
+        array = getattr(gpu, name)
+        if array is not None:
+            array[cut_elements] = 0
+
+    fraction = (cp.arange(1, h, dtype=cp.float32) / h)[None, :, None]
+    cut_1 = o[:, None] + fraction * (s - o)[:, None]
+    cut_2 = s[:, None] + fraction * (o - s)[:, None]
+
+    opposite = P[:, h] if r == 0 else new_nodes[:, 0]
+    gpu.N_pos[P[:, 0]] = s + shift
+    gpu.N_pos[opposite] = o + shift
+    gpu.N_pos[new_nodes[:, r:r + h - 1]] = cut_1 + shift[:, None]
+    gpu.N_pos[new_nodes[:, r + h - 1]] = o - shift
+    gpu.N_pos[new_nodes[:, r + h]] = s - shift
+    gpu.N_pos[new_nodes[:, r + h + 1:]] = cut_2 - shift[:, None]
+
+    new_nodes_flat = new_nodes.ravel()
+    gpu.N_id[new_nodes_flat] = cp.max(gpu.N_id) + 1 + cp.arange(d * k)
+    gpu.N_for[new_nodes_flat] = 0.
+    if gpu.N_for_previous is not None:
+        gpu.N_for_previous[new_nodes_flat] = 0.
+    if gpu.N_pos_previous is not None:
+        gpu.N_pos_previous[new_nodes_flat] = gpu.N_pos[new_nodes_flat]
+
+    # Both rings stay anticlockwise: along the perimeter, then back along the cut. When k is
+    # odd, the first daughter keeps the opposite element for its half of it, and the second
+    # daughter gets a new element for the other half
+    first_element_2 = PE[:, h:h + 1] if r == 0 else new_elements[:, h:h + 1]
+    nodes_1 = cp.concatenate((P[:, :h + 1], new_nodes[:, :r + h - 1]), axis=1)
+    elements_1 = cp.concatenate((PE[:, :h + r], new_elements[:, :h]), axis=1)
+    nodes_2 = cp.concatenate((new_nodes[:, r + h - 1:r + h], P[:, h + 1:],
+                              new_nodes[:, r + h:]), axis=1)
+    elements_2 = cp.concatenate((first_element_2, PE[:, h + 1:], new_elements[:, h + r:]),
+                                axis=1)
+
+    for cell_idxs, nodes, elements in ((cells, nodes_1, elements_1),
+                                       (daughters, nodes_2, elements_2)):
+        gpu.C_node_idxs[cell_idxs] = nodes
+        gpu.C_element_idxs[cell_idxs] = elements
+        gpu.E_node_1[elements] = nodes
+        gpu.E_node_2[elements] = cp.roll(nodes, -1, axis=1)
+        gpu.E_cell_idx[elements] = cell_idxs[:, None]
+        gpu.C_age[cell_idxs] = 0.
+
+    gpu.refresh_indices()
+    return cells, daughters
+
+
+def compaction(dead: cp.ndarray, n, prefix):
+    """
+    The moves that close the gaps the dead rows leave, by moving the last live rows into them,
+    so the number of rows moved is at most the number that die. The rows before prefix are
+    first compacted among themselves, so they stay in front of the others
+    :param dead: the dead rows, sorted and unique
+    :param n: the number of rows
+    :param prefix: the number of leading rows that must stay in front
+    :return: (sources, targets, size, kept), the rows that move and where to, sorted by source,
+    the number of rows that are left, and how many of the leading rows are left
+    """
+    n_dead = dead.shape[0]
+    kept = prefix - int(cp.searchsorted(dead, prefix))
+    size = n - n_dead
+
+    def live(first, last):
+        rows = cp.arange(first, last)
+        return rows[~cp.isin(rows, dead)]
+
+    # The gaps in the leading rows are filled from their own end, which frees the rows from kept
+    # to prefix. Those and the other dead rows are then filled from the end of the arrays
+    sources = cp.concatenate((live(kept, prefix), live(max(size, prefix), n)))
+    targets = cp.concatenate((dead[dead < kept], cp.arange(kept, min(prefix, size)),
+                              dead[(dead >= prefix) & (dead < size)]))
+    return sources, targets, size, kept
+
+
+def remap(table: cp.ndarray, sources: cp.ndarray, targets: cp.ndarray) -> cp.ndarray:
+    """
+    Points an index table at the new rows of the rows that moved
+    :param table:
+    :param sources: sorted
+    :param targets:
+    :return:
+    """
+    if sources.shape[0] == 0:
+        return table
+    position = cp.minimum(cp.searchsorted(sources, table), sources.shape[0] - 1)
+    return cp.where(sources[position] == table, targets[position], table)
+
+
+def remove_cells(gpu: CudaMemory, cells: cp.ndarray, prefixes=(0, 0, 0)):
+    """
+    Removes cells, with the nodes and elements that no surviving cell uses. Instead of gathering
+    every array into its surviving rows, the last rows are moved into the gaps, see compaction,
+    so the rows copied scale with the deaths and not with the size of the arrays. The index
+    tables are only rewritten where they point at a moved row.
+
+    The rows that have objects, see AbstractCellSimulation.kill_cells, are given by prefixes.
+    They stay in front, and move among themselves, so the object lists can be moved the same way
+    :param gpu:
+    :param cells: indices of the cells that die
+    :param prefixes: the number of leading cells, nodes and elements that stay in front
+    :return: for the cells, nodes and elements, (sources, targets, kept, dead), the rows that
+    moved, where they moved to, how many of the leading rows are left, and the old rows that
+    were removed
+    """
+    cells = cp.unique(cells)
+    cell_alive = cp.ones(gpu.C_type.shape[0], dtype=cp.bool_)
+    cell_alive[cells] = False
+
+    def dead_rows(index_table, n):
+        # The rows of the dying cells that no surviving cell shares
+        used = cp.zeros(n, dtype=cp.bool_)
+        used[index_table[cell_alive].ravel()] = True
+        candidates = cp.unique(index_table[cells])
+        return candidates[~used[candidates]]
+
+    dead_nodes = dead_rows(gpu.C_node_idxs, gpu.N_pos.shape[0])
+    dead_elements = dead_rows(gpu.C_element_idxs, gpu.E_node_1.shape[0])
+
+    moves = []
+    for names, dead, prefix in ((gpu.CELL_ARRAYS, cells, prefixes[0]),
+                                (gpu.NODE_ARRAYS, dead_nodes, prefixes[1]),
+                                (gpu.ELEMENT_ARRAYS, dead_elements, prefixes[2])):
+        sources, targets, size, kept = compaction(dead, getattr(gpu, names[0]).shape[0],
+                                                  prefix)
+        gpu.move_rows(names, sources, targets, size)
+        moves.append((sources, targets, kept, dead))
+    cell_moves, node_moves, element_moves = moves
+
+    gpu.C_node_idxs = remap(gpu.C_node_idxs, *node_moves[:2])
+    gpu.C_element_idxs = remap(gpu.C_element_idxs, *element_moves[:2])
+    gpu.E_node_1 = remap(gpu.E_node_1, *node_moves[:2])
+    gpu.E_node_2 = remap(gpu.E_node_2, *node_moves[:2])
+    gpu.E_cell_idx = remap(gpu.E_cell_idx, *cell_moves[:2])
+
+    gpu.refresh_indices()
+    return cell_moves, node_moves, element_moves
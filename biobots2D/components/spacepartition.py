@@ -604,7 +604,8 @@ class SpacePartition:
         :param n:
         :return:
         """
-        raise TodoException
+        q, i, j = self.get_quadrant_and_indices(n.x, n.y)
+        self.nodes_Q[q][i][j].remove(n)
 
     def remove_element_from_partition(self, e):
         """
@@ -612,7 +613,10 @@ class SpacePartition:
         :param e:
         :return:
         """
-        raise TodoException
+        Q, I, J = self.get_box_indices_between_nodes(e.node_1, e.node_2)
+
+        for ii in range(Q.size(0)):
+            self.remove_element_from_box(Q[ii], I[ii], J[ii], e)
 
     def repair_modified_element(self, e):
         """
@@ -21,20 +21,21 @@ from utils.polyshapes import nsidedpoly
 
 
 class Gradient(FreeCellSimulation):
-    def __init__(self, t0=10, seed: int = 49):
+    def __init__(self, t0=10, seed: int = 49, slow_every: int = 1, cilia_angle=0.25 * pi,
+                 propagation_magnitude=10.):
         super(Gradient, self).__init__()
         self.set_rng_seed(seed)
         self.N = 12
 
         # e_cent = self.new_cell(0.0, 0.5)
 
-        c_left = self.new_cell(-1., -.5, 'cilia', inh=True, ang=0.25 * pi)
+        c_left = self.new_cell(-1., -.5, 'cilia', inh=True, ang=cilia_angle)
         s_left = self.new_cell(-1., 0.5, 'sensor', inh=False)
 
         bl = self.new_cell(0, -.5)
         tl = self.new_cell(0, .5)
 
-        c_right = self.new_cell(1., -.5, 'cilia', inh=False, ang=-0.25 * pi)
+        c_right = self.new_cell(1., -.5, 'cilia', inh=False, ang=-cilia_angle)
         s_right = self.new_cell(1., 0.5, 'sensor', inh=True)
 
         self.connect_cells(c_left, s_left)
@@ -58,15 +59,22 @@ class Gradient(FreeCellSimulation):
 
         """ADD THE FORCES"""
 
+        # The target areas and perimeters, which follow the growth of the cells, and the food
+        # gradient change slowly compared to the contact forces. With slow_every > 1 they are
+        # calculated every slow_every steps and kept in between. The restoring forces towards
+        # them depend on the positions, so they are evaluated every step
         self.add_cell_based_force(PolygonCellGrowthForce(area_P=50, perimeter_P=10, tension_P=10))
         self.add_cell_based_force(FreeCellPerimeterNormalisingForce(spring_rate=15))
-        self.add_cell_based_force(CiliaPropagationForce(propagation_magnitude=10))
+        self.add_cell_based_force(
+            CiliaPropagationForce(propagation_magnitude=propagation_magnitude))
+        self.set_quantity_cadence('C_target_area', slow_every)
+        self.set_quantity_cadence('C_target_perimeter', slow_every)
 
         self.add_neighbourhood_based_force(CellCellInteractionForce(sra=10, srr=10, da=-0.1,
                                                                     ds=0.1, dl=0.2, dt=self.dt,
                                                                     using_polys=True))
 
-        self.add_information_processing_signal(FoodGradientSignal())
+        self.add_information_processing_signal(FoodGradientSignal(), every=slow_every)
 
         """init memory"""
         self.gpu = CudaMemory(self.cell_list, self.element_list, self.node_list, 0.2)
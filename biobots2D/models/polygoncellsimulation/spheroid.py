@@ -1,7 +1,7 @@
 from math import ceil
 
+from biobots2D.components.cell.cellcycle.cellcycleengine import CellCycleEngine
 from biobots2D.components.cell.cellcycle.growthcontactinhibition import GrowthContactInhibition
-from biobots2D.components.central_memory.cpu_memory import CPUMemory
 from biobots2D.components.forces.cellbasedforce.freecellperimeternormalisingforce import \
     FreeCellPerimeterNormalisingForce
 from biobots2D.components.forces.cellbasedforce.polygoncellgrowthforce import PolygonCellGrowthForce
@@ -66,7 +66,7 @@ class Spheroid(FreeCellSimulation):
             x = X[i]
             y = Y[i]
 
-            ccm = GrowthContactInhibition(t0, tg, f, self.dt)
+            ccm = GrowthContactInhibition(t0, tg, f, self.dt, self.seed or 0, key=i)
 
             c = self.make_cell_at_centre(N, x + 0.5 * (y % 2), y * 3 ** .5 / 2, ccm)
 
@@ -90,8 +90,11 @@ class Spheroid(FreeCellSimulation):
         """ ADD SPACE PARTITION """
         self.boxes = SpacePartition(0.3, 0.3, self)
 
-        self.gpu = CudaMemory(self.cell_list, self.element_list, self.node_list)
-        self.gpu = CPUMemory(self.cell_list, self.element_list, self.node_list)
+        self.gpu = CudaMemory(self.cell_list, self.element_list, self.node_list, dLim)
+
+        # The cell cycle of all cells runs on the arrays, the per cell models are only used by
+        # the CPU path
+        self.set_cell_cycle_engine(CellCycleEngine(t0, tg, f, seed=seed))
 
         """ ADD THE DATA WRITERS """
         path_name = f"Spheroid/t0{t0}gtg{tg}gs{s}gsreg{sreg}gf{f}gda{dAsym}gds{dSep}gdl{dLim}" \
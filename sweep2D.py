@@ -0,0 +1,173 @@
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import time
+from math import pi
+
+from tqdm import tqdm
+
+RESULT_FIELDS = ['key', 'distance_start', 'distance_end', 'displacement_to_food', 'spice',
+                 'steps', 'wall', 'worker']
+
+
+def parameter_grid(**values):
+    """
+    Every combination of the given values, e.g.
+    parameter_grid(seed=range(8), propagation_magnitude=[5., 10.])
+    :param values: for each constructor argument of the model, the values to try
+    :return: a list of keyword dictionaries
+    """
+    names = sorted(values)
+    return [dict(zip(names, combination))
+            for combination in itertools.product(*(values[name] for name in names))]
+
+
+def configuration_key(parameters):
+    return json.dumps(parameters, sort_keys=True)
+
+
+def _init_worker(devices, counter):
+    """
+    Gives every worker process one device and its own device memory pool, so the workers never
+    share allocations
+    :param devices: the number of GPUs to spread the workers over
+    :param counter: a shared counter to number the workers
+    :return:
+    """
+    import cupy as cp
+
+    with counter.get_lock():
+        worker = counter.value
+        counter.value += 1
+
+    cp.cuda.Device(worker % devices).use()
+    cp.cuda.set_allocator(cp.cuda.MemoryPool().malloc)
+
+
+def food_distance(s):
+    """
+    The distance from the centre of the sensor cells to the nearest food cell
+    :param s:
+    :return:
+    """
+    import cupy as cp
+
+    sensors = cp.mean(s.gpu.C_pos[s.gpu.Ctype_4], axis=0)
+    food = s.gpu.C_pos[s.gpu.Ctype_3]
+    return float(cp.min(cp.linalg.norm(food - sensors[None, :], axis=1)))
+
+
+def run_configuration(job):
+    """
+    Runs one configuration headless and returns its summary metrics. Executed in a worker
+    :param job: (parameters, t_end)
+    :return:
+    """
+    from biobots2D.models.biobots.gradient import Gradient
+
+    parameters, t_end = job
+    t0 = time.perf_counter()
+
+    s = Gradient(**parameters)
+    distance_start = food_distance(s)
+    s.run_to_time(t_end, report=False)
+    distance_end = food_distance(s)
+
+    return parameters, {'key': configuration_key(parameters),
+                        'distance_start': distance_start,
+                        'distance_end': distance_end,
+                        'displacement_to_food': distance_start - distance_end,
+                        'spice': float(s.gpu.spice[0]),
+                        'steps': s.step,
+                        'wall': time.perf_counter() - t0,
+                        'worker': os.getpid()}
+
+
+def finished_keys(path):
+    """
+    The configurations that already have a row in the results table
+    :param path:
+    :return:
+    """
+    if not os.path.isfile(path):
+        return set()
+    with open(path, newline='') as f:
+        return {row['key'] for row in csv.DictReader(f)}
+
+
+def check_header(path, fieldnames):
+    """
+    Makes sure the results table was written by a sweep over the same parameters, otherwise the
+    new rows would be appended under the wrong columns
+    :param path:
+    :param fieldnames:
+    :return:
+    """
+    with open(path, newline='') as f:
+        header = next(csv.reader(f), None)
+    if header is not None and header != fieldnames:
+        raise ValueError(f"{path} has the columns {header}, but this sweep writes {fieldnames}. "
+                         f"Use a new results table for a different parameter set")
+
+
+def sweep(configurations, path, t_end=10., processes=None, devices=1):
+    """
+    Runs every configuration in a pool of worker processes and appends one row per finished
+    run to the csv at path, as soon as it finishes. Configurations that are already in the
+    table are skipped, so a sweep that was interrupted continues where it stopped when it is
+    started again with the same arguments
+    :param configurations: keyword dictionaries for the model, see parameter_grid
+    :param path: the results table
+    :param t_end: simulated time per run
+    :param processes: the number of workers, defaults to the number of cpus
+    :param devices: the number of GPUs to spread the workers over
+    :return:
+    """
+    names = sorted({name for c in configurations for name in c})
+    fieldnames = RESULT_FIELDS + names
+    if os.path.isfile(path):
+        check_header(path, fieldnames)
+
+    done = finished_keys(path)
+    todo = [c for c in configurations if configuration_key(c) not in done]
+    tqdm.write(f"{len(done)} configurations done, {len(todo)} to go")
+    if not todo:
+        return
+
+    new_file = not os.path.isfile(path) or os.path.getsize(path) == 0
+
+    # CUDA does not survive fork, the workers are started fresh
+    context = multiprocessing.get_context('spawn')
+    counter = context.Value('i', 0)
+
+    busy = {}
+    steps = 0
+    t0 = time.perf_counter()
+    with open(path, 'a+', newline='') as f, \
+            context.Pool(processes, _init_worker, (devices, counter)) as pool:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        if new_file:
+            writer.writeheader()
+
+        jobs = pool.imap_unordered(run_configuration, [(c, t_end) for c in todo])
+        for parameters, result in tqdm(jobs, total=len(todo)):
+            writer.writerow({**result, **parameters})
+            f.flush()
+
+            busy[result['worker']] = busy.get(result['worker'], 0.) + result['wall']
+            steps += result['steps']
+
+    wall = time.perf_counter() - t0
+    mean_busy = sum(busy.values()) / len(busy)
+    tqdm.write(f"{len(todo)} runs in {wall:.1f} s: {len(todo) / wall:.2f} runs/s, "
+               f"{steps / wall:.0f} steps/s")
+    tqdm.write(f"load balance: {len(busy)} workers, busiest {max(busy.values()):.1f} s, "
+               f"mean {mean_busy:.1f} s, imbalance {max(busy.values()) / mean_busy:.2f}")
+
+
+if __name__ == '__main__':
+    sweep(parameter_grid(seed=range(16), propagation_magnitude=[5., 10., 15.],
+                         cilia_angle=[0.125 * pi, 0.25 * pi, 0.375 * pi]),
+          'sweep_results.csv', t_end=10., processes=4)
@@ -1,7 +1,10 @@
 import atexit
+import queue
 import sys
+import threading
 
 import cupy as cp
+import cupyx
 import cv2
 import numpy as np
 
@@ -20,75 +23,97 @@ class Renderer:
                    (179, 68, 149),
                    (145, 30, 83)]
 
-    def __init__(self, gpu: CudaMemory, figsize=(1080, 720)):
+    def __init__(self, gpu: CudaMemory, figsize=(1080, 720), headless=False,
+                 path='res/gradient_following_biobot.mp4'):
+        """
+        Draws the cells into a frame and writes it to a video. All cells of a type are drawn
+        with one fillPoly and one polylines call into a frame buffer that is reused for every
+        frame. With headless, there is no display at all, so it runs without one, e.g. on the
+        cluster; otherwise the frame is also shown in a pygame window
+        :param gpu:
+        :param figsize: (width, height) in pixels
+        :param headless:
+        :param path: the video file
+        """
         self.gpu = gpu
         self.figsize = figsize
+        self.headless = headless
 
-        pygame.init()
+        # The colours of the frame, in the BGR order of cv2
+        self.background = self.bgr(self.pastel(self.BACKGROUND))
+        self.fill_colors = [self.bgr(self.pastel(c)) for c in self.CELL_COLORS]
+        self.line_colors = [tuple(v // 2 for v in c) for c in self.fill_colors]
 
-        self.fps = 60
-        self.clock = pygame.time.Clock()
+        self.frame = np.empty((figsize[1], figsize[0], 3), dtype=np.uint8)
 
-        self.display = pygame.display.set_mode(figsize)
-        self.display.fill(self.BACKGROUND)
-        pygame.display.set_caption("BioBots")
+        if not headless:
+            pygame.init()
 
-        self.ctypes = cp.asnumpy(self.gpu.C_type).astype(int)
+            self.fps = 60
+            self.clock = pygame.time.Clock()
+
+            self.display = pygame.display.set_mode(figsize)
+            pygame.display.set_caption("BioBots")
 
         self.xmin, self.xmax, self.ymin, self.ymax = None, None, None, None
 
-        self.videowriter = cv2.VideoWriter('res/gradient_following_biobot.mp4',
-                                           cv2.VideoWriter_fourcc(*'MP4V'), 180, figsize)
+        self.videowriter = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MP4V'), 180, figsize)
 
         atexit.register(self.cleanup)
 
+    @staticmethod
+    def pastel(c):
+        basetone = (200, 200, 200)
+        return tuple(int(0.75 * c[ii] + 0.25 * basetone[ii]) for ii in range(3))
+
+    @staticmethod
+    def bgr(c):
+        return tuple(c[::-1])
+
     def render(self):
         if not self.gpu.RENDER:
             return
-        for event in pygame.event.get():
-            if event.type == QUIT:
-                pygame.quit()
-                sys.exit()
 
-        basetone = (38,129,174)
-        basetone = (200,200,200)
-        # basetone = (89,75,109)
-        pastel = lambda x: [int(0.75 * x[ii] + 0.25 * basetone[ii]) for ii in range(3)]
-        dark = lambda x: [x[ii]//2 for ii in range(3)]
+        N = cp.asnumpy(self.gpu.N_pos[self.gpu.C_node_idxs])
+        # Read every frame, cells are added and removed
+        ctypes = cp.asnumpy(self.gpu.C_type).astype(int)
+        self.draw(N, ctypes)
 
-        self.display.fill(pastel(self.BACKGROUND))
+        if not self.headless:
+            self.show()
 
-        N = cp.asnumpy(self.gpu.N_pos[self.gpu.C_node_idxs])
+        self.videowriter.write(self.frame)
+
+    def draw(self, N: np.ndarray, ctypes: np.ndarray) -> np.ndarray:
+        """
+        Rasterizes the cells into the frame buffer
+        :param N: (cells, nodes, 2) node positions of every cell
+        :param ctypes: the type of every cell
+        :return: the frame, BGR
+        """
         xmin, xmax, ymin, ymax = self.get_bounds(N)
-        N[:, :, 0] = (N[:, :, 0] - xmin) / (xmax - xmin) * self.figsize[0]
-        N[:, :, 1] = (N[:, :, 1] - ymin) / (ymax - ymin) * self.figsize[1]
-        N = N.astype(np.int)
+        pixels = np.empty(N.shape, dtype=np.int32)
+        pixels[:, :, 0] = (N[:, :, 0] - xmin) / (xmax - xmin) * self.figsize[0]
+        pixels[:, :, 1] = self.figsize[1] - (N[:, :, 1] - ymin) / (ymax - ymin) * self.figsize[1]
 
-        for ii in range(N.shape[0]):
-            color = self.CELL_COLORS[self.ctypes[ii]]
+        self.frame[:] = self.background
+        for ctype in np.unique(ctypes):
+            polygons = pixels[ctypes == ctype]
+            cv2.fillPoly(self.frame, polygons, self.fill_colors[ctype])
+            cv2.polylines(self.frame, polygons, True, self.line_colors[ctype], 5)
 
-            color = pastel(color)
+        return self.frame
 
-            points = N[ii].tolist()
-            points = [[x[0], self.figsize[1]-x[1]] for x in points]
-            pygame.draw.polygon(self.display, color, points)
-            pygame.draw.polygon(self.display, dark(color), points, 5)
+    def show(self):
+        for event in pygame.event.get():
+            if event.type == QUIT:
+                pygame.quit()
+                sys.exit()
 
+        pygame.surfarray.blit_array(self.display, self.frame[:, :, ::-1].transpose([1, 0, 2]))
         pygame.display.update()
         self.clock.tick(self.fps)
 
-        view = pygame.surfarray.array3d(self.display)
-        view = view.transpose([1,0,2])
-        img_bgr = cv2.cvtColor(view, cv2.COLOR_BGR2RGB)
-
-        self.videowriter.write(img_bgr)
-
-        # cv2.imshow("foo", img_bgr)
-        # cv2.waitKey(-1)
-
-
-        # pyout()
-
     def get_bounds(self, N):
         xmin_, xmax_ = np.min(N[:, :, 0]), np.max(N[:, :, 0])
         ymin_, ymax_ = np.min(N[:, :, 1]), np.max(N[:, :, 1])
@@ -108,4 +133,145 @@ class Renderer:
         return self.xmin, self.xmax, self.ymin, self.ymax
 
     def cleanup(self):
-        self.videowriter.release()
\ No newline at end of file
+        self.videowriter.release()
+
+
+class AsyncRenderer:
+    BLOCK = 'block'
+    DROP = 'drop'
+
+    def __init__(self, gpu: CudaMemory, figsize=(1080, 720),
+                 path='res/gradient_following_biobot.mp4', slots=8, policy=BLOCK):
+        """
+        Draws and encodes frames on a worker thread, so the simulation keeps stepping while a
+        frame is written. render only copies the node positions and cell types into a slot of a
+        ring buffer and hands the slot to the worker; the worker rasterizes it with a headless
+        Renderer, writes it to the video and gives the slot back. The slots are preallocated in
+        pinned host memory, so the copy from the device is direct and no frame is allocated.
+        cv2 releases the GIL while it draws and encodes.
+
+        When all slots are in use the encoder is behind. With BLOCK, render waits for a free slot,
+        so every frame is written; with DROP, the frame is skipped and counted in dropped.
+
+        If drawing or encoding fails, the worker stops and the error is raised again from the next
+        render, or from close
+        :param gpu:
+        :param figsize: (width, height) in pixels
+        :param path: the video file
+        :param slots: size of the ring buffer, how many frames can wait to be encoded
+        :param policy: BLOCK or DROP
+        """
+        if policy not in (self.BLOCK, self.DROP):
+            raise ValueError(f"Unknown policy {policy}")
+
+        self.gpu = gpu
+        self.policy = policy
+        self.renderer = Renderer(gpu, figsize=figsize, headless=True, path=path)
+
+        # Sized for the cells there are now, they only grow if the cells divide past that
+        self.free = queue.Queue()
+        self.ready = queue.Queue()
+        shape = gpu.C_node_idxs.shape + (2,)
+        for _ in range(slots):
+            slot = {'N': None, 'ctypes': None}
+            self._reserve(slot, shape, gpu.N_pos.dtype)
+            self.free.put(slot)
+
+        self.written = 0
+        self.dropped = 0
+        self.error = None
+
+        self.worker = threading.Thread(target=self._work, daemon=True)
+        self.worker.start()
+
+        # Registered after the renderer, so it runs before the video writer is released
+        atexit.register(self.close)
+
+    def render(self):
+        if not self.gpu.RENDER or self.worker is None:
+            return
+
+        self._raise_error()
+        if self.policy == self.DROP:
+            try:
+                slot = self.free.get(block=False)
+            except queue.Empty:
+                self.dropped += 1
+                return
+        else:
+            # Waits in short spells, so a worker that died does not leave render waiting forever
+            while True:
+                try:
+                    slot = self.free.get(timeout=0.1)
+                    break
+                except queue.Empty:
+                    self._raise_error()
+
+        N = self.gpu.N_pos[self.gpu.C_node_idxs]
+        n_cells = N.shape[0]
+        self._reserve(slot, N.shape, N.dtype)
+        N.get(out=slot['N'][:n_cells])
+        self.gpu.C_type.astype(cp.int64).get(out=slot['ctypes'][:n_cells])
+
+        self.ready.put((slot, n_cells))
+        self.written += 1
+
+    @staticmethod
+    def _reserve(slot, shape, dtype):
+        """
+        Grows the slot to hold the node positions of every cell, to twice the number of cells,
+        so it is seldom reallocated while the cells divide
+        :param slot:
+        :param shape: (cells, nodes, 2)
+        :param dtype: of the node positions
+        :return:
+        """
+        if (slot['N'] is not None and slot['N'].shape[0] >= shape[0]
+                and slot['N'].shape[1:] == shape[1:] and slot['N'].dtype == dtype):
+            return
+
+        capacity = 2 * shape[0]
+        slot['N'] = cupyx.empty_pinned((capacity,) + tuple(shape[1:]), dtype=dtype)
+        slot['ctypes'] = cupyx.empty_pinned(capacity, dtype=np.int64)
+
+    def summary(self):
+        """
+        The frames dropped, with DROP, or None if every frame was written
+        :return:
+        """
+        if not self.dropped:
+            return None
+        return f"{self.dropped} of {self.written + self.dropped} frames dropped"
+
+    def _raise_error(self):
+        if self.error is not None:
+            raise RuntimeError("The render worker failed") from self.error
+
+    def _work(self):
+        while True:
+            item = self.ready.get()
+            if item is None:
+                return
+
+            slot, n_cells = item
+            try:
+                self.renderer.draw(slot['N'][:n_cells], slot['ctypes'][:n_cells])
+                self.renderer.videowriter.write(self.renderer.frame)
+            except Exception as e:
+                self.error = e
+                return
+            self.free.put(slot)
+
+    def close(self):
+        """
+        Waits for the frames in the ring buffer to be written, then closes the video
+        :return:
+        """
+        if self.worker is None:
+            return
+
+        self.ready.put(None)
+        self.worker.join()
+        self.worker = None
+        self.renderer.cleanup()
+        self._raise_error()